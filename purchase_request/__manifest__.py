@@ -16,6 +16,14 @@ Features:
 - Procurement officers can review, approve, or reject requests
 - Approved requests can be converted to multi-vendor RFQs
 - Full audit trail with chatter integration
+- Optional approval digests: one notification per approver and period
+- Department budgets with a committed-spend ledger, checked on approval
+- Multi-level approval chains by amount, department, priority and product category
+- Lineage from request lines to RFQ, bid and purchase order lines
+- Idempotent bulk intake endpoint for external systems
+- Catalog picker adding many products with quantities in one action
+- Request counters on the procurement workload screen
+- RFQs of large requests created by a background job
 
 Workflow:
 1. Employee creates a Purchase Request with required products
@@ -30,8 +38,16 @@ Workflow:
         'security/purchase_request_security.xml',
         'security/ir.model.access.csv',
         'data/sequence_data.xml',
+        'data/ir_cron_data.xml',
+        'data/mail_templates.xml',
         'views/purchase_request_views.xml',
+        'views/purchase_budget_views.xml',
+        'views/purchase_request_approval_views.xml',
+        'views/purchase_lineage_views.xml',
         'views/purchase_order_views.xml',
+        'views/purchase_workload_views.xml',
+        'views/res_config_settings_views.xml',
+        'wizard/product_catalog_wizard_views.xml',
     ],
     'installable': True,
     'application': True,
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from psycopg2.errors import UniqueViolation
+
+from odoo import http
+from odoo.http import request
+
+# Attempts when a concurrent call commits the same intake keys first
+INTAKE_MAX_ATTEMPTS = 3
+
+
+class PurchaseRequestController(http.Controller):
+
+    @http.route('/purchase_request/intake', type='json', auth='user')
+    def intake(self, requests, auto_submit=False):
+        """Idempotent bulk creation of purchase requests (see intake_requests)."""
+        for attempt in range(INTAKE_MAX_ATTEMPTS):
+            try:
+                with request.env.cr.savepoint():
+                    return request.env['purchase.request'].intake_requests(
+                        requests, auto_submit=auto_submit,
+                    )
+            except UniqueViolation:
+                if attempt == INTAKE_MAX_ATTEMPTS - 1:
+                    raise
+                # A retry of the same batch committed first: start over on a
+                # fresh snapshot, where its requests are reported as existing
+                request.env.cr.rollback()
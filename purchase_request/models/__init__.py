@@ -1,3 +1,12 @@
 # -*- coding: utf-8 -*-
 from . import purchase_request
+from . import purchase_budget
+from . import purchase_request_approval
 from . import purchase_order
+from . import purchase_lineage
+from . import rfq_bid
+from . import hr_employee
+from . import ir_rule
+from . import res_config_settings
+from . import procurement_search
+from . import purchase_workload
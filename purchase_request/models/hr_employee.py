@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, models, tools
+from odoo.tools import frozendict
+
+from odoo.addons.purchase_rfq_multi_vendor.tools import bump_table_version, get_table_version
+
+# Employee fields the cached purchase request resolvers depend on
+RESOLVER_EMPLOYEE_FIELDS = {'user_id', 'parent_id', 'department_id', 'company_id', 'active'}
+
+
+class HrEmployee(models.Model):
+    _inherit = 'hr.employee'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        bump_table_version(self.env, self._table)
+        return employees
+
+    def write(self, vals):
+        res = super().write(vals)
+        if RESOLVER_EMPLOYEE_FIELDS & vals.keys():
+            bump_table_version(self.env, self._table)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        bump_table_version(self.env, self._table)
+        return res
+
+    @api.model
+    def _get_purchase_request_user_employees(self, user_id):
+        """Resolve the employees of a user for purchase requests.
+
+        Used by the request defaults and record rules, which would otherwise
+        search the same user -> employee -> reports chain on every form load,
+        create and query. The cache key holds the version of the employee
+        table, so it is missed whenever an employee changes.
+
+        :return: frozendict with ``employee_ids`` (the user's employees),
+                 ``managed_employee_ids`` (their direct reports) and
+                 ``by_company`` ({company id: employee id})
+        """
+        version = get_table_version(self.env, self._table)
+        return self._get_purchase_request_user_employees_cached(user_id, version)
+
+    @api.model
+    @tools.ormcache('user_id', 'version')
+    def _get_purchase_request_user_employees_cached(self, user_id, version):
+        employees = self.sudo().search([('user_id', '=', user_id)], order='id')
+        managed = self.sudo().search([('parent_id', 'in', employees.ids)]) if employees else employees
+        by_company = {}
+        for employee in employees:
+            by_company.setdefault(employee.company_id.id, employee.id)
+        return frozendict(
+            employee_ids=tuple(employees.ids),
+            managed_employee_ids=tuple(managed.ids),
+            by_company=frozendict(by_company),
+        )
+
+    @api.model
+    def _get_purchase_request_chain(self, employee_id):
+        """Resolve the approval chain of an employee.
+
+        Cached on the versions of the employee and department tables.
+
+        :return: frozendict with ``department_id``, ``manager_id``,
+                 ``manager_user_id`` and ``department_manager_user_id``
+        """
+        version = (
+            get_table_version(self.env, self._table),
+            get_table_version(self.env, self.env['hr.department']._table),
+        )
+        return self._get_purchase_request_chain_cached(employee_id, version)
+
+    @api.model
+    @tools.ormcache('employee_id', 'version')
+    def _get_purchase_request_chain_cached(self, employee_id, version):
+        employee = self.sudo().browse(employee_id)
+        return frozendict(
+            department_id=employee.department_id.id,
+            manager_id=employee.parent_id.id,
+            manager_user_id=employee.parent_id.user_id.id,
+            department_manager_user_id=employee.department_id.manager_id.user_id.id,
+        )
+
+    @api.model
+    def _get_purchase_request_default_employee(self):
+        """Return the employee of the current user in the current company."""
+        info = self._get_purchase_request_user_employees(self.env.uid)
+        employee_id = info['by_company'].get(self.env.company.id)
+        if not employee_id and info['employee_ids']:
+            employee_id = info['employee_ids'][0]
+        return self.browse(employee_id)
+
+
+class HrDepartment(models.Model):
+    _inherit = 'hr.department'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'manager_id' in vals:
+            bump_table_version(self.env, self._table)
+        return res
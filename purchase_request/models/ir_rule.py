@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, models
+
+from odoo.addons.purchase_rfq_multi_vendor.tools import get_table_version
+
+
+class IrRule(models.Model):
+    _inherit = 'ir.rule'
+
+    @api.model
+    def _eval_context(self):
+        """Expose the cached employees of the user to record rule domains."""
+        context = super()._eval_context()
+        info = self.env['hr.employee']._get_purchase_request_user_employees(self.env.uid)
+        context.update(
+            purchase_request_employee_ids=list(info['employee_ids']),
+            purchase_request_managed_employee_ids=list(info['managed_employee_ids']),
+        )
+        return context
+
+    def _compute_domain_context_values(self):
+        # The cached rule domains embed the employees of the user
+        yield from super()._compute_domain_context_values()
+        yield get_table_version(self.env, self.env['hr.employee']._table)
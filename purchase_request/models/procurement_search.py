@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, models
+
+
+class ProcurementSearch(models.AbstractModel):
+    _inherit = 'purchase.procurement.search'
+
+    @api.model
+    def _get_search_sources(self):
+        return super()._get_search_sources() + [
+            ('purchase.request', ['name', 'description'], False),
+            ('purchase.request.line', ['specifications', 'description'], 'request_id'),
+        ]
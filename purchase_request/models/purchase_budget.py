@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+import threading
+
+from odoo import api, fields, models, _
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+# Number of budgets rebuilt and committed at once by the reconciliation job
+RECONCILE_BATCH_SIZE = 200
+
+
+class PurchaseRequestBudget(models.Model):
+    _name = 'purchase.request.budget'
+    _description = 'Department Purchase Budget'
+    _inherit = ['mail.thread']
+    _order = 'date_from desc, department_id'
+
+    name = fields.Char(string='Budget', required=True, tracking=True)
+    department_id = fields.Many2one(
+        'hr.department',
+        string='Department',
+        required=True,
+        index=True,
+        tracking=True,
+    )
+    date_from = fields.Date(string='Start Date', required=True, tracking=True)
+    date_to = fields.Date(string='End Date', required=True, tracking=True)
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    currency_id = fields.Many2one(
+        'res.currency',
+        related='company_id.currency_id',
+        string='Currency',
+        readonly=True,
+    )
+
+    amount = fields.Monetary(
+        string='Budget Amount',
+        required=True,
+        currency_field='currency_id',
+        tracking=True,
+    )
+    # Running total of the ledger, only ever changed by an SQL increment
+    # (see purchase.request.budget.ledger._increment_budget)
+    committed_amount = fields.Monetary(
+        string='Committed',
+        readonly=True,
+        copy=False,
+        currency_field='currency_id',
+    )
+    remaining_amount = fields.Monetary(
+        string='Remaining',
+        compute='_compute_remaining_amount',
+        currency_field='currency_id',
+    )
+
+    ledger_ids = fields.One2many(
+        'purchase.request.budget.ledger',
+        'budget_id',
+        string='Ledger',
+        readonly=True,
+    )
+
+    _sql_constraints = [
+        ('date_range_valid',
+         'CHECK(date_to >= date_from)',
+         'The budget must end after it starts.'),
+    ]
+
+    @api.depends('amount', 'committed_amount')
+    def _compute_remaining_amount(self):
+        for budget in self:
+            budget.remaining_amount = budget.amount - budget.committed_amount
+
+    @api.constrains('department_id', 'company_id', 'date_from', 'date_to')
+    def _check_overlap(self):
+        for budget in self:
+            overlapping = self.search_count([
+                ('id', '!=', budget.id),
+                ('department_id', '=', budget.department_id.id),
+                ('company_id', '=', budget.company_id.id),
+                ('date_from', '<=', budget.date_to),
+                ('date_to', '>=', budget.date_from),
+            ], limit=1)
+            if overlapping:
+                raise ValidationError(_(
+                    'Department %s already has a budget overlapping this period.'
+                ) % budget.department_id.name)
+
+    @api.model
+    def _find_budget(self, department, company, date):
+        return self.search([
+            ('department_id', '=', department.id),
+            ('company_id', '=', company.id),
+            ('date_from', '<=', date),
+            ('date_to', '>=', date),
+        ], limit=1)
+
+    # -------------------------------------------------------------------------
+    # Reconciliation
+    # -------------------------------------------------------------------------
+    def _reconcile_committed_amount(self):
+        """Rebuild the committed amounts of ``self`` from their ledgers.
+
+        Returns the budgets whose running total had drifted.
+        """
+        totals = dict(self.env['purchase.request.budget.ledger']._read_group(
+            [('budget_id', 'in', self.ids)],
+            ['budget_id'],
+            ['amount:sum'],
+        ))
+        drifted = self.filtered(
+            lambda budget: budget.currency_id.compare_amounts(
+                budget.committed_amount, totals.get(budget, 0.0)
+            ) != 0
+        )
+        for budget in drifted:
+            budget.committed_amount = totals.get(budget, 0.0)
+        return drifted
+
+    @api.model
+    def _cron_reconcile_budgets(self):
+        """Rebuild every running total from the ledger, one batch at a time."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        last_id = 0
+        while True:
+            budgets = self.with_context(active_test=False).search(
+                [('id', '>', last_id)], order='id', limit=RECONCILE_BATCH_SIZE,
+            )
+            if not budgets:
+                return
+            for budget in budgets._reconcile_committed_amount():
+                budget.message_post(
+                    body=_('The committed amount was rebuilt from the ledger.'),
+                    message_type='notification',
+                )
+            last_id = budgets[-1].id
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+    def action_reconcile(self):
+        """Rebuild the committed amount of the selected budgets."""
+        self._reconcile_committed_amount()
+
+    def action_view_requests(self):
+        """View the requests committed on this budget."""
+        self.ensure_one()
+        return {
+            'name': _('Requests on %s') % self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.request',
+            'view_mode': 'list,form',
+            'domain': [('budget_id', '=', self.id)],
+        }
+
+
+class PurchaseRequestBudgetLedger(models.Model):
+    _name = 'purchase.request.budget.ledger'
+    _description = 'Purchase Budget Ledger Entry'
+    _order = 'id desc'
+
+    budget_id = fields.Many2one(
+        'purchase.request.budget',
+        string='Budget',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    request_id = fields.Many2one(
+        'purchase.request',
+        string='Purchase Request',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    event = fields.Selection([
+        ('approval', 'Approval'),
+        ('rfq', 'RFQ Created'),
+        ('award', 'Bid Awarded'),
+        ('release', 'Released'),
+    ], string='Event', required=True)
+    amount = fields.Monetary(
+        string='Amount',
+        required=True,
+        currency_field='currency_id',
+        help='Change of the committed amount caused by this event.',
+    )
+    currency_id = fields.Many2one(
+        'res.currency',
+        related='budget_id.currency_id',
+        readonly=True,
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        related='budget_id.company_id',
+        store=True,
+        readonly=True,
+    )
+
+    @api.model
+    def _increment_budget(self, budget, amount):
+        """Add ``amount`` to the running total of ``budget`` in place.
+
+        The increment is a single UPDATE: concurrent approvals on the same
+        budget queue on the row instead of overwriting each other's totals.
+        Returns the new committed amount.
+        """
+        budget.flush_recordset(['committed_amount'])
+        self.env.cr.execute(SQL(
+            """
+            UPDATE purchase_request_budget
+               SET committed_amount = COALESCE(committed_amount, 0) + %s
+             WHERE id = %s
+         RETURNING committed_amount
+            """,
+            amount, budget.id,
+        ))
+        committed = self.env.cr.fetchone()[0]
+        budget.invalidate_recordset(['committed_amount'])
+        return committed
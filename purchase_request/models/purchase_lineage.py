@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, fields, models, _
+from odoo.tools import SQL
+
+
+class PurchaseLineage(models.Model):
+    """Denormalised path from a request line to the documents it produced.
+
+    Every row carries all the ancestors known when it is written, so both
+    "what came out of this request" and "where does this order come from"
+    are a single index lookup instead of text matching on ``origin``.
+    """
+    _name = 'purchase.lineage'
+    _description = 'Procurement Lineage'
+    _order = 'id'
+
+    event = fields.Selection([
+        ('rfq', 'RFQ Created'),
+        ('bid', 'Bid Recorded'),
+        ('award', 'Purchase Order Created'),
+    ], string='Event', required=True, readonly=True)
+
+    request_id = fields.Many2one(
+        'purchase.request',
+        string='Purchase Request',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        index=True,
+    )
+    request_line_id = fields.Many2one(
+        'purchase.request.line',
+        string='Request Line',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    rfq_id = fields.Many2one(
+        'purchase.order',
+        string='RFQ',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    rfq_line_id = fields.Many2one(
+        'purchase.order.line',
+        string='RFQ Line',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    bid_id = fields.Many2one(
+        'purchase.rfq.bid',
+        string='Bid',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    bid_line_id = fields.Many2one(
+        'purchase.rfq.bid.line',
+        string='Bid Line',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    order_id = fields.Many2one(
+        'purchase.order',
+        string='Purchase Order',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    order_line_id = fields.Many2one(
+        'purchase.order.line',
+        string='Purchase Order Line',
+        readonly=True,
+        ondelete='cascade',
+        index='btree_not_null',
+    )
+    product_id = fields.Many2one(
+        related='request_line_id.product_id',
+        string='Product',
+    )
+
+    # -------------------------------------------------------------------------
+    # Recording
+    # -------------------------------------------------------------------------
+    @api.model
+    def _record_rfq_lines(self, rfq_lines):
+        """Record the RFQ lines created from request lines."""
+        rfq_lines = rfq_lines.filtered('purchase_request_line_id')
+        return self.sudo().create([
+            {
+                'event': 'rfq',
+                'request_id': line.purchase_request_line_id.request_id.id,
+                'request_line_id': line.purchase_request_line_id.id,
+                'rfq_id': line.order_id.id,
+                'rfq_line_id': line.id,
+            }
+            for line in rfq_lines
+        ])
+
+    @api.model
+    def _record_bid_lines(self, bid_lines):
+        """Record the bid lines quoted on RFQ lines that come from a request."""
+        bid_lines = bid_lines.filtered('rfq_line_id.purchase_request_line_id')
+        return self.sudo().create([
+            {
+                'event': 'bid',
+                'request_id': line.rfq_line_id.purchase_request_line_id.request_id.id,
+                'request_line_id': line.rfq_line_id.purchase_request_line_id.id,
+                'rfq_id': line.rfq_line_id.order_id.id,
+                'rfq_line_id': line.rfq_line_id.id,
+                'bid_id': line.bid_id.id,
+                'bid_line_id': line.id,
+            }
+            for line in bid_lines
+        ])
+
+    @api.model
+    def _record_order_lines(self, order_lines):
+        """Record the purchase order lines awarded from such bid lines."""
+        order_lines = order_lines.filtered('rfq_bid_line_id.rfq_line_id.purchase_request_line_id')
+        return self.sudo().create([
+            {
+                'event': 'award',
+                'request_id': rfq_line.purchase_request_line_id.request_id.id,
+                'request_line_id': rfq_line.purchase_request_line_id.id,
+                'rfq_id': rfq_line.order_id.id,
+                'rfq_line_id': rfq_line.id,
+                'bid_id': line.rfq_bid_line_id.bid_id.id,
+                'bid_line_id': line.rfq_bid_line_id.id,
+                'order_id': line.order_id.id,
+                'order_line_id': line.id,
+            }
+            for line in order_lines
+            for rfq_line in [line.rfq_bid_line_id.rfq_line_id]
+        ])
+
+    # -------------------------------------------------------------------------
+    # Timeline
+    # -------------------------------------------------------------------------
+    @api.model
+    def _get_timeline(self, request_ids=None, order_id=None):
+        """Return the status timeline of requests, or of the requests of an RFQ or order.
+
+        The whole timeline (request, approval, RFQs, bids, purchase orders
+        with their current status) is read with a single query.
+
+        :return: list of dicts ``{'event', 'date', 'model', 'res_id', 'name',
+                 'state', 'line_count'}`` in chronological order
+        """
+        if order_id:
+            # The order is either an RFQ or an order awarded from one
+            scope = SQL(
+                "SELECT request_id FROM purchase_lineage WHERE order_id = %s OR rfq_id = %s",
+                order_id, order_id,
+            )
+        else:
+            scope = SQL("SELECT unnest(%s::int[]) AS request_id", list(request_ids or []))
+        self.env.cr.execute(SQL(
+            """
+            WITH requests AS (%(scope)s),
+                 lineage AS (
+                    SELECT l.* FROM purchase_lineage l
+                     WHERE l.request_id IN (SELECT request_id FROM requests)
+                 )
+            SELECT 'request', pr.create_date, 'purchase.request', pr.id, pr.name, pr.state,
+                   (SELECT count(*) FROM purchase_request_line prl WHERE prl.request_id = pr.id)
+              FROM purchase_request pr
+             WHERE pr.id IN (SELECT request_id FROM requests)
+            UNION ALL
+            SELECT 'approved', pr.approved_date, 'purchase.request', pr.id, pr.name, pr.state, NULL
+              FROM purchase_request pr
+             WHERE pr.id IN (SELECT request_id FROM requests)
+               AND pr.approved_date IS NOT NULL
+            UNION ALL
+            SELECT 'rfq', min(l.create_date), 'purchase.order', rfq.id, rfq.name, rfq.state,
+                   count(DISTINCT l.rfq_line_id)
+              FROM lineage l
+              JOIN purchase_order rfq ON rfq.id = l.rfq_id
+             WHERE l.event = 'rfq'
+          GROUP BY rfq.id
+            UNION ALL
+            SELECT 'bid', min(l.create_date), 'purchase.rfq.bid', bid.id, bid.name, bid.state,
+                   count(DISTINCT l.bid_line_id)
+              FROM lineage l
+              JOIN purchase_rfq_bid bid ON bid.id = l.bid_id
+             WHERE l.event = 'bid'
+          GROUP BY bid.id
+            UNION ALL
+            SELECT 'award', min(l.create_date), 'purchase.order', po.id, po.name, po.state,
+                   count(DISTINCT l.order_line_id)
+              FROM lineage l
+              JOIN purchase_order po ON po.id = l.order_id
+             WHERE l.event = 'award'
+          GROUP BY po.id
+          ORDER BY 2, 1
+            """,
+            scope=scope,
+        ))
+        return [
+            {
+                'event': event,
+                'date': date,
+                'model': model,
+                'res_id': res_id,
+                'name': name,
+                'state': state,
+                'line_count': line_count,
+            }
+            for event, date, model, res_id, name, state, line_count in self.env.cr.fetchall()
+        ]
+
+    @api.model
+    def _action_view(self, domain):
+        return {
+            'name': _('Traceability'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.lineage',
+            'view_mode': 'list',
+            'domain': domain,
+            'context': {'search_default_group_event': 1},
+        }
@@ -24,6 +24,29 @@ class PurchaseOrder(models.Model):
         for order in self:
             order.purchase_request_count = 1 if order.purchase_request_id else 0
 
+    def button_cancel(self):
+        res = super().button_cancel()
+        # A request commits its budget through its RFQ until a bid is
+        # awarded, then through the order awarded from it
+        orders = self.filtered(lambda order: not order.awarded_bid_id) | self.sudo().search([
+            ('award_snapshot_id.purchase_order_id', 'in', self.ids),
+        ]).with_env(self.env)
+        for request in orders.purchase_request_id:
+            request._set_budget_commitment('release', 0.0)
+        return res
+
+    def action_view_lineage(self):
+        """View the request lines, RFQ and bids this order comes from."""
+        self.ensure_one()
+        return self.env['purchase.lineage']._action_view(
+            ['|', ('order_id', '=', self.id), ('rfq_id', '=', self.id)]
+        )
+
+    def _get_lineage_timeline(self):
+        """Return the status timeline of the requests behind this order."""
+        self.ensure_one()
+        return self.env['purchase.lineage']._get_timeline(order_id=self.id)
+
     def action_view_purchase_request(self):
         """View the originating purchase request."""
         self.ensure_one()
@@ -37,3 +60,24 @@ class PurchaseOrder(models.Model):
             'view_mode': 'form',
             'target': 'current',
         }
+
+
+class PurchaseOrderLine(models.Model):
+    _inherit = 'purchase.order.line'
+
+    purchase_request_line_id = fields.Many2one(
+        'purchase.request.line',
+        string='Purchase Request Line',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        help='The request line this RFQ line was created from.',
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        Lineage = self.env['purchase.lineage']
+        Lineage._record_rfq_lines(lines)
+        Lineage._record_order_lines(lines)
+        return lines
@@ -1,17 +1,28 @@
 # -*- coding: utf-8 -*-
 # Part of Purchase Request module.
 
-from odoo import api, fields, models, _
-from odoo.exceptions import UserError
+from collections import defaultdict
+
+from odoo import api, fields, models, _, Command
+from odoo.exceptions import AccessError, UserError
+from odoo.osv import expression
+from odoo.tools import SQL, float_compare
+
+from odoo.addons.purchase_rfq_multi_vendor.tools import profiled_action
+
+# Maximum number of requests accepted by one intake call
+MAX_INTAKE_BATCH = 1000
 
 
 class PurchaseRequest(models.Model):
     _name = 'purchase.request'
     _description = 'Purchase Request'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['purchase.audit.mixin', 'mail.thread', 'mail.activity.mixin', 'purchase.job.mixin']
     _order = 'name desc'
     _rec_name = 'name'
 
+    _audit_fields = ('employee_id', 'request_date', 'date_required', 'state', 'priority')
+
     name = fields.Char(
         string='Request Reference',
         required=True,
@@ -23,15 +34,14 @@ class PurchaseRequest(models.Model):
     description = fields.Text(
         string='Purpose / Justification',
         help='Explain why this purchase is needed.',
+        index='trigram',
     )
 
     employee_id = fields.Many2one(
         'hr.employee',
         string='Requested By',
         required=True,
-        default=lambda self: self.env['hr.employee'].search(
-            [('user_id', '=', self.env.uid)], limit=1
-        ),
+        default=lambda self: self.env['hr.employee']._get_purchase_request_default_employee(),
         tracking=True,
     )
     department_id = fields.Many2one(
@@ -127,6 +137,107 @@ class PurchaseRequest(models.Model):
         ('2', 'Very Urgent'),
     ], string='Priority', default='0', tracking=True)
 
+    budget_id = fields.Many2one(
+        'purchase.request.budget',
+        string='Budget',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        help='Department budget this request is committed on, set on approval.',
+    )
+    budget_committed = fields.Monetary(
+        string='Committed on Budget',
+        readonly=True,
+        copy=False,
+        currency_field='currency_id',
+        help='Amount this request currently holds on its budget: the estimate '
+             'once approved, then the RFQ amount and finally the awarded bid.',
+    )
+    budget_exceeded = fields.Boolean(
+        compute='_compute_budget_exceeded',
+        string='Over Budget',
+    )
+    budget_remaining = fields.Monetary(
+        compute='_compute_budget_exceeded',
+        string='Remaining Budget',
+        currency_field='currency_id',
+    )
+
+    approval_ids = fields.One2many(
+        'purchase.request.approval',
+        'request_id',
+        string='Approval Steps',
+        readonly=True,
+        copy=False,
+    )
+    can_approve = fields.Boolean(
+        compute='_compute_can_approve',
+        search='_search_can_approve',
+        string='Can Approve',
+        help='The current user has a pending approval step on this request, '
+             'or is a purchase manager.',
+    )
+
+    intake_key = fields.Char(
+        string='Intake Key',
+        readonly=True,
+        copy=False,
+        help='Idempotency key given by the external system that pushed this request.',
+    )
+
+    approval_notified = fields.Boolean(
+        string='Approvers Notified',
+        readonly=True,
+        copy=False,
+        help='Set once the approvers were notified, immediately or through the digest.',
+    )
+
+    _sql_constraints = [
+        ('intake_key_company_uniq',
+         'UNIQUE(company_id, intake_key)',
+         'A request with this intake key already exists.'),
+    ]
+
+    def init(self):
+        self._init_name_trigram_index()
+        # Workload counters only look at the requests still waiting for someone
+        for index_name, where in (
+            ('purchase_request_submitted_index', SQL("state = 'submitted'")),
+            ('purchase_request_approved_no_rfq_index', SQL("state = 'approved' AND rfq_id IS NULL")),
+        ):
+            self.env.cr.execute(SQL(
+                "CREATE INDEX IF NOT EXISTS %s ON %s (company_id) WHERE %s",
+                SQL.identifier(index_name), SQL.identifier(self._table), where,
+            ))
+
+    def _init_name_trigram_index(self):
+        """Index the reference for ``ilike`` searches next to its btree index.
+
+        The btree ``purchase_request_name_index`` serves the ordering and the
+        exact lookups. A trigram index created earlier under that name is
+        renamed, so the ORM creates the btree again.
+        """
+        if not self.env.registry.has_trigram:
+            return
+        self.env.cr.execute(SQL(
+            """
+            SELECT am.amname
+              FROM pg_class idx
+              JOIN pg_am am ON am.oid = idx.relam
+             WHERE idx.relname = 'purchase_request_name_index'
+            """
+        ))
+        row = self.env.cr.fetchone()
+        self.env.cr.execute(SQL("SELECT 1 FROM pg_class WHERE relname = 'purchase_request_name_trgm_index'"))
+        if row and row[0] == 'gin' and not self.env.cr.fetchone():
+            self.env.cr.execute(SQL(
+                "ALTER INDEX purchase_request_name_index RENAME TO purchase_request_name_trgm_index"
+            ))
+        self.env.cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS purchase_request_name_trgm_index ON %s USING gin (name gin_trgm_ops)",
+            SQL.identifier(self._table),
+        ))
+
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
@@ -148,30 +259,477 @@ class PurchaseRequest(models.Model):
         for request in self:
             request.rfq_count = 1 if request.rfq_id else 0
 
+    @api.depends_context('uid')
+    @api.depends('state', 'approval_ids.state', 'approval_ids.approver_user_id')
+    def _compute_can_approve(self):
+        # Purchase managers may approve any pending level, and requests
+        # routed before any rule existed
+        is_manager = self.env.user.has_group('purchase.group_purchase_manager')
+        for request in self:
+            if request.state != 'submitted':
+                request.can_approve = False
+            elif is_manager:
+                request.can_approve = True
+            else:
+                request.can_approve = any(
+                    step.state == 'pending' and step.approver_user_id == self.env.user
+                    for step in request.approval_ids
+                )
+
+    def _search_can_approve(self, operator, value):
+        if operator not in ('=', '!='):
+            raise UserError(_('Unsupported search on "Can Approve".'))
+        domain = [('state', '=', 'submitted')]
+        if not self.env.user.has_group('purchase.group_purchase_manager'):
+            domain.append(('approval_ids', 'any', [
+                ('state', '=', 'pending'),
+                ('approver_user_id', '=', self.env.uid),
+            ]))
+        if (operator == '=') != bool(value):
+            return ['!', *expression.normalize_domain(domain)]
+        return domain
+
+    @api.depends('budget_id.committed_amount', 'budget_committed', 'estimated_total',
+                 'department_id', 'request_date')
+    def _compute_budget_exceeded(self):
+        for request in self:
+            budget = request._get_budget()
+            if not budget:
+                request.budget_exceeded = False
+                request.budget_remaining = 0.0
+                continue
+            request.budget_remaining = budget.remaining_amount
+            # Once approved the request is already part of the committed amount
+            pending = request.estimated_total - request.budget_committed
+            request.budget_exceeded = request.currency_id.compare_amounts(
+                pending, budget.remaining_amount
+            ) > 0
+
+    # -------------------------------------------------------------------------
+    # Budget Control
+    # -------------------------------------------------------------------------
+    @api.model
+    def _get_budget_control(self):
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'purchase_request.budget_control', 'warning'
+        )
+
+    def _get_budget(self):
+        self.ensure_one()
+        if self.budget_id:
+            return self.budget_id
+        if not self.department_id:
+            return self.env['purchase.request.budget']
+        return self.env['purchase.request.budget'].sudo()._find_budget(
+            self.department_id, self.company_id, self.request_date
+        )
+
+    def _set_budget_commitment(self, event, amount):
+        """Make ``amount`` the committed spend of this request.
+
+        Only the difference with the current commitment is booked: one
+        ledger entry and one in-place increment of the budget total, so the
+        check does not depend on the number of requests of the budget. In
+        block mode only the approval is refused over budget; the later
+        events post the warning.
+        """
+        self.ensure_one()
+        budget = self._get_budget()
+        if not budget:
+            return
+        delta = amount - self.budget_committed
+        if self.currency_id.is_zero(delta):
+            return
+        Ledger = self.env['purchase.request.budget.ledger'].sudo()
+        Ledger.create({
+            'budget_id': budget.id,
+            'request_id': self.id,
+            'event': event,
+            'amount': delta,
+        })
+        committed = Ledger._increment_budget(budget, delta)
+        self.write({'budget_id': budget.id, 'budget_committed': amount})
+
+        if delta > 0 and self.currency_id.compare_amounts(committed, budget.amount) > 0:
+            message = _(
+                'Budget %(budget)s is exceeded: %(committed)s committed for %(amount)s.',
+                budget=budget.name,
+                committed=self.currency_id.format(committed),
+                amount=self.currency_id.format(budget.amount),
+            )
+            # An approved request is never stopped once it is being sourced
+            if event == 'approval' and self._get_budget_control() == 'block':
+                raise UserError(message)
+            self._post_transition_message(message)
+
+    # -------------------------------------------------------------------------
+    # Notifications
+    # -------------------------------------------------------------------------
+    @api.model
+    def _get_notification_mode(self):
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'purchase_request.notification_mode', 'immediate'
+        )
+
+    def _get_approval_users(self):
+        """Return the users who must approve this request at its current level."""
+        self.ensure_one()
+        steps = self.approval_ids.filtered(lambda step: step.state != 'cancelled')
+        if steps:
+            return steps.filtered(lambda step: step.state == 'pending').approver_user_id
+        chain = self.env['hr.employee']._get_purchase_request_chain(self.employee_id.id)
+        return self.env['res.users'].browse(chain['manager_user_id'])
+
+    # -------------------------------------------------------------------------
+    # Approval Routing
+    # -------------------------------------------------------------------------
+    def _get_rule_approvers(self, rule):
+        """Return the users of a compiled ``rule`` for this request."""
+        self.ensure_one()
+        chain = self.env['hr.employee']._get_purchase_request_chain(self.employee_id.id)
+        if rule.approver_type == 'manager':
+            return self.env['res.users'].browse(chain['manager_user_id'])
+        if rule.approver_type == 'department_manager':
+            return self.env['res.users'].browse(chain['department_manager_user_id'])
+        return self.env['res.users'].browse(rule.user_ids)
+
+    def _route_approvals(self):
+        """Create the approval steps of the requests of ``self``.
+
+        Each company's rules are compiled once into a cached decision table,
+        so routing a batch of requests runs no rule query per request. All
+        steps are created in one batch; the lowest level is pending, the
+        other ones wait for it.
+        """
+        Rule = self.env['purchase.request.approval.rule']
+        Employee = self.env['hr.employee']
+        Approval = self.env['purchase.request.approval'].sudo()
+        self.approval_ids.filtered(
+            lambda step: step.state in ('waiting', 'pending')
+        ).sudo().write({'state': 'cancelled'})
+
+        vals_list = []
+        for company, requests in self.grouped('company_id').items():
+            table = Rule._get_decision_table(company.id)
+            for request in requests:
+                category_ids = {
+                    int(category_id)
+                    for path in request.line_ids.product_id.categ_id.mapped('parent_path')
+                    for category_id in path.split('/') if category_id
+                }
+                steps = [
+                    (rule.level, rule.id, request._get_rule_approvers(rule))
+                    for rule in Rule._match_rules(
+                        table, request.estimated_total, request.department_id.id,
+                        request.priority, category_ids,
+                    )
+                ]
+                steps = [step for step in steps if step[2]]
+                if not steps:
+                    chain = Employee._get_purchase_request_chain(request.employee_id.id)
+                    manager_user = self.env['res.users'].browse(chain['manager_user_id'])
+                    steps = [(1, False, manager_user)] if manager_user else []
+                if not steps:
+                    continue
+                first_level = min(level for level, _rule_id, _users in steps)
+                seen = set()
+                for level, rule_id, users in steps:
+                    for user in users:
+                        if (level, rule_id, user.id) in seen:
+                            continue
+                        seen.add((level, rule_id, user.id))
+                        vals_list.append({
+                            'request_id': request.id,
+                            'rule_id': rule_id,
+                            'level': level,
+                            'approver_user_id': user.id,
+                            'state': 'pending' if level == first_level else 'waiting',
+                        })
+        Approval.create(vals_list)
+
+    def _get_my_pending_steps(self, pending):
+        """Return the steps of ``pending`` the current user acts on.
+
+        Purchase managers act on the whole current level when none of its
+        steps is theirs.
+        """
+        mine = pending.filtered(lambda step: step.approver_user_id == self.env.user)
+        if not mine and self.env.user.has_group('purchase.group_purchase_manager'):
+            return pending
+        return mine
+
+    def _approve_current_level(self):
+        """Record the approval of the current user on its pending steps.
+
+        Returns True once no step is left, i.e. the request is fully approved.
+        """
+        self.ensure_one()
+        steps = self.approval_ids.sudo().filtered(lambda step: step.state != 'cancelled')
+        pending = steps.filtered(lambda step: step.state == 'pending')
+        if not pending:
+            return True
+        mine = self._get_my_pending_steps(pending)
+        # A step is approved by any of its approvers
+        approved_keys = {(step.level, step.rule_id) for step in mine}
+        pending.filtered(
+            lambda step: (step.level, step.rule_id) in approved_keys
+        ).write({
+            'state': 'approved',
+            'approved_by': self.env.uid,
+            'approved_date': fields.Datetime.now(),
+        })
+        if steps.filtered(lambda step: step.state == 'pending'):
+            return False
+        waiting = steps.filtered(lambda step: step.state == 'waiting')
+        if not waiting:
+            return True
+        next_level = min(waiting.mapped('level'))
+        waiting.filtered(lambda step: step.level == next_level).write({'state': 'pending'})
+        self._post_transition_message(
+            _('Level %(level)s approved by %(user)s.', level=mine[:1].level, user=self.env.user.name)
+        )
+        self._notify_approvers()
+        return False
+
+    def _notify_approvers(self):
+        """Schedule one approval activity per approver and request."""
+        for request in self:
+            for user in request._get_approval_users():
+                request.activity_schedule(
+                    'mail.mail_activity_data_todo',
+                    user_id=user.id,
+                    summary=_('Purchase Request "%s" needs approval') % request.name,
+                    note=_(
+                        'Employee %s has submitted a purchase request that needs your review.'
+                    ) % request.employee_id.name,
+                )
+        self.write({'approval_notified': True})
+
+    def _post_transition_message(self, body):
+        """Post a workflow message on the chatter.
+
+        In digest mode the message is only logged: the audit trail is kept
+        but followers are not notified of every single transition.
+        """
+        self.ensure_one()
+        if self._get_notification_mode() == 'immediate':
+            return self.message_post(body=body, message_type='notification')
+        return self._message_log(body=body, message_type='notification')
+
+    @api.model
+    def _cron_send_approval_digest(self):
+        """Send one aggregated notification per approver for new submissions."""
+        mode = self._get_notification_mode()
+        if mode == 'immediate':
+            return
+        requests = self.search([
+            ('state', '=', 'submitted'),
+            ('approval_notified', '=', False),
+        ], order='priority desc, id')
+        requests_by_user = defaultdict(lambda: self.browse())
+        for request in requests:
+            for user in request._get_approval_users():
+                requests_by_user[user] |= request
+
+        mail_vals_list = []
+        for user, user_requests in requests_by_user.items():
+            if mode == 'digest_activity':
+                user_requests[:1].activity_schedule(
+                    'mail.mail_activity_data_todo',
+                    user_id=user.id,
+                    summary=_('%d purchase request(s) need your approval') % len(user_requests),
+                    note=self._render_approval_digest(user, user_requests),
+                )
+            elif user.partner_id.email:
+                mail_vals_list.append({
+                    'subject': _('%d purchase request(s) need your approval') % len(user_requests),
+                    'body_html': self._render_approval_digest(user, user_requests),
+                    'email_from': self.env.company.email_formatted or user.company_id.email_formatted,
+                    'recipient_ids': [(4, user.partner_id.id)],
+                    'auto_delete': True,
+                })
+        if mail_vals_list:
+            self.env['mail.mail'].sudo().create(mail_vals_list)
+        requests.write({'approval_notified': True})
+
+    @api.model
+    def _render_approval_digest(self, user, requests):
+        return self.env['ir.qweb']._render(
+            'purchase_request.purchase_request_approval_digest',
+            {'user': user, 'requests': requests},
+        )
+
+    # -------------------------------------------------------------------------
+    # Intake API
+    # -------------------------------------------------------------------------
+    @api.model
+    def intake_requests(self, items, auto_submit=False):
+        """Create a batch of requests pushed by an external system.
+
+        Each item is a dict::
+
+            {'key': str, 'employee_id': int or 'employee_email': str,
+             'description': str, 'date_required': 'YYYY-MM-DD', 'priority': '0',
+             'lines': [{'product_id': int or 'default_code': str,
+                        'quantity': float, 'estimated_unit_price': float,
+                        'description': str, 'specifications': str}]}
+
+        Items whose ``key`` already exists are not created again, so a
+        client may safely retry a batch. Employees and products of the whole
+        batch are resolved with one query each and all requests (with their
+        lines) are created with a single ``create`` call.
+
+        :return: one ``{'key', 'status', 'id', 'name'}`` per item, where
+                 status is ``created``, ``existing`` or ``error`` (with an
+                 ``error`` message)
+        """
+        if not self.env.user.has_group('purchase.group_purchase_user'):
+            raise AccessError(_('Only purchase users can push purchase requests.'))
+        if len(items) > MAX_INTAKE_BATCH:
+            raise UserError(_('At most %d requests can be pushed at once.') % MAX_INTAKE_BATCH)
+
+        company = self.env.company
+        keys = [item.get('key') for item in items]
+        existing = {
+            request.intake_key: request
+            for request in self.sudo().search_fetch(
+                [('company_id', '=', company.id), ('intake_key', 'in', [key for key in keys if key])],
+                ['intake_key', 'name'],
+            )
+        }
+
+        # Bulk lookups
+        Employee = self.env['hr.employee'].sudo()
+        emails = {item['employee_email'].lower() for item in items if item.get('employee_email')}
+        employee_by_email = {
+            employee.work_email.lower(): employee.id
+            for employee in Employee.search_fetch(
+                [('work_email', 'in', list(emails)), ('company_id', '=', company.id)], ['work_email'],
+            )
+        } if emails else {}
+        # Employees given by id must belong to the intake company too
+        employee_ids = [item['employee_id'] for item in items if item.get('employee_id')]
+        valid_employee_ids = set(employee_by_email.values()) | set(Employee.search([
+            ('id', 'in', employee_ids), ('company_id', '=', company.id),
+        ]).ids if employee_ids else [])
+        Product = self.env['product.product']
+        codes = {
+            line['default_code'] for item in items for line in item.get('lines') or []
+            if line.get('default_code')
+        }
+        product_by_code = {
+            product.default_code: product.id
+            for product in Product.search_fetch(
+                [('default_code', 'in', list(codes)), ('purchase_ok', '=', True)], ['default_code'],
+            )
+        } if codes else {}
+        product_ids = [
+            line['product_id'] for item in items for line in item.get('lines') or []
+            if line.get('product_id')
+        ]
+        valid_product_ids = set(product_by_code.values()) | set(Product.search([
+            ('id', 'in', product_ids), ('purchase_ok', '=', True),
+        ]).ids if product_ids else [])
+
+        results = []
+        vals_list = []
+        to_create = []
+        seen = set()
+        for item in items:
+            key = item.get('key')
+            result = {'key': key}
+            results.append(result)
+            if not key:
+                result.update(status='error', error=_('Missing key.'))
+                continue
+            if key in existing:
+                result.update(status='existing', id=existing[key].id, name=existing[key].name)
+                continue
+            if key in seen:
+                result.update(status='error', error=_('Duplicate key in the batch.'))
+                continue
+            seen.add(key)
+
+            employee_id = item.get('employee_id')
+            if item.get('employee_email'):
+                employee_id = employee_by_email.get(item['employee_email'].lower())
+            if employee_id not in valid_employee_ids:
+                result.update(status='error', error=_('Unknown employee in this company.'))
+                continue
+
+            line_vals_list = []
+            for line in item.get('lines') or []:
+                product_id = line.get('product_id')
+                if line.get('default_code'):
+                    product_id = product_by_code.get(line['default_code'])
+                if product_id not in valid_product_ids:
+                    line_vals_list = None
+                    break
+                line_vals = {
+                    'product_id': product_id,
+                    'quantity': line.get('quantity', 1.0),
+                    'estimated_unit_price': line.get('estimated_unit_price', 0.0),
+                    'specifications': line.get('specifications'),
+                }
+                if line.get('description'):
+                    line_vals['description'] = line['description']
+                line_vals_list.append(Command.create(line_vals))
+            if not line_vals_list:
+                result.update(status='error', error=_('Missing, unknown or non-purchasable products.'))
+                continue
+
+            vals = {
+                'intake_key': key,
+                'employee_id': employee_id,
+                'company_id': company.id,
+                'description': item.get('description'),
+                'line_ids': line_vals_list,
+            }
+            for fname in ('date_required', 'priority'):
+                if item.get(fname):
+                    vals[fname] = item[fname]
+            vals_list.append(vals)
+            to_create.append(result)
+
+        requests = self.create(vals_list)
+        if auto_submit:
+            requests._submit()
+        for result, request in zip(to_create, requests):
+            result.update(status='created', id=request.id, name=request.name)
+        return results
+
     # -------------------------------------------------------------------------
     # State Transition Actions
     # -------------------------------------------------------------------------
+    @profiled_action
     def action_submit(self):
         """Submit the request for approval."""
         self.ensure_one()
         if not self.line_ids:
             raise UserError(_('Cannot submit a request without any lines.'))
-        self.write({'state': 'submitted'})
-
-        # Notify the department manager if exists
-        if self.manager_id and self.manager_id.user_id:
-            self.activity_schedule(
-                'mail.mail_activity_data_todo',
-                user_id=self.manager_id.user_id.id,
-                summary=_('Purchase Request "%s" needs approval') % self.name,
-                note=_(
-                    'Employee %s has submitted a purchase request that needs your review.'
-                ) % self.employee_id.name,
-            )
+        self._submit()
+
+    def _submit(self):
+        """Submit the requests of ``self`` and route their approvals in one batch."""
+        self.write({'state': 'submitted', 'approval_notified': False})
+        self._route_approvals()
 
+        # Approvers are notified right away unless digests are enabled
+        if self._get_notification_mode() == 'immediate':
+            self._notify_approvers()
+
+    @profiled_action
     def action_approve(self):
-        """Approve the purchase request."""
+        """Approve the current level of the purchase request.
+
+        The request itself is approved once its last level is.
+        """
         self.ensure_one()
+        if not self.can_approve:
+            raise UserError(_('You are not an approver of this request at its current level.'))
+        if not self._approve_current_level():
+            return
+        self._set_budget_commitment('approval', self.estimated_total)
         self.write({
             'state': 'approved',
             'approved_by': self.env.uid,
@@ -179,20 +737,34 @@ class PurchaseRequest(models.Model):
         })
 
         # Post a chatter message
-        self.message_post(
-            body=_('Purchase request approved by %s.') % self.env.user.name,
-            message_type='notification',
+        self._post_transition_message(
+            _('Purchase request approved by %s.') % self.env.user.name
         )
 
+    @profiled_action
     def action_reject(self):
         """Reject the purchase request."""
         self.ensure_one()
+        if not self.can_approve:
+            raise UserError(_('You are not an approver of this request at its current level.'))
+        open_steps = self.approval_ids.sudo().filtered(
+            lambda step: step.state in ('waiting', 'pending')
+        )
+        self._get_my_pending_steps(
+            open_steps.filtered(lambda step: step.state == 'pending')
+        ).write({
+            'state': 'rejected',
+            'approved_by': self.env.uid,
+            'approved_date': fields.Datetime.now(),
+        })
+        open_steps.filtered(lambda step: step.state != 'rejected').write({'state': 'cancelled'})
+        self._set_budget_commitment('release', 0.0)
         self.write({'state': 'rejected'})
-        self.message_post(
-            body=_('Purchase request rejected by %s.') % self.env.user.name,
-            message_type='notification',
+        self._post_transition_message(
+            _('Purchase request rejected by %s.') % self.env.user.name
         )
 
+    @profiled_action
     def action_cancel(self):
         """Cancel the purchase request."""
         self.ensure_one()
@@ -200,21 +772,86 @@ class PurchaseRequest(models.Model):
             raise UserError(
                 _('Cannot cancel a request that already has an RFQ. Cancel the RFQ first.')
             )
+        self._set_budget_commitment('release', 0.0)
+        self.approval_ids.sudo().filtered(
+            lambda step: step.state in ('waiting', 'pending')
+        ).write({'state': 'cancelled'})
         self.write({'state': 'cancelled'})
 
+    @profiled_action
     def action_reset_draft(self):
         """Reset to draft state."""
         self.ensure_one()
         self.write({'state': 'draft'})
 
+    def _get_rfq_line_quantities(self):
+        """Return the quantity to order for each line of the requests.
+
+        Hook for modules that net the demand before the RFQ is created.
+
+        :return: dict ``{request line id: quantity in the line unit}``
+        """
+        return {line.id: line.quantity for line in self.line_ids}
+
+    def _close_without_rfq(self):
+        """Called when no line of the request is left to order.
+
+        Hook for modules covering the demand by other means; they close the
+        request and return an empty recordset of ``purchase.order``.
+        """
+        raise UserError(_('Every requested item is already covered; there is nothing to order.'))
+
+    @profiled_action
     def action_create_rfq(self):
-        """Create an RFQ from the approved purchase request."""
+        """Create an RFQ from the approved purchase request.
+
+        Requests with many lines are converted by a background job.
+        """
+        self.ensure_one()
+        self._check_rfq_creation()
+        Job = self.env['purchase.job']
+        if Job._should_enqueue(len(self.line_ids)):
+            return Job._enqueue(self, '_job_create_rfq', _('Create RFQ from %s') % self.name)._action_notify()
+
+        rfq = self._create_rfq()
+        if not rfq:
+            return
+        return {
+            'name': _('Request for Quotation'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.order',
+            'res_id': rfq.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def _job_create_rfq(self):
+        """Create the RFQs of the requests from a background job."""
+        rfqs = self.env['purchase.order']
+        for request in self.filtered(lambda r: r.state == 'approved'):
+            rfqs |= request._create_rfq()
+        return rfqs
+
+    def _check_rfq_creation(self):
         self.ensure_one()
         if self.state != 'approved':
             raise UserError(_('Can only create RFQ from an approved request.'))
         if not self.line_ids:
             raise UserError(_('Cannot create an RFQ without request lines.'))
 
+    def _create_rfq(self):
+        """Create the RFQ of the approved request and return it."""
+        self.ensure_one()
+        self._check_rfq_creation()
+        quantities = self._get_rfq_line_quantities()
+        lines_to_order = self.line_ids.filtered(
+            lambda l: float_compare(
+                quantities[l.id], 0.0, precision_rounding=l.product_uom_id.rounding,
+            ) > 0
+        )
+        if not lines_to_order:
+            return self._close_without_rfq()
+
         # Create a new draft RFQ (partner_id will be set later via multi-vendor)
         # Use a dummy or first available vendor as placeholder since partner_id is required
         # The actual vendors will be added via the RFQ Vendors tab
@@ -235,22 +872,30 @@ class PurchaseRequest(models.Model):
 
         rfq = self.env['purchase.order'].create(rfq_vals)
 
-        # Create RFQ lines from request lines
-        for line in self.line_ids:
-            po_line_vals = {
+        # Create RFQ lines from request lines (their lineage is recorded
+        # by purchase.order.line.create)
+        self.env['purchase.order.line'].create([
+            {
                 'order_id': rfq.id,
+                'purchase_request_line_id': line.id,
                 'product_id': line.product_id.id,
                 'name': line.description or line.product_id.display_name,
-                'product_qty': line.quantity,
+                'product_qty': quantities[line.id],
                 'product_uom': line.product_uom_id.id,
                 'price_unit': line.estimated_unit_price,
                 'date_planned': self.date_required or fields.Datetime.now(),
             }
-            self.env['purchase.order.line'].create(po_line_vals)
+            for line in lines_to_order
+        ])
 
         # Link the RFQ back to this request
         rfq.write({'purchase_request_id': self.id})
 
+        # The RFQ amount replaces the estimate on the budget
+        self._set_budget_commitment('rfq', rfq.currency_id._convert(
+            rfq.amount_untaxed, self.currency_id, self.company_id, fields.Date.context_today(self),
+        ))
+
         # Update request state
         self.write({
             'state': 'rfq_created',
@@ -258,11 +903,10 @@ class PurchaseRequest(models.Model):
         })
 
         # Post message on both records
-        self.message_post(
-            body=_(
+        self._post_transition_message(
+            _(
                 'RFQ <a href="/odoo/purchase/%s">%s</a> has been created from this request.'
-            ) % (rfq.id, rfq.name),
-            message_type='notification',
+            ) % (rfq.id, rfq.name)
         )
         rfq.message_post(
             body=_(
@@ -270,16 +914,30 @@ class PurchaseRequest(models.Model):
             ) % (self.name, self.employee_id.name, self.department_id.name or ''),
             message_type='notification',
         )
+        return rfq
 
+    def action_open_catalog(self):
+        """Pick many products with their quantities at once."""
+        self.ensure_one()
         return {
-            'name': _('Request for Quotation'),
+            'name': _('Add Products'),
             'type': 'ir.actions.act_window',
-            'res_model': 'purchase.order',
-            'res_id': rfq.id,
+            'res_model': 'purchase.request.catalog.wizard',
             'view_mode': 'form',
-            'target': 'current',
+            'target': 'new',
+            'context': {'default_request_id': self.id},
         }
 
+    def action_view_lineage(self):
+        """View every RFQ, bid and purchase order line coming from this request."""
+        self.ensure_one()
+        return self.env['purchase.lineage']._action_view([('request_id', '=', self.id)])
+
+    def _get_lineage_timeline(self):
+        """Return the status timeline of this request (see purchase.lineage)."""
+        self.ensure_one()
+        return self.env['purchase.lineage']._get_timeline(request_ids=self.ids)
+
     def action_view_rfq(self):
         """View the generated RFQ."""
         self.ensure_one()
@@ -320,6 +978,7 @@ class PurchaseRequestLine(models.Model):
         compute='_compute_description',
         store=True,
         readonly=False,
+        index='trigram',
     )
     quantity = fields.Float(
         string='Quantity',
@@ -341,6 +1000,9 @@ class PurchaseRequestLine(models.Model):
     estimated_unit_price = fields.Float(
         string='Est. Unit Price',
         digits='Product Price',
+        compute='_compute_estimated_unit_price',
+        store=True,
+        readonly=False,
         help='Estimated unit price for budgeting purposes.',
     )
     estimated_cost = fields.Monetary(
@@ -366,6 +1028,7 @@ class PurchaseRequestLine(models.Model):
     specifications = fields.Text(
         string='Specifications',
         help='Technical specifications or special requirements.',
+        index='trigram',
     )
 
     @api.depends('product_id')
@@ -378,18 +1041,46 @@ class PurchaseRequestLine(models.Model):
 
     @api.depends('product_id')
     def _compute_product_uom_id(self):
+        default_uom = self.env.ref('uom.product_uom_unit', raise_if_not_found=False)
         for line in self:
             if line.product_id:
                 line.product_uom_id = line.product_id.uom_po_id or line.product_id.uom_id
             if not line.product_uom_id:
-                line.product_uom_id = self.env.ref('uom.product_uom_unit', raise_if_not_found=False)
+                line.product_uom_id = default_uom
+
+    @api.depends('product_id')
+    def _compute_estimated_unit_price(self):
+        for line in self:
+            line.estimated_unit_price = line.product_id.standard_price
 
     @api.depends('quantity', 'estimated_unit_price')
     def _compute_estimated_cost(self):
         for line in self:
             line.estimated_cost = line.quantity * line.estimated_unit_price
 
-    @api.onchange('product_id')
-    def _onchange_product_id(self):
-        if self.product_id:
-            self.estimated_unit_price = self.product_id.standard_price
+    @api.model
+    def _create_from_products(self, request, product_quantities):
+        """Append one line per ``(product, quantity)`` to ``request``.
+
+        Names, purchase units and costs of all the products are read in
+        one go and passed to a single batched create, so no per-line
+        compute runs whatever the number of products.
+        """
+        products = self.env['product.product'].concat(*(p for p, _qty in product_quantities))
+        products = products.with_company(request.company_id)
+        products.fetch(['uom_id', 'uom_po_id', 'standard_price'])
+        names = dict(zip(products.ids, products.mapped('display_name')))
+        sequence = max(request.line_ids.mapped('sequence'), default=0)
+        vals_list = []
+        for index, (product, quantity) in enumerate(product_quantities, start=1):
+            product = product.with_company(request.company_id)
+            vals_list.append({
+                'request_id': request.id,
+                'sequence': sequence + index,
+                'product_id': product.id,
+                'description': names[product.id],
+                'quantity': quantity,
+                'product_uom_id': (product.uom_po_id or product.uom_id).id,
+                'estimated_unit_price': product.standard_price,
+            })
+        return self.create(vals_list)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from collections import namedtuple
+
+from odoo import api, fields, models, tools
+from odoo.tools import SQL
+
+from odoo.addons.purchase_rfq_multi_vendor.tools import bump_table_version, get_table_version
+
+PRIORITIES = [
+    ('0', 'Normal'),
+    ('1', 'Urgent'),
+    ('2', 'Very Urgent'),
+]
+
+# One row of the compiled decision table (see _get_decision_table)
+CompiledRule = namedtuple('CompiledRule', [
+    'id', 'level', 'min_amount', 'max_amount', 'department_ids',
+    'priorities', 'category_ids', 'approver_type', 'user_ids',
+])
+
+
+class PurchaseRequestApprovalRule(models.Model):
+    _name = 'purchase.request.approval.rule'
+    _description = 'Purchase Request Approval Rule'
+    _order = 'company_id, level, sequence, id'
+
+    name = fields.Char(string='Rule', required=True)
+    sequence = fields.Integer(string='Sequence', default=10)
+    active = fields.Boolean(default=True)
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    currency_id = fields.Many2one(
+        'res.currency',
+        related='company_id.currency_id',
+        readonly=True,
+    )
+
+    level = fields.Integer(
+        string='Approval Level',
+        default=1,
+        required=True,
+        help='Levels are approved in ascending order; a level starts once '
+             'every step of the previous levels is approved.',
+    )
+
+    # Conditions (empty means "any")
+    min_amount = fields.Monetary(
+        string='Minimum Amount',
+        currency_field='currency_id',
+        help='Applies to requests whose estimated total is at least this amount.',
+    )
+    max_amount = fields.Monetary(
+        string='Maximum Amount',
+        currency_field='currency_id',
+        help='Applies to requests whose estimated total is below this amount. '
+             'Leave empty for no upper bound.',
+    )
+    department_ids = fields.Many2many(
+        'hr.department',
+        string='Departments',
+    )
+    priority = fields.Selection(
+        PRIORITIES,
+        string='Minimum Priority',
+        help='Applies to requests of at least this priority.',
+    )
+    product_category_ids = fields.Many2many(
+        'product.category',
+        string='Product Categories',
+        help='Applies when a line is in one of these categories or their children.',
+    )
+
+    # Approvers
+    approver_type = fields.Selection([
+        ('manager', "Employee's Manager"),
+        ('department_manager', 'Department Manager'),
+        ('users', 'Specific Users'),
+    ], string='Approved By', default='manager', required=True)
+    user_ids = fields.Many2many(
+        'res.users',
+        string='Approvers',
+        domain=[('share', '=', False)],
+        help='Any of these users can approve the step.',
+    )
+
+    # -------------------------------------------------------------------------
+    # Decision Table
+    # -------------------------------------------------------------------------
+    @api.model_create_multi
+    def create(self, vals_list):
+        rules = super().create(vals_list)
+        bump_table_version(self.env, self._table)
+        return rules
+
+    def write(self, vals):
+        res = super().write(vals)
+        bump_table_version(self.env, self._table)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        bump_table_version(self.env, self._table)
+        return res
+
+    @api.model
+    def _get_decision_table(self, company_id):
+        """Return the active rules of a company as a tuple of ``CompiledRule``.
+
+        The table only holds plain values, so matching a request against it
+        needs no query. It is cached per company and on the version of the
+        rule table, so it is missed whenever a rule is edited.
+        """
+        version = get_table_version(self.env, self._table)
+        return self._get_decision_table_cached(company_id, version)
+
+    @api.model
+    @tools.ormcache('company_id', 'version')
+    def _get_decision_table_cached(self, company_id, version):
+        rules = self.sudo().search([('company_id', '=', company_id)])
+        return tuple(
+            CompiledRule(
+                id=rule.id,
+                level=rule.level,
+                min_amount=rule.min_amount,
+                max_amount=rule.max_amount,
+                department_ids=frozenset(rule.department_ids.ids),
+                priorities=frozenset(
+                    value for value, _label in PRIORITIES
+                    if not rule.priority or value >= rule.priority
+                ),
+                category_ids=frozenset(rule.product_category_ids.ids),
+                approver_type=rule.approver_type,
+                user_ids=tuple(rule.user_ids.ids),
+            )
+            for rule in rules
+        )
+
+    @api.model
+    def _match_rules(self, table, amount, department_id, priority, category_ids):
+        """Return the compiled rules of ``table`` that apply to a request.
+
+        :param category_ids: ids of the line categories and all their parents
+        """
+        return [
+            rule for rule in table
+            if amount >= rule.min_amount
+            and (not rule.max_amount or amount < rule.max_amount)
+            and (not rule.department_ids or department_id in rule.department_ids)
+            and priority in rule.priorities
+            and (not rule.category_ids or rule.category_ids & category_ids)
+        ]
+
+
+class PurchaseRequestApproval(models.Model):
+    _name = 'purchase.request.approval'
+    _description = 'Purchase Request Approval Step'
+    _order = 'request_id, level, id'
+
+    request_id = fields.Many2one(
+        'purchase.request',
+        string='Purchase Request',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    rule_id = fields.Many2one(
+        'purchase.request.approval.rule',
+        string='Rule',
+        ondelete='set null',
+    )
+    level = fields.Integer(string='Level', required=True, default=1)
+    approver_user_id = fields.Many2one(
+        'res.users',
+        string='Approver',
+        required=True,
+    )
+    state = fields.Selection([
+        ('waiting', 'Waiting'),
+        ('pending', 'To Approve'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='waiting', required=True)
+    approved_by = fields.Many2one('res.users', string='Done By', readonly=True)
+    approved_date = fields.Datetime(string='Done On', readonly=True)
+
+    def init(self):
+        # "My approvals" looks up the pending steps of one user
+        self.env.cr.execute(SQL(
+            """
+            CREATE INDEX IF NOT EXISTS purchase_request_approval_pending_user_index
+                ON %s (approver_user_id, request_id)
+             WHERE state = 'pending'
+            """,
+            SQL.identifier(self._table),
+        ))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, fields, models, _
+
+
+class PurchaseWorkload(models.TransientModel):
+    _inherit = 'purchase.workload'
+
+    requests_pending_count = fields.Integer(string='Requests Pending Approval', compute='_compute_counters')
+    my_requests_to_approve_count = fields.Integer(string='Requests I Must Approve', compute='_compute_counters')
+    requests_without_rfq_count = fields.Integer(string='Approved Requests Without RFQ', compute='_compute_counters')
+
+    @api.model
+    def _get_counter_definitions(self):
+        definitions = super()._get_counter_definitions()
+        company_domain = [('company_id', 'in', self.env.companies.ids)]
+        definitions.update({
+            'requests_pending_count': {
+                'res_model': 'purchase.request',
+                'domain': [('state', '=', 'submitted'), *company_domain],
+                'name': _('Requests Pending Approval'),
+            },
+            'my_requests_to_approve_count': {
+                'res_model': 'purchase.request',
+                'domain': [('can_approve', '=', True), *company_domain],
+                'name': _('Requests I Must Approve'),
+            },
+            'requests_without_rfq_count': {
+                'res_model': 'purchase.request',
+                'domain': [('state', '=', 'approved'), ('rfq_id', '=', False), *company_domain],
+                'name': _('Approved Requests Without RFQ'),
+            },
+        })
+        return definitions
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import fields, models
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    purchase_request_notification_mode = fields.Selection([
+        ('immediate', 'One activity per request'),
+        ('digest_activity', 'Periodic digest activity'),
+        ('digest_email', 'Periodic digest email'),
+    ], string='Approval Notifications',
+        default='immediate',
+        config_parameter='purchase_request.notification_mode',
+        help='Digest modes group all new submissions per approver and notify '
+             'them once per period instead of once per request.')
+    purchase_request_budget_control = fields.Selection([
+        ('warning', 'Warn when over budget'),
+        ('block', 'Block approvals over budget'),
+    ], string='Budget Control',
+        default='warning',
+        config_parameter='purchase_request.budget_control')
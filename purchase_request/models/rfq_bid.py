@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, models
+
+
+class RFQBidLine(models.Model):
+    _inherit = 'purchase.rfq.bid.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['purchase.lineage']._record_bid_lines(lines)
+        return lines
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import select_winner_wizard
+from . import product_catalog_wizard
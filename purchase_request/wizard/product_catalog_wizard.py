@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+
+class PurchaseRequestCatalogWizard(models.TransientModel):
+    _name = 'purchase.request.catalog.wizard'
+    _description = 'Add Products from Catalog'
+
+    request_id = fields.Many2one(
+        'purchase.request',
+        string='Purchase Request',
+        required=True,
+    )
+    product_ids = fields.Many2many(
+        'product.product',
+        string='Products',
+        domain="[('purchase_ok', '=', True)]",
+    )
+    quantity = fields.Float(
+        string='Default Quantity',
+        default=1.0,
+        digits='Product Unit of Measure',
+    )
+    line_ids = fields.One2many(
+        'purchase.request.catalog.wizard.line',
+        'wizard_id',
+        string='Selection',
+        compute='_compute_line_ids',
+        store=True,
+        readonly=False,
+    )
+
+    @api.depends('product_ids')
+    def _compute_line_ids(self):
+        for wizard in self:
+            kept = wizard.line_ids.filtered(lambda l: l.product_id in wizard.product_ids)
+            new_products = wizard.product_ids - kept.product_id
+            wizard.line_ids = kept | self.env['purchase.request.catalog.wizard.line'].new([
+                {'product_id': product.id, 'quantity': wizard.quantity}
+                for product in new_products
+            ])
+
+    def action_add_lines(self):
+        """Add the selected products to the request with a single create."""
+        self.ensure_one()
+        if self.request_id.state != 'draft':
+            raise UserError(_('Lines can only be added to draft requests.'))
+        lines = self.line_ids.filtered(lambda l: l.product_id and l.quantity > 0)
+        if not lines:
+            raise UserError(_('Select at least one product with a quantity.'))
+        self.env['purchase.request.line']._create_from_products(
+            self.request_id,
+            [(line.product_id, line.quantity) for line in lines],
+        )
+        return {'type': 'ir.actions.act_window_close'}
+
+
+class PurchaseRequestCatalogWizardLine(models.TransientModel):
+    _name = 'purchase.request.catalog.wizard.line'
+    _description = 'Add Products from Catalog Line'
+
+    wizard_id = fields.Many2one(
+        'purchase.request.catalog.wizard',
+        required=True,
+        ondelete='cascade',
+    )
+    product_id = fields.Many2one('product.product', string='Product', required=True)
+    quantity = fields.Float(
+        string='Quantity',
+        default=1.0,
+        digits='Product Unit of Measure',
+    )
+    product_uom_id = fields.Many2one(
+        'uom.uom',
+        string='Unit of Measure',
+        compute='_compute_product_uom_id',
+    )
+
+    @api.depends('product_id')
+    def _compute_product_uom_id(self):
+        for line in self:
+            line.product_uom_id = line.product_id.uom_po_id or line.product_id.uom_id
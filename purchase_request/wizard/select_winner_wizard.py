@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request module.
+
+from odoo import fields, models
+
+
+class SelectWinnerWizard(models.TransientModel):
+    _inherit = 'purchase.rfq.select.winner.wizard'
+
+    def _confirm_winner(self):
+        # Shared by the inline award and the background award job
+        new_po = super()._confirm_winner()
+        request = self.rfq_id.purchase_request_id
+        if request:
+            # The awarded order, in whole vendor units, replaces the RFQ
+            # estimate on the budget
+            request._set_budget_commitment('award', new_po.currency_id._convert(
+                new_po.amount_untaxed,
+                request.currency_id,
+                request.company_id,
+                fields.Date.context_today(self),
+            ))
+        return new_po
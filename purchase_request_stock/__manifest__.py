@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+{
+    'name': 'Purchase Request - Stock Netting',
+    'version': '18.0.1.0.0',
+    'category': 'Inventory/Purchase',
+    'summary': 'Net purchase requests against stock on hand and incoming before RFQ creation',
+    'description': """
+Purchase Request - Stock Netting
+================================
+Bridge between Purchase Request and Inventory. When enabled in the settings,
+creating an RFQ from a request first nets the requested quantities against
+the free stock on hand and the incoming receipts:
+
+- Quants and incoming moves of all the products are read with one grouped
+  query each, for the whole batch of requests
+- Quantities already reserved by other open requests are not counted twice
+- Receipts ordered for other requests, on their RFQ or awarded order, are
+  not counted as free stock
+- RFQ lines are reduced, or skipped when stock covers the whole quantity
+- Requests fully covered by stock end in "Covered by Stock", keeping their reservation
+- The quantity taken from stock is recorded on each request line
+- "Issue Stock" releases the reservation once the goods have been issued
+    """,
+    'author': 'Custom Development',
+    'depends': ['purchase_request', 'purchase_stock'],
+    'data': [
+        'views/purchase_request_views.xml',
+        'views/res_config_settings_views.xml',
+    ],
+    'installable': True,
+    'application': False,
+    'auto_install': True,
+    'license': 'LGPL-3',
+}
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import purchase_request
+from . import res_config_settings
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request - Stock Netting module.
+
+from collections import defaultdict
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import float_compare, float_round
+
+# Requests whose stock reservations hold until the goods are issued
+RESERVING_STATES = ('approved', 'rfq_created', 'stock')
+# Moves that will bring goods in
+INCOMING_MOVE_STATES = ('waiting', 'confirmed', 'partially_available', 'assigned')
+
+
+class PurchaseRequest(models.Model):
+    _inherit = 'purchase.request'
+
+    state = fields.Selection(
+        selection_add=[('stock', 'Covered by Stock'), ('rejected',)],
+        ondelete={'stock': lambda requests: requests.write({'state': 'approved'})},
+    )
+    stock_issued = fields.Boolean(
+        string='Stock Issued',
+        readonly=True,
+        copy=False,
+        tracking=True,
+        help='The quantities taken from stock have been issued, so they no '
+             'longer reserve free stock.',
+    )
+
+    def _get_rfq_line_quantities(self):
+        quantities = super()._get_rfq_line_quantities()
+        if not self.env['ir.config_parameter'].sudo().get_param('purchase_request.stock_netting'):
+            return quantities
+        for line, qty_from_stock in self.line_ids._net_against_stock().items():
+            quantities[line.id] = float_round(
+                quantities[line.id] - qty_from_stock,
+                precision_rounding=line.product_uom_id.rounding,
+            )
+        return quantities
+
+    def _close_without_rfq(self):
+        """Close a request whose lines are all covered by stock.
+
+        The reservations written by the netting are kept, and so is the
+        request: it ends in the "Covered by Stock" state. Nothing is bought,
+        so its budget commitment is released.
+        """
+        self.ensure_one()
+        self._set_budget_commitment('release', 0.0)
+        self.write({'state': 'stock'})
+        self._post_transition_message(_('Every requested item is covered by stock; no RFQ was created.'))
+        return self.env['purchase.order']
+
+    def action_issue_stock(self):
+        """Release the stock reservation once the goods have been issued."""
+        self.ensure_one()
+        if self.state not in ('rfq_created', 'stock') or not any(self.line_ids.mapped('qty_from_stock')):
+            raise UserError(_('This request has no stock reservation to release.'))
+        self.write({'stock_issued': True})
+        self._post_transition_message(_('The quantities covered by stock have been issued.'))
+
+
+class PurchaseRequestLine(models.Model):
+    _inherit = 'purchase.request.line'
+
+    qty_from_stock = fields.Float(
+        string='From Stock',
+        digits='Product Unit of Measure',
+        readonly=True,
+        copy=False,
+        help='Quantity covered by stock on hand or incoming when the RFQ was '
+             'created, reserved for this line until the stock is issued.',
+    )
+
+    def _get_free_stock(self, products, company):
+        """Return ``{product: free quantity}`` in the product unit.
+
+        Free stock is the unreserved quantity on hand plus the incoming
+        receipts not ordered for a request line, minus what other open
+        requests already took and have not been issued yet. Receipts of RFQs
+        created from requests, and of the orders awarded from them, belong
+        to those requests and are never counted as free. Each source is read
+        with one grouped query for all ``products``.
+        """
+        free = defaultdict(float)
+        for product, quantity, reserved in self.env['stock.quant'].sudo()._read_group(
+            [
+                ('product_id', 'in', products.ids),
+                ('company_id', '=', company.id),
+                ('location_id.usage', '=', 'internal'),
+            ],
+            ['product_id'],
+            ['quantity:sum', 'reserved_quantity:sum'],
+        ):
+            free[product] += quantity - reserved
+        for product, quantity in self.env['stock.move'].sudo()._read_group(
+            [
+                ('product_id', 'in', products.ids),
+                ('company_id', '=', company.id),
+                ('state', 'in', INCOMING_MOVE_STATES),
+                ('location_id.usage', 'not in', ('internal', 'transit')),
+                ('location_dest_id.usage', '=', 'internal'),
+                '|', ('purchase_line_id', '=', False),
+                '&', ('purchase_line_id.purchase_request_line_id', '=', False),
+                ('purchase_line_id.rfq_bid_line_id.rfq_line_id.purchase_request_line_id', '=', False),
+            ],
+            ['product_id'],
+            ['product_qty:sum'],
+        ):
+            free[product] += quantity
+        for product, uom, quantity in self.sudo()._read_group(
+            [
+                ('product_id', 'in', products.ids),
+                ('company_id', '=', company.id),
+                ('request_id.state', 'in', RESERVING_STATES),
+                ('request_id.stock_issued', '=', False),
+                ('qty_from_stock', '>', 0),
+                ('id', 'not in', self.ids),
+            ],
+            ['product_id', 'product_uom_id'],
+            ['qty_from_stock:sum'],
+        ):
+            free[product] -= uom._compute_quantity(quantity, product.uom_id)
+        return free
+
+    def _net_against_stock(self):
+        """Reserve free stock for the storable lines of ``self``.
+
+        Lines are served by request priority and required date. The quantity
+        taken is written on ``qty_from_stock`` and returned per line, in the
+        line unit.
+        """
+        lines = self.filtered(lambda l: l.product_id.is_storable).sorted(
+            lambda l: (
+                -int(l.request_id.priority or 0),
+                l.request_id.date_required or fields.Date.to_date('9999-12-31'),
+                l.id,
+            )
+        )
+        taken = {}
+        for company, company_lines in lines.grouped('company_id').items():
+            free = self._get_free_stock(company_lines.product_id, company)
+            for line in company_lines:
+                product = line.product_id
+                wanted = line.product_uom_id._compute_quantity(line.quantity, product.uom_id)
+                quantity = max(min(free[product], wanted), 0.0)
+                if float_compare(quantity, 0.0, precision_rounding=product.uom_id.rounding) <= 0:
+                    taken[line] = 0.0
+                    continue
+                free[product] -= quantity
+                taken[line] = product.uom_id._compute_quantity(
+                    quantity, line.product_uom_id, rounding_method='DOWN',
+                )
+
+        by_quantity = defaultdict(list)
+        for line, quantity in taken.items():
+            if line.qty_from_stock != quantity:
+                by_quantity[quantity].append(line.id)
+        for quantity, line_ids in by_quantity.items():
+            self.browse(line_ids).write({'qty_from_stock': quantity})
+
+        netted = {line: quantity for line, quantity in taken.items() if quantity}
+        for request, request_lines in self.browse(
+            [line.id for line in netted]
+        ).grouped('request_id').items():
+            request._post_transition_message(_(
+                'Covered by stock before creating the RFQ: %s'
+            ) % ', '.join(
+                '%s %s %s' % (netted[line], line.product_uom_id.name, line.product_id.display_name)
+                for line in request_lines
+            ))
+        return taken
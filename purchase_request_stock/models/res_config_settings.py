@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Request - Stock Netting module.
+
+from odoo import fields, models
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    purchase_request_stock_netting = fields.Boolean(
+        string='Net Requests Against Stock',
+        config_parameter='purchase_request.stock_netting',
+        help='Reduce RFQ quantities by the free stock on hand and the incoming receipts.',
+    )
@@ -13,6 +13,19 @@ This module extends the standard Purchase module to support:
 - **Bid Management**: Receive and track bids from multiple vendors against an RFQ
 - **Bid Comparison**: Compare bids side-by-side to evaluate vendor pricing
 - **Winner Selection**: Select the winning bidder and automatically generate a Purchase Order
+- **Award Snapshots**: The full comparison behind every award is frozen in one compressed, read-only record
+- **Vendor Units of Measure**: Vendors quote in their own unit; prices are normalized to the RFQ unit
+- **Multi-Currency Bids**: Vendors quote in their own currency; bids are ranked in the RFQ currency
+- **Reverse Auctions**: Time-boxed price improvement with live per-line ranks
+- **Sparse Bid Sheets**: Large tenders only store the lines vendors quote, with a "No Quote" marker
+- **Price Anomaly Detection**: Outlier bid prices flagged against competing offers and purchase history
+- **Vendor Reminders**: One follow-up email per vendor for all its unanswered RFQs, with auto-rejection
+- **Tender Packages**: One PDF per vendor (cover and terms plus the RFQ), rendered in parallel in the background
+- **Recurring RFQs**: Templates with products and a vendor panel generate RFQs and draft bids every period
+- **Background Jobs**: Heavy award, dispatch and bid preparation actions run in chunked, retried cron jobs
+- **Workload Counters**: Open-work counters for buyers, backed by partial indexes and read with one query
+- **Compact Audit Log**: Optional partitioned, append-only change history replacing mail tracking
+- **Action Profiling**: Opt-in sampling of query count and timings for every workflow action
 
 Workflow:
 1. Create an RFQ and add product lines
@@ -27,10 +40,20 @@ Workflow:
     'data': [
         'security/ir.model.access.csv',
         'data/sequence_data.xml',
+        'data/ir_config_parameter_data.xml',
+        'data/ir_cron_data.xml',
+        'data/mail_templates.xml',
+        'report/tender_package_report.xml',
         'wizard/select_winner_wizard_views.xml',
         'views/rfq_vendor_views.xml',
         'views/rfq_bid_views.xml',
+        'views/rfq_template_views.xml',
         'views/purchase_order_views.xml',
+        'views/action_profile_views.xml',
+        'views/audit_log_views.xml',
+        'views/rfq_award_snapshot_views.xml',
+        'views/purchase_workload_views.xml',
+        'views/purchase_job_views.xml',
     ],
     'installable': True,
     'application': False,
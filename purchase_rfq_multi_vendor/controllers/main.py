@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from odoo import http
+from odoo.http import request
+
+
+class ProcurementController(http.Controller):
+
+    @http.route('/purchase_rfq_multi_vendor/search', type='json', auth='user')
+    def procurement_search(self, term, limit=20, offset=0):
+        """Ranked search across requests, RFQs, vendor notes and bids."""
+        return request.env['purchase.procurement.search'].search_documents(
+            term, limit=limit, offset=offset,
+        )
@@ -1,4 +1,16 @@
 # -*- coding: utf-8 -*-
+from . import purchase_table_version
+from . import res_currency
+from . import uom_uom
+from . import audit_log
+from . import purchase_job
+from . import rfq_transition
 from . import rfq_vendor
 from . import rfq_bid
+from . import rfq_award_snapshot
 from . import purchase_order
+from . import action_profile
+from . import procurement_search
+from . import rfq_template
+from . import rfq_bid_export
+from . import purchase_workload
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from datetime import timedelta
+
+from odoo import api, fields, models, tools
+from odoo.tools import SQL
+
+RETENTION_DAYS_PARAM = 'purchase_rfq_multi_vendor.profiling_retention_days'
+
+
+class PurchaseActionProfile(models.Model):
+    _name = 'purchase.action.profile'
+    _description = 'Procurement Action Profiling Sample'
+    _order = 'id desc'
+
+    model_name = fields.Char(string='Model', required=True, index=True, readonly=True)
+    method = fields.Char(string='Action', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+
+    record_count = fields.Integer(
+        string='Rows Written',
+        readonly=True,
+        aggregator='sum',
+        help='Rows inserted, updated or deleted by the action.',
+    )
+    query_count = fields.Integer(string='Queries', readonly=True, aggregator='avg')
+    sql_time = fields.Float(string='SQL Time (ms)', readonly=True, aggregator='avg')
+    python_time = fields.Float(string='Python Time (ms)', readonly=True, aggregator='avg')
+    total_time = fields.Float(string='Total Time (ms)', readonly=True, aggregator='avg')
+
+    @api.model
+    def _record_sample(self, model_name, method, record_count, query_count,
+                       sql_time, python_time):
+        """Store one profiling sample; times are given in seconds."""
+        return self.create({
+            'model_name': model_name,
+            'method': method,
+            'user_id': self.env.uid,
+            'company_id': self.env.company.id,
+            'record_count': record_count,
+            'query_count': query_count,
+            'sql_time': sql_time * 1000.0,
+            'python_time': python_time * 1000.0,
+            'total_time': (sql_time + python_time) * 1000.0,
+        })
+
+    @api.autovacuum
+    def _gc_profiles(self):
+        """Drop samples older than the configured retention period."""
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            RETENTION_DAYS_PARAM, 30
+        ))
+        limit_date = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute(SQL(
+            "DELETE FROM %s WHERE create_date < %s",
+            SQL.identifier(self._table), limit_date,
+        ))
+
+
+class PurchaseActionProfileReport(models.Model):
+    _name = 'purchase.action.profile.report'
+    _description = 'Procurement Action Profiling Summary'
+    _auto = False
+    _order = 'p90_time desc'
+
+    model_name = fields.Char(string='Model', readonly=True)
+    method = fields.Char(string='Action', readonly=True)
+    call_count = fields.Integer(string='Samples', readonly=True)
+    avg_records = fields.Float(string='Avg Rows Written', readonly=True)
+    avg_queries = fields.Float(string='Avg Queries', readonly=True)
+    p50_queries = fields.Float(string='Queries (p50)', readonly=True)
+    p90_queries = fields.Float(string='Queries (p90)', readonly=True)
+    avg_sql_time = fields.Float(string='Avg SQL Time (ms)', readonly=True)
+    avg_python_time = fields.Float(string='Avg Python Time (ms)', readonly=True)
+    p50_time = fields.Float(string='Total Time p50 (ms)', readonly=True)
+    p90_time = fields.Float(string='Total Time p90 (ms)', readonly=True)
+    p99_time = fields.Float(string='Total Time p99 (ms)', readonly=True)
+    max_time = fields.Float(string='Max Time (ms)', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(SQL(
+            """
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    min(p.id) AS id,
+                    p.model_name,
+                    p.method,
+                    count(*) AS call_count,
+                    avg(p.record_count) AS avg_records,
+                    avg(p.query_count) AS avg_queries,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY p.query_count) AS p50_queries,
+                    percentile_cont(0.9) WITHIN GROUP (ORDER BY p.query_count) AS p90_queries,
+                    avg(p.sql_time) AS avg_sql_time,
+                    avg(p.python_time) AS avg_python_time,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY p.total_time) AS p50_time,
+                    percentile_cont(0.9) WITHIN GROUP (ORDER BY p.total_time) AS p90_time,
+                    percentile_cont(0.99) WITHIN GROUP (ORDER BY p.total_time) AS p99_time,
+                    max(p.total_time) AS max_time
+                FROM purchase_action_profile p
+                GROUP BY p.model_name, p.method
+            )
+            """,
+            SQL.identifier(self._table),
+        ))
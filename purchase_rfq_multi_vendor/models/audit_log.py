@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+
+from dateutil.relativedelta import relativedelta
+from psycopg2 import errors
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+AUDIT_MODELS_PARAM = 'purchase_rfq_multi_vendor.audit_models'
+
+# Monthly partitions created ahead of time, current month included
+AUDIT_PARTITIONS_AHEAD = 3
+
+
+class PurchaseAuditLog(models.Model):
+    """Append-only, compact history of audited fields.
+
+    One row per written record holds the changed fields as a JSON diff
+    ``{field: [old, new]}``. The table is range-partitioned by month on
+    ``date``; it is created here rather than by the ORM because the ORM
+    cannot declare partitioned tables.
+    """
+    _name = 'purchase.audit.log'
+    _description = 'Procurement Audit Log'
+    _auto = False
+    _log_access = False
+    _order = 'date desc, id desc'
+
+    date = fields.Datetime(string='Date', readonly=True, default=fields.Datetime.now)
+    res_model = fields.Char(string='Model', readonly=True, required=True)
+    res_id = fields.Many2oneReference(
+        string='Record ID', readonly=True, required=True, model_field='res_model',
+    )
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    changes = fields.Json(string='Changes', readonly=True)
+    summary = fields.Char(string='Summary', compute='_compute_summary')
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute(SQL(
+            """
+            CREATE TABLE IF NOT EXISTS %(table)s (
+                id serial NOT NULL,
+                date timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+                res_model varchar NOT NULL,
+                res_id integer NOT NULL,
+                user_id integer,
+                changes jsonb,
+                PRIMARY KEY (id, date)
+            ) PARTITION BY RANGE (date)
+            """,
+            table=SQL.identifier(self._table),
+        ))
+        cr.execute(SQL(
+            "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s DEFAULT",
+            SQL.identifier(self._table + '_default'), SQL.identifier(self._table),
+        ))
+        # Created on the parent, the index is propagated to every partition
+        cr.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS %s ON %s (res_model, res_id, date)",
+            SQL.identifier(self._table + '_res_index'), SQL.identifier(self._table),
+        ))
+        self._create_partitions()
+
+    @api.model
+    def _create_partitions(self):
+        """Create the monthly partitions of the coming months.
+
+        Months whose rows already landed in the default partition are left
+        there: attaching a range they overlap would fail.
+        """
+        month = fields.Date.today().replace(day=1)
+        for dummy in range(AUDIT_PARTITIONS_AHEAD):
+            next_month = month + relativedelta(months=1)
+            try:
+                with self.env.cr.savepoint():
+                    self.env.cr.execute(SQL(
+                        "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES FROM (%s) TO (%s)",
+                        SQL.identifier('%s_%s' % (self._table, month.strftime('%Y%m'))),
+                        SQL.identifier(self._table),
+                        month, next_month,
+                    ))
+            except errors.CheckViolation:
+                _logger.info(
+                    'Audit log rows of %s are in the default partition; no monthly partition created',
+                    month.strftime('%Y-%m'),
+                )
+            month = next_month
+
+    def write(self, vals):
+        raise UserError(_('Audit log entries cannot be modified.'))
+
+    def unlink(self):
+        raise UserError(_('Audit log entries cannot be deleted.'))
+
+    def _get_summary_names(self):
+        """Return ``{comodel: {id: display name}}`` of the many2one values of ``self``.
+
+        The ids are collected over all the rows first, so each comodel is
+        read once whatever the number of rows.
+        """
+        ids_by_comodel = defaultdict(set)
+        for log in self:
+            Model = self.env.get(log.res_model)
+            if Model is None:
+                continue
+            for fname, values in (log.changes or {}).items():
+                field = Model._fields.get(fname)
+                if field and field.type == 'many2one':
+                    ids_by_comodel[field.comodel_name].update(v for v in values if v)
+        return {
+            comodel: {rec.id: rec.display_name for rec in self.env[comodel].browse(ids).exists()}
+            for comodel, ids in ids_by_comodel.items()
+        }
+
+    @api.depends('res_model', 'changes')
+    def _compute_summary(self):
+        names_by_comodel = self._get_summary_names()
+        for log in self:
+            Model = self.env.get(log.res_model)
+            if Model is None:
+                log.summary = False
+                continue
+            parts = []
+            for fname, (old, new) in (log.changes or {}).items():
+                field = Model._fields.get(fname)
+                if not field:
+                    continue
+                if field.type == 'selection':
+                    labels = dict(field._description_selection(self.env))
+                    old, new = labels.get(old, old), labels.get(new, new)
+                elif field.type == 'many2one':
+                    names = names_by_comodel.get(field.comodel_name, {})
+                    old, new = names.get(old, old), names.get(new, new)
+                parts.append('%s: %s → %s' % (field.string, old or '', new or ''))
+            log.summary = '; '.join(parts)
+
+    @api.model
+    def _action_view(self, records):
+        return {
+            'name': _('History'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.audit.log',
+            'view_mode': 'list',
+            'domain': [('res_model', '=', records._name), ('res_id', 'in', records.ids)],
+        }
+
+
+class PurchaseAuditMixin(models.AbstractModel):
+    """Record the changes of ``_audit_fields`` in ``purchase.audit.log``.
+
+    The mixin only acts on models listed in the ``audit_models`` system
+    parameter. For those, the audited fields are no longer mail-tracked and
+    every write appends one compact row per record instead, with a single
+    batched insert. Other tracked fields, followers and creation messages
+    are left to ``mail.thread``. List it before ``mail.thread`` in
+    ``_inherit`` so that it can filter the tracked fields.
+    """
+    _name = 'purchase.audit.mixin'
+    _description = 'Procurement Audit Mixin'
+
+    # Fields whose changes are recorded
+    _audit_fields = ()
+
+    @api.model
+    def _audit_enabled(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(AUDIT_MODELS_PARAM, '')
+        return self._name in {name.strip() for name in value.split(',')}
+
+    def _audit_value(self, fname):
+        value = self[fname]
+        if isinstance(value, models.BaseModel):
+            return value.id
+        if isinstance(value, datetime):
+            return fields.Datetime.to_string(value)
+        if isinstance(value, date):
+            return fields.Date.to_string(value)
+        return value
+
+    def _track_get_fields(self):
+        tracked = super()._track_get_fields()
+        if self._audit_fields and self._audit_enabled():
+            return frozenset(tracked) - frozenset(self._audit_fields)
+        return tracked
+
+    def write(self, vals):
+        audited = [fname for fname in self._audit_fields if fname in vals]
+        if not audited or not self._audit_enabled():
+            return super().write(vals)
+        before = {rec.id: [rec._audit_value(fname) for fname in audited] for rec in self}
+        res = super().write(vals)
+        log_vals_list = []
+        for rec in self:
+            changes = {
+                fname: [old, new]
+                for fname, old, new in zip(
+                    audited, before[rec.id], (rec._audit_value(fname) for fname in audited),
+                )
+                if old != new
+            }
+            if changes:
+                log_vals_list.append({
+                    'res_model': self._name,
+                    'res_id': rec.id,
+                    'user_id': self.env.uid,
+                    'changes': changes,
+                })
+        if log_vals_list:
+            self.env['purchase.audit.log'].sudo().create(log_vals_list)
+        return res
+
+    def action_view_audit_log(self):
+        """View the compact change history of the records."""
+        return self.env['purchase.audit.log']._action_view(self)
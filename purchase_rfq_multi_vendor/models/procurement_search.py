@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from collections import defaultdict
+
+from odoo import api, models
+from odoo.osv import expression
+from odoo.tools import SQL
+
+MIN_TERM_LENGTH = 3
+MAX_PAGE_SIZE = 100
+
+
+class ProcurementSearch(models.AbstractModel):
+    """Ranked text search across procurement documents.
+
+    Every searched text column carries a trigram index, so the ``ilike``
+    filters are index scans. Hits are ranked with ``word_similarity`` in the
+    same statement and paginated in the database.
+    """
+    _name = 'purchase.procurement.search'
+    _description = 'Procurement Full-Text Search'
+
+    @api.model
+    def _get_search_sources(self):
+        """Return the searched models.
+
+        Each source is ``(model, fields, target_field)``: hits on ``model``
+        are reported on the record ``target_field`` points to, or on the
+        record itself when ``target_field`` is False.
+        """
+        return [
+            ('purchase.order', ['name', 'notes'], False),
+            ('purchase.rfq.vendor', ['notes'], 'rfq_id'),
+            ('purchase.rfq.bid', ['name', 'notes', 'delivery_terms', 'payment_terms'], False),
+        ]
+
+    @api.model
+    def _get_source_query(self, model_name, fnames, target_field, term):
+        Model = self.env[model_name]
+        domain = expression.OR([[(fname, 'ilike', term)] for fname in fnames])
+        query = Model._search(domain)
+        columns = [
+            SQL("COALESCE(%s, '')", Model._field_to_sql(query.table, fname, query))
+            for fname in fnames
+        ]
+        if self.env.registry.has_trigram:
+            score = SQL("GREATEST(%s)", SQL(", ").join(
+                SQL("word_similarity(%s, %s)", term, column) for column in columns
+            ))
+        else:
+            score = SQL("1.0")
+        if target_field:
+            target_model = Model._fields[target_field].comodel_name
+            res_id = Model._field_to_sql(query.table, target_field, query)
+        else:
+            target_model = model_name
+            res_id = SQL.identifier(query.table, 'id')
+        return query.select(
+            SQL("%s AS res_model", target_model),
+            SQL("%s AS res_id", res_id),
+            SQL("%s AS score", score),
+        )
+
+    @api.model
+    def search_documents(self, term, limit=20, offset=0):
+        """Return one page of ranked hits for ``term``.
+
+        :return: ``{'results': [{'model', 'id', 'display_name', 'score'}],
+                   'has_more': bool}``
+        """
+        term = (term or '').strip()
+        if len(term) < MIN_TERM_LENGTH:
+            return {'results': [], 'has_more': False}
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        offset = max(int(offset), 0)
+
+        union = SQL(" UNION ALL ").join(
+            self._get_source_query(model_name, fnames, target_field, term)
+            for model_name, fnames, target_field in self._get_search_sources()
+        )
+        self.env.cr.execute(SQL(
+            """
+            SELECT res_model, res_id, max(score) AS score
+              FROM (%s) AS hits
+             WHERE res_id IS NOT NULL
+          GROUP BY res_model, res_id
+          ORDER BY score DESC, res_id DESC
+             LIMIT %s OFFSET %s
+            """,
+            union, limit + 1, offset,
+        ))
+        rows = self.env.cr.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Hits reported on a parent record are re-checked against its rules
+        ids_by_model = defaultdict(list)
+        for res_model, res_id, _score in rows:
+            ids_by_model[res_model].append(res_id)
+        names = {}
+        for res_model, ids in ids_by_model.items():
+            for record in self.env[res_model].search([('id', 'in', ids)]):
+                names[res_model, record.id] = record.display_name
+
+        return {
+            'results': [
+                {
+                    'model': res_model,
+                    'id': res_id,
+                    'display_name': names[res_model, res_id],
+                    'score': score,
+                }
+                for res_model, res_id, score in rows
+                if (res_model, res_id) in names
+            ],
+            'has_more': has_more,
+        }
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+JOB_THRESHOLD_PARAM = 'purchase_rfq_multi_vendor.job_threshold'
+# Records handled, and committed, at once by a job
+JOB_CHUNK_SIZE = 100
+# First retry delay in seconds, doubled on every further attempt
+JOB_RETRY_DELAY = 60
+# Running jobs not updated for that long are checked for a lost worker
+JOB_STALE_AFTER = timedelta(hours=1)
+# First key of the session-level advisory lock a worker holds on its job
+JOB_LOCK_KEY = 0x504A4F42
+
+
+class PurchaseJob(models.Model):
+    """Heavy procurement action run in the background by a cron worker.
+
+    A job calls ``method`` on the records ``record_ids`` of ``model``, a
+    chunk of ``chunk_size`` records at a time, and commits after each chunk,
+    so a failure or a worker time limit only loses the current chunk. Failed
+    attempts are retried with an exponential backoff. Jobs are picked with
+    ``FOR UPDATE SKIP LOCKED`` so any number of cron workers can share the
+    queue, and the worker keeps a session advisory lock on its job across
+    the chunk commits. The outcome is posted on the record the job was
+    started from.
+    Business errors (``UserError``) fail the job without retry.
+
+    Only methods named ``_job_*`` can be run; they must be idempotent for
+    the records of a chunk since a chunk may be retried.
+    """
+    _name = 'purchase.job'
+    _description = 'Procurement Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Description', required=True, readonly=True)
+    model = fields.Char(string='Model', required=True, readonly=True)
+    method = fields.Char(string='Method', required=True, readonly=True)
+    record_ids = fields.Json(string='Records', readonly=True)
+    kwargs = fields.Json(string='Arguments', readonly=True)
+    res_model = fields.Char(string='Origin Model', readonly=True, index=True)
+    res_id = fields.Many2oneReference(string='Origin ID', readonly=True, model_field='res_model')
+    user_id = fields.Many2one(
+        'res.users',
+        string='Requested By',
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.user,
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.company,
+    )
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='queued', required=True, readonly=True)
+    priority = fields.Integer(string='Priority', default=10, readonly=True)
+    eta = fields.Datetime(
+        string='Run After',
+        required=True,
+        readonly=True,
+        default=fields.Datetime.now,
+    )
+    chunk_size = fields.Integer(string='Chunk Size', default=JOB_CHUNK_SIZE, readonly=True)
+    done_count = fields.Integer(string='Processed', readonly=True)
+    record_count = fields.Integer(string='Records', compute='_compute_progress')
+    progress = fields.Float(string='Progress', compute='_compute_progress')
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    max_attempts = fields.Integer(string='Max Attempts', default=5, readonly=True)
+    date_started = fields.Datetime(string='Started On', readonly=True)
+    date_done = fields.Datetime(string='Finished On', readonly=True)
+    result_model = fields.Char(string='Result Model', readonly=True)
+    result_ids = fields.Json(string='Results', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    def init(self):
+        # The runner only ever looks for queued jobs, in priority order
+        self.env.cr.execute(SQL(
+            """
+            CREATE INDEX IF NOT EXISTS purchase_job_queued_index
+                ON %s (priority, eta, id)
+             WHERE state = 'queued'
+            """,
+            SQL.identifier(self._table),
+        ))
+
+    @api.depends('record_ids', 'done_count')
+    def _compute_progress(self):
+        for job in self:
+            job.record_count = len(job.record_ids or [])
+            job.progress = 100.0 * job.done_count / job.record_count if job.record_count else 0.0
+
+    # -------------------------------------------------------------------------
+    # Enqueueing
+    # -------------------------------------------------------------------------
+    @api.model
+    def _should_enqueue(self, size):
+        """Return whether an action touching ``size`` records or lines runs
+        in the background, according to the ``job_threshold`` parameter
+        (0 disables background execution)."""
+        if self.env.context.get('purchase_job_id'):
+            return False
+        value = self.env['ir.config_parameter'].sudo().get_param(JOB_THRESHOLD_PARAM, 0)
+        try:
+            threshold = int(value or 0)
+        except ValueError:
+            threshold = 0
+        return threshold > 0 and size >= threshold
+
+    @api.model
+    def _enqueue(self, records, method, name, origin=None, kwargs=None, chunk_size=JOB_CHUNK_SIZE):
+        """Queue ``records.<method>(**kwargs)`` and wake up the runner.
+
+        :param origin: record the job reports to, ``records`` by default
+        """
+        if not method.startswith('_job_'):
+            raise UserError(_('Only job methods can be run in the background.'))
+        origin = origin if origin is not None else records[:1]
+        if self.search_count([
+            ('model', '=', records._name),
+            ('method', '=', method),
+            ('res_model', '=', origin._name),
+            ('res_id', '=', origin.id),
+            ('state', 'in', ('queued', 'running')),
+        ], limit=1):
+            raise UserError(_('"%s" is already running in the background.') % name)
+        job = self.sudo().create({
+            'name': name,
+            'model': records._name,
+            'method': method,
+            'record_ids': records.ids,
+            'kwargs': kwargs or {},
+            'res_model': origin._name,
+            'res_id': origin.id,
+            'chunk_size': chunk_size,
+            'user_id': self.env.uid,
+            'company_id': self.env.company.id,
+        })
+        self.env.ref('purchase_rfq_multi_vendor.ir_cron_run_purchase_jobs')._trigger()
+        return job
+
+    def _action_notify(self, close=False):
+        """Client action telling the user that the job was queued."""
+        self.ensure_one()
+        action = {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': _('"%s" is running in the background. '
+                             'You will be notified when it is done.') % self.name,
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+        if close:
+            action['params']['next'] = {'type': 'ir.actions.act_window_close'}
+        return action
+
+    # -------------------------------------------------------------------------
+    # Processing
+    # -------------------------------------------------------------------------
+    @api.model
+    def _cron_run_jobs(self, limit=20):
+        """Run the due jobs, one chunk per transaction."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self._requeue_stale_jobs()
+        for dummy in range(limit):
+            job = self._acquire_next_job()
+            if not job:
+                break
+            if auto_commit:
+                self.env.cr.commit()
+            job._run(auto_commit=auto_commit)
+        # Wake up again for the next retry, or right away if jobs are left
+        next_job = self.search([('state', '=', 'queued')], order='eta', limit=1)
+        if next_job:
+            self.env.ref('purchase_rfq_multi_vendor.ir_cron_run_purchase_jobs')._trigger(
+                max(next_job.eta, fields.Datetime.now()),
+            )
+
+    @api.model
+    def _requeue_stale_jobs(self):
+        """Queue again the running jobs whose worker is gone.
+
+        A live worker holds the advisory lock of its job however long a
+        chunk takes, so only the jobs whose lock can be taken are requeued.
+        """
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - JOB_STALE_AFTER),
+        ])
+        if not stale:
+            return
+        self.env.cr.execute(SQL(
+            "SELECT id FROM purchase_job WHERE id IN %s AND pg_try_advisory_xact_lock(%s, id)",
+            tuple(stale.ids), JOB_LOCK_KEY,
+        ))
+        self.browse([row[0] for row in self.env.cr.fetchall()]).write({'state': 'queued'})
+
+    @api.model
+    def _acquire_next_job(self):
+        """Lock the next due job, skipping those other workers hold, and mark it running.
+
+        Besides the row lock, which ends with the transaction, the job gets
+        the session advisory lock that ``_run`` releases when it is done.
+        """
+        self.flush_model(['state', 'eta', 'priority'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM purchase_job
+             WHERE state = 'queued' AND eta <= %s
+          ORDER BY priority, eta, id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+            """,
+            fields.Datetime.now(),
+        ))
+        row = self.env.cr.fetchone()
+        if not row:
+            return self.browse()
+        self.env.cr.execute(SQL("SELECT pg_try_advisory_lock(%s, %s)", JOB_LOCK_KEY, row[0]))
+        if not self.env.cr.fetchone()[0]:
+            return self.browse()
+        job = self.browse(row[0])
+        job.write({
+            'state': 'running',
+            'attempts': job.attempts + 1,
+            'date_started': job.date_started or fields.Datetime.now(),
+        })
+        return job
+
+    def _run(self, auto_commit=True):
+        """Process the remaining records of the job chunk by chunk."""
+        self.ensure_one()
+        try:
+            self._run_chunks(auto_commit=auto_commit)
+        except Exception:
+            if auto_commit:
+                # Everything worth keeping is committed by now; an escaping
+                # error must not leave the lock on a pooled connection
+                self.env.cr.rollback()
+                self._release_lock()
+            raise
+        self._release_lock()
+
+    def _release_lock(self):
+        self.env.cr.execute(SQL("SELECT pg_advisory_unlock(%s, %s)", JOB_LOCK_KEY, self.id))
+
+    def _run_chunks(self, auto_commit=True):
+        self.ensure_one()
+        Model = self.env[self.model].with_user(self.user_id).with_company(self.company_id)
+        Model = Model.with_context(purchase_job_id=self.id)
+        todo = (self.record_ids or [])[self.done_count:]
+        try:
+            if not self.method.startswith('_job_'):
+                raise UserError(_('Only job methods can be run in the background.'))
+            for start in range(0, len(todo), max(self.chunk_size, 1)):
+                chunk_ids = todo[start:start + max(self.chunk_size, 1)]
+                result = getattr(Model.browse(chunk_ids).exists(), self.method)(**(self.kwargs or {}))
+                vals = {'done_count': self.done_count + len(chunk_ids)}
+                if isinstance(result, models.BaseModel) and result:
+                    vals.update({
+                        'result_model': result._name,
+                        'result_ids': (self.result_ids or []) + result.ids,
+                    })
+                self.write(vals)
+                if auto_commit:
+                    self.env.cr.commit()
+        except Exception as e:
+            if not auto_commit:
+                raise
+            self.env.cr.rollback()
+            _logger.exception('Procurement job %s failed (attempt %s)', self.id, self.attempts)
+            self._handle_failure(e)
+            self.env.cr.commit()
+            return
+        self.write({'state': 'done', 'date_done': fields.Datetime.now(), 'error': False})
+        self._notify_origin()
+        if auto_commit:
+            self.env.cr.commit()
+
+    def _handle_failure(self, error):
+        """Retry transient errors with backoff, fail business errors at once.
+
+        A ``UserError`` (``ValidationError`` and ``AccessError`` included)
+        would be raised again by every attempt. Serialization and lock
+        errors are worth retrying; a job killed by a time limit is put back
+        in the queue by ``_requeue_stale_jobs``.
+        """
+        self.ensure_one()
+        if not isinstance(error, UserError) and self.attempts < self.max_attempts:
+            eta = fields.Datetime.now() + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (self.attempts - 1))
+            self.write({'state': 'queued', 'eta': eta, 'error': str(error)})
+            return
+        self.write({'state': 'failed', 'date_done': fields.Datetime.now(), 'error': str(error)})
+        self._notify_origin()
+
+    def _get_origin(self):
+        self.ensure_one()
+        if not self.res_model or self.res_model not in self.env:
+            return None
+        return self.env[self.res_model].browse(self.res_id).exists()
+
+    def _notify_origin(self):
+        """Post the outcome of the job on the record it was started from."""
+        self.ensure_one()
+        origin = self._get_origin()
+        if not origin or not hasattr(origin, 'message_post'):
+            return
+        if self.state == 'done':
+            body = _('Background job "%s" is done.') % self.name
+            if self.result_model and self.result_ids:
+                results = self.env[self.result_model].browse(self.result_ids).exists()
+                body += ' ' + _('Result: %s') % ', '.join(results.mapped('display_name'))
+        else:
+            body = _('Background job "%(name)s" failed after %(count)s attempts: %(error)s',
+                     name=self.name, count=self.attempts, error=self.error)
+        origin.message_post(
+            body=body,
+            partner_ids=self.user_id.partner_id.ids,
+            message_type='notification',
+        )
+
+    # -------------------------------------------------------------------------
+    # Actions
+    # -------------------------------------------------------------------------
+    def action_retry(self):
+        """Queue failed or cancelled jobs again, resuming after the last committed chunk."""
+        self.filtered(lambda job: job.state in ('failed', 'cancelled')).write({
+            'state': 'queued',
+            'attempts': 0,
+            'eta': fields.Datetime.now(),
+            'date_done': False,
+        })
+        self.env.ref('purchase_rfq_multi_vendor.ir_cron_run_purchase_jobs')._trigger()
+
+    def action_cancel(self):
+        self.filtered(lambda job: job.state == 'queued').write({'state': 'cancelled'})
+
+    def action_open_results(self):
+        self.ensure_one()
+        return {
+            'name': self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': self.result_model,
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', self.result_ids or [])],
+        }
+
+    def action_open_origin(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self.res_model,
+            'res_id': self.res_id,
+            'view_mode': 'form',
+        }
+
+
+class PurchaseJobMixin(models.AbstractModel):
+    """Background job status on the records jobs are started from."""
+    _name = 'purchase.job.mixin'
+    _description = 'Procurement Background Job Origin'
+
+    job_running_count = fields.Integer(
+        string='Running Jobs',
+        compute='_compute_job_running_count',
+    )
+
+    def _compute_job_running_count(self):
+        counts = dict(self.env['purchase.job'].sudo()._read_group(
+            [
+                ('res_model', '=', self._name),
+                ('res_id', 'in', self.ids),
+                ('state', 'in', ('queued', 'running')),
+            ],
+            ['res_id'],
+            ['__count'],
+        ))
+        for record in self:
+            record.job_running_count = counts.get(record.id, 0)
+
+    def action_view_jobs(self):
+        """Background jobs started from the records."""
+        return {
+            'name': _('Background Jobs'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.job',
+            'view_mode': 'list,form',
+            'domain': [('res_model', '=', self._name), ('res_id', 'in', self.ids)],
+        }
@@ -1,12 +1,30 @@
 # -*- coding: utf-8 -*-
 # Part of Purchase Multi-Vendor RFQ module.
 
+import logging
+import threading
+
 from odoo import api, fields, models, _
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
+from odoo.tools.pdf import merge_pdf
+
+from ..tools import convert_html_to_pdf, profiled_action
+from .purchase_job import JOB_CHUNK_SIZE, JOB_STALE_AFTER
+
+_logger = logging.getLogger(__name__)
+
+# Number of vendor packages rendered between two progress updates
+TENDER_PROGRESS_STEP = 10
+# First key of the session-level advisory lock held while rendering an RFQ
+TENDER_LOCK_KEY = 0x54454E44
 
 
 class PurchaseOrder(models.Model):
-    _inherit = 'purchase.order'
+    _inherit = ['purchase.order', 'purchase.job.mixin']
+
+    # Trigram index for the procurement search
+    notes = fields.Html(index='trigram')
 
     # -------------------------------------------------------------------------
     # Multi-Vendor RFQ Fields
@@ -32,6 +50,18 @@ class PurchaseOrder(models.Model):
         compute='_compute_bid_count',
         string='Bid Count',
     )
+    bid_requote_needed = fields.Boolean(
+        compute='_compute_bid_requote_needed',
+        string='Bids Need Re-quote',
+    )
+    rfq_template_id = fields.Many2one(
+        'purchase.rfq.template',
+        string='RFQ Template',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        help='The recurring template this RFQ was generated from.',
+    )
     awarded_bid_id = fields.Many2one(
         'purchase.rfq.bid',
         string='Awarded Bid',
@@ -39,6 +69,53 @@ class PurchaseOrder(models.Model):
         copy=False,
         help='The bid that was awarded for this RFQ.',
     )
+    award_snapshot_id = fields.Many2one(
+        'purchase.rfq.award.snapshot',
+        string='Award Snapshot',
+        readonly=True,
+        copy=False,
+        help='Frozen comparison of all bids at the time of the award.',
+    )
+
+    sparse_bids = fields.Boolean(
+        string='Sparse Bid Sheets',
+        help='Only store the lines vendors actually quote. New bids start '
+             'empty instead of holding one placeholder line per RFQ line; '
+             'use this for large tenders where vendors quote a few items.',
+    )
+
+    # -------------------------------------------------------------------------
+    # Reverse Auction Fields
+    # -------------------------------------------------------------------------
+    auction_mode = fields.Boolean(
+        string='Reverse Auction',
+        copy=False,
+        help='Let vendors lower the prices of their submitted bids during the '
+             'auction window. Ranks are pushed live to vendors and the buyer.',
+    )
+    auction_start = fields.Datetime(string='Auction Opens', copy=False)
+    auction_end = fields.Datetime(string='Auction Closes', copy=False)
+    auction_state = fields.Selection([
+        ('scheduled', 'Scheduled'),
+        ('open', 'Open'),
+        ('closed', 'Closed'),
+    ], string='Auction Status', compute='_compute_auction_state')
+
+    # -------------------------------------------------------------------------
+    # Tender Package Fields
+    # -------------------------------------------------------------------------
+    tender_package_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'In Progress'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Tender Packages', readonly=True, copy=False, index='btree_not_null')
+    tender_package_done = fields.Integer(string='Packages Rendered', readonly=True, copy=False)
+    tender_package_total = fields.Integer(string='Packages to Render', readonly=True, copy=False)
+    tender_package_progress = fields.Float(
+        string='Tender Package Progress',
+        compute='_compute_tender_package_progress',
+    )
 
     # -------------------------------------------------------------------------
     # Compute Methods
@@ -53,9 +130,56 @@ class PurchaseOrder(models.Model):
         for order in self:
             order.bid_count = len(order.rfq_bid_ids)
 
+    @api.depends('rfq_bid_ids.requote_needed')
+    def _compute_bid_requote_needed(self):
+        for order in self:
+            order.bid_requote_needed = any(order.rfq_bid_ids.mapped('requote_needed'))
+
+    @api.depends('tender_package_done', 'tender_package_total')
+    def _compute_tender_package_progress(self):
+        for order in self:
+            total = order.tender_package_total
+            order.tender_package_progress = 100.0 * order.tender_package_done / total if total else 0.0
+
+    @api.depends('auction_mode', 'auction_start', 'auction_end')
+    def _compute_auction_state(self):
+        now = fields.Datetime.now()
+        for order in self:
+            if not order.auction_mode or not order.auction_start or not order.auction_end:
+                order.auction_state = False
+            elif now < order.auction_start:
+                order.auction_state = 'scheduled'
+            elif now <= order.auction_end:
+                order.auction_state = 'open'
+            else:
+                order.auction_state = 'closed'
+
+    @api.constrains('auction_mode', 'auction_start', 'auction_end')
+    def _check_auction_window(self):
+        for order in self.filtered('auction_mode'):
+            if not order.auction_start or not order.auction_end:
+                raise ValidationError(_('A reverse auction needs an opening and a closing date.'))
+            if order.auction_end <= order.auction_start:
+                raise ValidationError(_('The auction must close after it opens.'))
+
+    def _check_auction_open(self):
+        self.ensure_one()
+        if not self.auction_mode:
+            raise UserError(_('%s is not a reverse auction.') % self.name)
+        if self.auction_state != 'open':
+            raise UserError(_('The auction of %s is not open.') % self.name)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'currency_id' in vals:
+            # Bids are compared in the RFQ currency
+            self.rfq_bid_ids._update_line_ranks()
+        return res
+
     # -------------------------------------------------------------------------
     # Actions
     # -------------------------------------------------------------------------
+    @profiled_action
     def action_send_to_all_vendors(self):
         """Send RFQ to all assigned vendors that haven't been sent yet."""
         self.ensure_one()
@@ -63,6 +187,10 @@ class PurchaseOrder(models.Model):
             raise UserError(
                 _('Please add at least one vendor to the RFQ before sending.')
             )
+        if self.auction_mode and len(self.rfq_vendor_ids) < 2:
+            raise UserError(
+                _('A reverse auction needs at least two vendors.')
+            )
 
         vendors_to_send = self.rfq_vendor_ids.filtered(
             lambda v: v.status == 'draft'
@@ -72,6 +200,12 @@ class PurchaseOrder(models.Model):
                 _('All vendors have already been sent the RFQ.')
             )
 
+        Job = self.env['purchase.job']
+        if Job._should_enqueue(len(vendors_to_send)):
+            return Job._enqueue(
+                vendors_to_send, '_job_send', _('Send %s to vendors') % self.name, origin=self,
+            )._action_notify()
+
         # Separate vendors with and without email
         vendors_with_email = vendors_to_send.filtered(
             lambda v: v.vendor_id.email
@@ -79,10 +213,7 @@ class PurchaseOrder(models.Model):
         vendors_no_email = vendors_to_send - vendors_with_email
 
         # Mark all vendors as sent (even those without email for testing)
-        vendors_to_send.write({
-            'status': 'sent',
-            'sent_date': fields.Datetime.now(),
-        })
+        vendors_to_send._transition('sent', {'sent_date': fields.Datetime.now()})
 
         # Build notification message
         warning_msg = ''
@@ -104,6 +235,26 @@ class PurchaseOrder(models.Model):
             },
         }
 
+    @profiled_action
+    def action_prepare_bids(self):
+        """Create a draft bid sheet for every active vendor that has none yet."""
+        self.ensure_one()
+        vendors = self.rfq_vendor_ids.filtered(
+            lambda v: not v.bid_ids and v.status in ('draft', 'sent')
+        )
+        if not vendors:
+            raise UserError(_('Every vendor of %s already has a bid.') % self.name)
+        line_count = 0 if self.sparse_bids else len(self.order_line.filtered(lambda l: not l.display_type))
+        Job = self.env['purchase.job']
+        if Job._should_enqueue(len(vendors) * max(line_count, 1)):
+            # About JOB_CHUNK_SIZE bid lines per committed chunk
+            return Job._enqueue(
+                vendors, '_job_create_draft_bids', _('Prepare bids of %s') % self.name,
+                origin=self, chunk_size=max(1, JOB_CHUNK_SIZE // max(line_count, 1)),
+            )._action_notify()
+        vendors._create_draft_bids()
+        return self.action_view_rfq_bids()
+
     def action_view_rfq_vendors(self):
         """View all vendors assigned to this RFQ."""
         self.ensure_one()
@@ -131,6 +282,7 @@ class PurchaseOrder(models.Model):
             },
         }
 
+    @profiled_action
     def action_compare_bids(self):
         """Open a comparison view of all submitted bids."""
         self.ensure_one()
@@ -150,3 +302,211 @@ class PurchaseOrder(models.Model):
             'domain': [('id', 'in', submitted_bids.ids)],
             'context': {'default_rfq_id': self.id},
         }
+
+    @profiled_action
+    def action_export_bid_comparison(self):
+        """Queue a streamed XLSX export of the bid comparison."""
+        self.ensure_one()
+        if not self.rfq_bid_ids:
+            raise UserError(_('There are no bids to export for this RFQ.'))
+        self.env['purchase.rfq.bid.export'].create({'rfq_id': self.id})
+        self.env.ref('purchase_rfq_multi_vendor.ir_cron_process_bid_exports')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': _('The bid comparison is being exported. '
+                             'You will be notified when the file is attached to the RFQ.'),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    @profiled_action
+    def action_refresh_bid_requotes(self):
+        """Refresh every bid of the RFQ that was flagged for re-quote."""
+        self.rfq_bid_ids.action_refresh_requote()
+
+    @profiled_action
+    def action_generate_tender_packages(self):
+        """Queue the rendering of one tender package PDF per RFQ vendor."""
+        self.ensure_one()
+        if not self.rfq_vendor_ids:
+            raise UserError(_('Please add at least one vendor to the RFQ first.'))
+        if self.tender_package_state in ('queued', 'running'):
+            raise UserError(_('The tender packages of %s are already being generated.') % self.name)
+        self.write({
+            'tender_package_state': 'queued',
+            'tender_package_done': 0,
+            'tender_package_total': len(self.rfq_vendor_ids),
+        })
+        self.env.ref('purchase_rfq_multi_vendor.ir_cron_generate_tender_packages')._trigger()
+
+    # -------------------------------------------------------------------------
+    # Tender Packages
+    # -------------------------------------------------------------------------
+    @api.model
+    def _cron_generate_tender_packages(self, limit=5):
+        """Generate the queued tender packages, one RFQ at a time.
+
+        The worker holds a session advisory lock on the RFQ while rendering,
+        so the RFQs left running by a killed worker can be told apart and
+        queued again.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self._requeue_stale_tender_packages()
+        for rfq in self.search([('tender_package_state', '=', 'queued')], limit=limit, order='id'):
+            self.env.cr.execute(SQL("SELECT pg_try_advisory_lock(%s, %s)", TENDER_LOCK_KEY, rfq.id))
+            if not self.env.cr.fetchone()[0]:
+                continue
+            rfq.tender_package_state = 'running'
+            if auto_commit:
+                self.env.cr.commit()
+            try:
+                rfq._generate_tender_packages(auto_commit=auto_commit)
+                if auto_commit:
+                    self.env.cr.commit()
+            except Exception as e:
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                _logger.exception('Tender packages of RFQ %s failed', rfq.id)
+                rfq.tender_package_state = 'failed'
+                rfq.message_post(
+                    body=_('The tender packages could not be generated: %s') % e,
+                    message_type='notification',
+                )
+                self.env.cr.commit()
+            self.env.cr.execute(SQL("SELECT pg_advisory_unlock(%s, %s)", TENDER_LOCK_KEY, rfq.id))
+
+    @api.model
+    def _requeue_stale_tender_packages(self):
+        """Queue again the RFQs whose rendering worker is gone."""
+        stale = self.search([
+            ('tender_package_state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - JOB_STALE_AFTER),
+        ])
+        if not stale:
+            return
+        self.env.cr.execute(SQL(
+            "SELECT id FROM purchase_order WHERE id IN %s AND pg_try_advisory_xact_lock(%s, id)",
+            tuple(stale.ids), TENDER_LOCK_KEY,
+        ))
+        self.browse([row[0] for row in self.env.cr.fetchall()]).write({'tender_package_state': 'queued'})
+
+    def _get_tender_package_workers(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            'purchase_rfq_multi_vendor.tender_package_workers', '4',
+        )
+        try:
+            return max(int(value), 1)
+        except ValueError:
+            return 1
+
+    def _render_tender_covers(self, rfq_vendors):
+        """Yield ``(rfq_vendor_id, pdf)`` for the cover and terms of each vendor.
+
+        The covers of all vendors are rendered by a single QWeb call and only
+        the HTML to PDF conversions, which dominate the cost, run in the pool.
+        """
+        Report = self.env['ir.actions.report']
+        report_ref = 'purchase_rfq_multi_vendor.action_report_tender_cover'
+        report = Report._get_report(report_ref)
+        html = Report._render_qweb_html(report_ref, rfq_vendors.ids)[0]
+        bodies, res_ids, header, footer, specific_args = Report._prepare_html(
+            html, report_model=report.model,
+        )
+        if not all(res_ids) or len(res_ids) != len(bodies):
+            res_ids = rfq_vendors.ids
+        command_args = Report._build_wkhtmltopdf_args(
+            report.get_paperformat(), False, specific_paperformat_args=specific_args,
+        )
+        return convert_html_to_pdf(
+            dict(zip(res_ids, bodies)), command_args, header, footer,
+            max_workers=self._get_tender_package_workers(),
+        )
+
+    def _generate_tender_packages(self, auto_commit=False):
+        """Render and attach the tender package of every vendor of the RFQ.
+
+        The RFQ body, common to all vendors, is rendered once and prepended
+        with each vendor's cover. Progress is saved on the RFQ every few
+        packages, and all attachments are created in one batch at the end.
+        """
+        self.ensure_one()
+        rfq_vendors = self.rfq_vendor_ids
+        self.write({'tender_package_done': 0, 'tender_package_total': len(rfq_vendors)})
+        body_pdf = self.env['ir.actions.report']._render_qweb_pdf(
+            'purchase.report_purchase_quotation', self.ids,
+        )[0]
+
+        packages = {}
+        for rfq_vendor_id, cover_pdf in self._render_tender_covers(rfq_vendors):
+            packages[rfq_vendor_id] = merge_pdf([cover_pdf, body_pdf])
+            if len(packages) % TENDER_PROGRESS_STEP == 0:
+                self.tender_package_done = len(packages)
+                if auto_commit:
+                    self.env.cr.commit()
+
+        previous = rfq_vendors.tender_package_id
+        attachments = self.env['ir.attachment'].create([
+            {
+                'name': _('Tender package - %s - %s.pdf') % (self.name, rfq_vendor.vendor_id.name),
+                'raw': packages[rfq_vendor.id],
+                'res_model': 'purchase.rfq.vendor',
+                'res_id': rfq_vendor.id,
+                'mimetype': 'application/pdf',
+            }
+            for rfq_vendor in rfq_vendors
+        ])
+        for rfq_vendor, attachment in zip(rfq_vendors, attachments):
+            rfq_vendor.tender_package_id = attachment
+        previous.unlink()
+        self.write({'tender_package_state': 'done', 'tender_package_done': len(packages)})
+        self.message_post(
+            body=_('%s tender packages were generated.') % len(packages),
+            message_type='notification',
+        )
+
+
+class PurchaseOrderLine(models.Model):
+    _inherit = 'purchase.order.line'
+
+    # Fields frozen on bid lines; changing one of them on an RFQ line
+    # refreshes draft bids and flags submitted ones for re-quote.
+    _RFQ_SNAPSHOT_FIELDS = ('product_id', 'product_qty', 'product_uom')
+
+    rfq_bid_line_id = fields.Many2one(
+        'purchase.rfq.bid.line',
+        string='Awarded Bid Line',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        help='The bid line this purchase order line was awarded from.',
+    )
+
+    def write(self, vals):
+        res = super().write(vals)
+        if any(fname in vals for fname in self._RFQ_SNAPSHOT_FIELDS):
+            self._sync_bid_snapshots()
+        return res
+
+    def _sync_bid_snapshots(self):
+        """Propagate RFQ line changes to bid lines in one batch.
+
+        Draft bids are simply refreshed. Bids already submitted keep the
+        values the vendor quoted on and are flagged as needing a re-quote.
+        Awarded and rejected bids are left untouched.
+        """
+        bid_lines = self.env['purchase.rfq.bid.line'].search([
+            ('rfq_line_id', 'in', self.ids),
+            ('bid_id.state', 'in', ('draft', 'submitted', 'under_review')),
+        ])
+        stale_lines = bid_lines.filtered(lambda l: l._is_rfq_snapshot_stale())
+        if not stale_lines:
+            return
+        draft_lines = stale_lines.filtered(lambda l: l.bid_id.state == 'draft')
+        draft_lines._refresh_rfq_snapshot()
+        (stale_lines - draft_lines).filtered(
+            lambda l: not l.requote_needed
+        ).write({'requote_needed': True})
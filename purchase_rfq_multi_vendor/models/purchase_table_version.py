@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from odoo import fields, models
+
+
+class PurchaseTableVersion(models.Model):
+    """Change counter of the tables behind version-keyed ormcaches.
+
+    Rows are only read and bumped in SQL by ``tools.table_version``. The
+    bump is part of the transaction that changes the table, so other
+    workers see the new version together with the new rows.
+    """
+    _name = 'purchase.table.version'
+    _description = 'Table Version'
+    _log_access = False
+
+    table_name = fields.Char(string='Table', required=True, readonly=True)
+    version = fields.Integer(string='Version', required=True, readonly=True, default=0)
+
+    _sql_constraints = [
+        ('table_name_uniq', 'UNIQUE(table_name)', 'A table has only one version.'),
+    ]
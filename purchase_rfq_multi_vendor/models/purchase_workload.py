@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import time
+
+from odoo import api, fields, models, _
+from odoo.tools import SQL
+
+# Seconds the counters of a user are served from memory
+WORKLOAD_CACHE_TTL = 30
+
+# {(dbname, uid, company ids): (expiry, counters)}, local to the worker
+_counter_cache = {}
+
+
+class PurchaseWorkload(models.TransientModel):
+    """Open-workload counters of the buyer's home screen.
+
+    Every counter is a count over the open rows of a model only, each backed
+    by a partial index on the open states, so its cost does not depend on
+    the amount of closed history. Counts are built from the same domains,
+    and record rules, as the lists they open. All counters are read with
+    one query and kept for a few seconds per user and company selection.
+    """
+    _name = 'purchase.workload'
+    _description = 'Procurement Workload'
+
+    vendors_awaiting_count = fields.Integer(string='Vendors Awaiting Response', compute='_compute_counters')
+    my_vendors_awaiting_count = fields.Integer(string='My Vendors Awaiting Response', compute='_compute_counters')
+    bids_review_count = fields.Integer(string='Bids Under Review', compute='_compute_counters')
+    my_bids_review_count = fields.Integer(string='My Bids Under Review', compute='_compute_counters')
+
+    def _compute_counters(self):
+        counters = self.get_counters()
+        for workload in self:
+            for key, value in counters.items():
+                workload[key] = value
+
+    # -------------------------------------------------------------------------
+    # Counters
+    # -------------------------------------------------------------------------
+    @api.model
+    def _get_counter_definitions(self):
+        """Return ``{field name: definition}`` of every counter.
+
+        A definition holds the ``res_model`` and ``domain`` of the records
+        it counts, the same ones the counter opens. Keep the open state in
+        the domain so the count is served by the partial index on it.
+        Override to add counters.
+        """
+        company_domain = [('company_id', 'in', self.env.companies.ids)]
+        uid = self.env.uid
+        return {
+            'vendors_awaiting_count': {
+                'res_model': 'purchase.rfq.vendor',
+                'domain': [('status', '=', 'sent'), *company_domain],
+                'name': _('Vendors Awaiting Response'),
+            },
+            'my_vendors_awaiting_count': {
+                'res_model': 'purchase.rfq.vendor',
+                'domain': [('status', '=', 'sent'), ('rfq_id.user_id', '=', uid), *company_domain],
+                'name': _('My Vendors Awaiting Response'),
+            },
+            'bids_review_count': {
+                'res_model': 'purchase.rfq.bid',
+                'domain': [('state', '=', 'under_review'), *company_domain],
+                'name': _('Bids Under Review'),
+            },
+            'my_bids_review_count': {
+                'res_model': 'purchase.rfq.bid',
+                'domain': [('state', '=', 'under_review'), ('rfq_id.user_id', '=', uid), *company_domain],
+                'name': _('My Bids Under Review'),
+            },
+        }
+
+    @api.model
+    def _get_counter_query(self, definition):
+        """Return the ``SQL`` counting the records of a counter definition.
+
+        The query is built by the ORM, so the record rules of the user apply
+        exactly as in the list the counter opens. Models the user cannot
+        read count 0.
+        """
+        Model = self.env[definition['res_model']]
+        if not Model.has_access('read'):
+            return SQL("0")
+        query = Model._search(definition['domain'])
+        query.order = None
+        return query.select(SQL("count(*)"))
+
+    @api.model
+    def get_counters(self):
+        """Return ``{counter: value}`` for the current user and companies.
+
+        The counts are computed with a single query and cached for
+        ``WORKLOAD_CACHE_TTL`` seconds.
+        """
+        key = (self.env.cr.dbname, self.env.uid, tuple(sorted(self.env.companies.ids)))
+        now = time.monotonic()
+        cached = _counter_cache.get(key)
+        if cached and cached[0] > now:
+            return dict(cached[1])
+
+        definitions = self._get_counter_definitions()
+        names = list(definitions)
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            "SELECT %s",
+            SQL(", ").join(SQL("(%s)", self._get_counter_query(definitions[name])) for name in names),
+        ))
+        counters = dict(zip(names, self.env.cr.fetchone()))
+        # Drop the expired entries now and then so the cache stays small
+        if len(_counter_cache) > 1000:
+            for stale in [k for k, (expiry, _values) in _counter_cache.items() if expiry <= now]:
+                _counter_cache.pop(stale, None)
+        _counter_cache[key] = (now + WORKLOAD_CACHE_TTL, counters)
+        return dict(counters)
+
+    def action_open_counter(self):
+        """Open the records behind the counter given in the context."""
+        definition = self._get_counter_definitions()[self.env.context['counter']]
+        return {
+            'name': definition['name'],
+            'type': 'ir.actions.act_window',
+            'res_model': definition['res_model'],
+            'view_mode': 'list,form',
+            'domain': definition['domain'],
+        }
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from odoo import api, models, tools
+from odoo.tools import frozendict
+
+from ..tools.table_version import bump_table_version, get_table_version
+
+
+class ResCurrency(models.Model):
+    _inherit = 'res.currency'
+
+    @api.model
+    def _get_rfq_rate_table(self, company_id, date):
+        """Return ``{currency_id: rate}`` for all currencies at ``date``.
+
+        The rates of every currency are fetched in one query and kept in the
+        LRU ormcache, so converting the bids of a comparison costs at most
+        one query per (company, date) instead of one ``_convert`` per line.
+        The cache key holds the version of the rate table, so a rate change
+        only misses these entries. An amount converts from currency A to B
+        as ``amount * rate[B] / rate[A]``.
+        """
+        version = get_table_version(self.env, self.env['res.currency.rate']._table)
+        return self._get_rfq_rate_table_cached(company_id, date, version)
+
+    @api.model
+    @tools.ormcache('company_id', 'date', 'version')
+    def _get_rfq_rate_table_cached(self, company_id, date, version):
+        company = self.env['res.company'].browse(company_id)
+        currencies = self.sudo().with_context(active_test=False).search([])
+        return frozendict(currencies._get_rates(company, date))
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        bump_table_version(self.env, self._table)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        bump_table_version(self.env, self._table)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        bump_table_version(self.env, self._table)
+        return res
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import base64
+import io
+import json
+import zlib
+
+import xlsxwriter
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from .rfq_bid import RANKED_BID_STATES
+
+# Version of the snapshot payload layout, bumped on incompatible changes
+SNAPSHOT_VERSION = 1
+
+
+class RFQAwardSnapshot(models.Model):
+    """Frozen copy of the bid comparison at the time of an award.
+
+    The whole comparison (RFQ lines, every competing bid and all their line
+    prices, ranks and flags, the award notes and the user) is stored as one
+    zlib-compressed JSON document. Audit views and exports read this row
+    only, so later edits to bids, RFQ lines or vendors never change what
+    the auditor sees. The awarded RFQ and bid cannot be deleted while
+    their snapshot exists.
+    """
+    _name = 'purchase.rfq.award.snapshot'
+    _description = 'Bid Award Snapshot'
+    _order = 'id desc'
+
+    name = fields.Char(string='Reference', required=True, readonly=True)
+    rfq_id = fields.Many2one(
+        'purchase.order',
+        string='RFQ',
+        required=True,
+        readonly=True,
+        ondelete='restrict',
+        index=True,
+    )
+    bid_id = fields.Many2one(
+        'purchase.rfq.bid',
+        string='Awarded Bid',
+        required=True,
+        readonly=True,
+        ondelete='restrict',
+    )
+    purchase_order_id = fields.Many2one(
+        'purchase.order',
+        string='Purchase Order',
+        readonly=True,
+        ondelete='set null',
+    )
+    user_id = fields.Many2one('res.users', string='Awarded By', required=True, readonly=True)
+    date = fields.Datetime(string='Awarded On', required=True, readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    bid_count = fields.Integer(string='Bids Compared', readonly=True)
+    line_count = fields.Integer(string='Lines Compared', readonly=True)
+    data = fields.Binary(string='Snapshot', attachment=False, readonly=True)
+    comparison_html = fields.Html(
+        string='Comparison',
+        compute='_compute_comparison_html',
+        sanitize=False,
+    )
+
+    _sql_constraints = [
+        ('bid_unique', 'UNIQUE(bid_id)', 'A bid can only have one award snapshot.'),
+    ]
+
+    # -------------------------------------------------------------------------
+    # Immutability
+    # -------------------------------------------------------------------------
+    def write(self, vals):
+        raise UserError(_('Award snapshots cannot be modified.'))
+
+    def unlink(self):
+        raise UserError(_('Award snapshots cannot be deleted.'))
+
+    # -------------------------------------------------------------------------
+    # Payload
+    # -------------------------------------------------------------------------
+    @api.model
+    def _encode(self, payload):
+        raw = json.dumps(payload, separators=(',', ':'), default=str).encode()
+        return base64.b64encode(zlib.compress(raw, 9))
+
+    def _get_payload(self):
+        self.ensure_one()
+        if not self.data:
+            return {}
+        return json.loads(zlib.decompress(base64.b64decode(self.data)))
+
+    @api.model
+    def _capture(self, bid, notes=False, use_bid_pricing=True):
+        """Return the comparison payload of the RFQ of ``bid`` as it is now.
+
+        Call it before the award changes the bid states. The competing
+        lines are read with one query.
+        """
+        rfq = bid.rfq_id
+        bids = self.env['purchase.rfq.bid'].search([
+            ('rfq_id', '=', rfq.id),
+            ('state', 'in', RANKED_BID_STATES),
+        ])
+        rfq_lines = rfq.order_line.filtered(lambda l: not l.display_type)
+        self.env['purchase.rfq.bid.line'].flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT line.bid_id, line.rfq_line_id, line.no_quote, line.price_unit,
+                   line.vendor_uom_id, line.price_unit_rfq_uom, line.discount,
+                   line.delivery_lead_time, line.price_subtotal, line.price_total,
+                   line.price_unit_compare, line.rank, line.price_anomaly,
+                   line.price_anomaly_score
+              FROM purchase_rfq_bid_line line
+             WHERE line.bid_id IN %s
+          ORDER BY line.rfq_line_id, line.rank NULLS LAST, line.id
+            """,
+            tuple(bids.ids) or (0,),
+        ))
+        columns = [
+            'bid_id', 'rfq_line_id', 'no_quote', 'price_unit', 'vendor_uom',
+            'price_unit_rfq_uom', 'discount', 'delivery_lead_time', 'price_subtotal',
+            'price_total', 'price_unit_compare', 'rank', 'price_anomaly',
+            'price_anomaly_score',
+        ]
+        lines = [dict(zip(columns, row)) for row in self.env.cr.fetchall()]
+        uom_names = {
+            uom.id: uom.name
+            for uom in self.env['uom.uom'].browse(list({line['vendor_uom'] for line in lines if line['vendor_uom']}))
+        }
+        for line in lines:
+            line['vendor_uom'] = uom_names.get(line['vendor_uom'], '')
+        return {
+            'version': SNAPSHOT_VERSION,
+            'rfq': {
+                'id': rfq.id,
+                'name': rfq.name,
+                'currency': rfq.currency_id.name,
+                'lines': [
+                    {
+                        'id': line.id,
+                        'product': line.product_id.display_name,
+                        'description': line.name,
+                        'quantity': line.product_qty,
+                        'uom': line.product_uom.name,
+                    }
+                    for line in rfq_lines
+                ],
+            },
+            'bids': [
+                {
+                    'id': b.id,
+                    'name': b.name,
+                    'vendor': b.vendor_id.display_name,
+                    'state': b.state,
+                    'bid_date': b.bid_date,
+                    'currency': b.currency_id.name,
+                    'currency_rate': b.currency_rate,
+                    'amount_untaxed': b.amount_untaxed,
+                    'amount_total': b.amount_total,
+                    'amount_total_rfq_currency': b.amount_total_rfq_currency,
+                    'delivery_terms': b.delivery_terms,
+                    'payment_terms': b.payment_terms,
+                }
+                for b in bids
+            ],
+            'lines': lines,
+            'award': {
+                'bid_id': bid.id,
+                'vendor': bid.vendor_id.display_name,
+                'user': self.env.user.name,
+                'date': fields.Datetime.now(),
+                'notes': notes or '',
+                'use_bid_pricing': use_bid_pricing,
+            },
+        }
+
+    @api.model
+    def _create_from_payload(self, bid, payload, purchase_order=False):
+        return self.sudo().create({
+            'name': _('Award of %s') % payload['rfq']['name'],
+            'rfq_id': bid.rfq_id.id,
+            'bid_id': bid.id,
+            'purchase_order_id': purchase_order.id if purchase_order else False,
+            'user_id': self.env.uid,
+            'date': fields.Datetime.now(),
+            'company_id': bid.rfq_id.company_id.id,
+            'bid_count': len(payload['bids']),
+            'line_count': len(payload['rfq']['lines']),
+            'data': self._encode(payload),
+        })
+
+    # -------------------------------------------------------------------------
+    # Audit
+    # -------------------------------------------------------------------------
+    def _get_comparison_table(self):
+        """Return ``(payload, bids, rows)``, rows being ``(rfq line, [bid line per bid])``."""
+        payload = self._get_payload()
+        bids = payload.get('bids', [])
+        by_key = {(line['rfq_line_id'], line['bid_id']): line for line in payload.get('lines', [])}
+        rows = [
+            (rfq_line, [by_key.get((rfq_line['id'], b['id'])) for b in bids])
+            for rfq_line in payload.get('rfq', {}).get('lines', [])
+        ]
+        return payload, bids, rows
+
+    @api.depends('data')
+    def _compute_comparison_html(self):
+        for snapshot in self:
+            payload, bids, rows = snapshot._get_comparison_table()
+            snapshot.comparison_html = self.env['ir.qweb']._render(
+                'purchase_rfq_multi_vendor.award_snapshot_comparison',
+                {'payload': payload, 'bids': bids, 'rows': rows},
+            ) if payload else False
+
+    def action_export_xlsx(self):
+        """Download the frozen comparison as a spreadsheet."""
+        self.ensure_one()
+        payload, bids, rows = self._get_comparison_table()
+        output = io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        sheet = workbook.add_worksheet(_('Award Snapshot'))
+        bold = workbook.add_format({'bold': True})
+        awarded = workbook.add_format({'bg_color': '#D1E7DD'})
+        award = payload['award']
+        sheet.write_row(0, 0, [_('RFQ'), payload['rfq']['name'], _('Awarded By'), award['user'],
+                               _('Awarded On'), award['date']], bold)
+        sheet.write_row(1, 0, [_('Notes'), award['notes']])
+        header = [_('Product'), _('Quantity'), _('Unit')]
+        for b in bids:
+            header += ['%s (%s)' % (b['vendor'], b['currency']), _('Rank')]
+        sheet.write_row(3, 0, header, bold)
+        for row, (rfq_line, quotes) in enumerate(rows, start=4):
+            sheet.write_row(row, 0, [rfq_line['product'], rfq_line['quantity'], rfq_line['uom']])
+            col = 3
+            for b, quote in zip(bids, quotes):
+                cell_format = awarded if b['id'] == award['bid_id'] else None
+                if quote and quote['no_quote']:
+                    sheet.write(row, col, _('No quote'), cell_format)
+                elif quote:
+                    sheet.write_row(row, col, [quote['price_unit'], quote['rank'] or ''], cell_format)
+                col += 2
+        workbook.close()
+        attachment = self.env['ir.attachment'].create({
+            'name': _('Award snapshot - %s.xlsx') % payload['rfq']['name'],
+            'raw': output.getvalue(),
+            'res_model': self._name,
+            'res_id': self.id,
+            'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % attachment.id,
+            'target': 'self',
+        }
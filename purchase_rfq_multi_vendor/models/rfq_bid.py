@@ -1,16 +1,48 @@
 # -*- coding: utf-8 -*-
 # Part of Purchase Multi-Vendor RFQ module.
 
+import bisect
+import logging
+import math
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
 from odoo import api, fields, models, _
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL, float_compare
+
+from ..tools import price_anomaly, profiled_action
+
+_logger = logging.getLogger(__name__)
+
+# Bid states whose lines take part in the per-line ranking
+RANKED_BID_STATES = ('submitted', 'under_review', 'awarded')
+# First key of the transaction-level advisory locks taken per RFQ line
+AUCTION_LOCK_KEY = 0x52465131
+# Number of bid lines checked and committed at once by the nightly detection
+ANOMALY_BATCH_SIZE = 2000
 
 
 class RFQBid(models.Model):
     _name = 'purchase.rfq.bid'
     _description = 'RFQ Vendor Bid'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = [
+        'purchase.audit.mixin', 'mail.thread', 'mail.activity.mixin',
+        'purchase.rfq.transition.mixin',
+    ]
     _rec_name = 'name'
-    _order = 'amount_total asc, id desc'
+    _order = 'amount_total_rfq_currency asc, id desc'
+
+    _audit_fields = ('bid_date', 'state')
+    _transition_field = 'state'
+    _transitions = {
+        'draft': ('submitted',),
+        'submitted': ('under_review', 'awarded', 'rejected'),
+        'under_review': ('awarded', 'rejected'),
+        'rejected': ('draft',),
+        'awarded': (),
+    }
 
     name = fields.Char(
         string='Bid Reference',
@@ -18,6 +50,7 @@ class RFQBid(models.Model):
         default='New',
         readonly=True,
         copy=False,
+        index='trigram',
     )
 
     rfq_vendor_id = fields.Many2one(
@@ -71,10 +104,25 @@ class RFQBid(models.Model):
 
     currency_id = fields.Many2one(
         'res.currency',
-        related='rfq_id.currency_id',
+        compute='_compute_currency_id',
         string='Currency',
-        readonly=True,
+        required=True,
         store=True,
+        readonly=False,
+        help='Currency the vendor quotes in. Defaults to the RFQ currency.',
+    )
+    rfq_currency_id = fields.Many2one(
+        'res.currency',
+        related='rfq_id.currency_id',
+        string='RFQ Currency',
+    )
+    currency_rate = fields.Float(
+        string='Rate to RFQ Currency',
+        compute='_compute_currency_rate',
+        digits=0,
+        store=True,
+        help='Multiply an amount of the bid by this rate to express it in the '
+             'RFQ currency, using the rate at the bid date.',
     )
 
     amount_untaxed = fields.Monetary(
@@ -95,10 +143,30 @@ class RFQBid(models.Model):
         store=True,
         currency_field='currency_id',
     )
+    amount_untaxed_rfq_currency = fields.Monetary(
+        string='Untaxed Amount (RFQ Currency)',
+        compute='_compute_amount_rfq_currency',
+        store=True,
+        currency_field='rfq_currency_id',
+    )
+    amount_total_rfq_currency = fields.Monetary(
+        string='Total (RFQ Currency)',
+        compute='_compute_amount_rfq_currency',
+        store=True,
+        currency_field='rfq_currency_id',
+        help='Bid total converted to the RFQ currency, used to rank bids.',
+    )
+
+    requote_needed = fields.Boolean(
+        string='Re-quote Needed',
+        compute='_compute_requote_needed',
+        store=True,
+        help='The RFQ lines changed after this bid was submitted.',
+    )
 
-    delivery_terms = fields.Text(string='Delivery Terms')
-    payment_terms = fields.Text(string='Payment Terms')
-    notes = fields.Html(string='Vendor Notes')
+    delivery_terms = fields.Text(string='Delivery Terms', index='trigram')
+    payment_terms = fields.Text(string='Payment Terms', index='trigram')
+    notes = fields.Html(string='Vendor Notes', index='trigram')
 
     company_id = fields.Many2one(
         'res.company',
@@ -107,6 +175,17 @@ class RFQBid(models.Model):
         readonly=True,
     )
 
+    def init(self):
+        # Workload counters only look at the bids under review
+        self.env.cr.execute(SQL(
+            """
+            CREATE INDEX IF NOT EXISTS purchase_rfq_bid_under_review_index
+                ON %s (company_id, rfq_id)
+             WHERE state = 'under_review'
+            """,
+            SQL.identifier(self._table),
+        ))
+
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
@@ -116,6 +195,17 @@ class RFQBid(models.Model):
                 ) or 'New'
         return super().create(vals_list)
 
+    def write(self, vals):
+        res = super().write(vals)
+        if {'currency_id', 'bid_date'} & vals.keys():
+            # The comparable prices follow the currency rate of the bid
+            self._update_line_ranks()
+        return res
+
+    def _update_line_ranks(self):
+        """Rank again the lines of the ranked bids of ``self``."""
+        self.filtered(lambda bid: bid.state in RANKED_BID_STATES).bid_line_ids._update_ranks()
+
     @api.depends('bid_line_ids.price_subtotal', 'bid_line_ids.price_tax')
     def _compute_amount(self):
         for bid in self:
@@ -127,31 +217,68 @@ class RFQBid(models.Model):
                 'amount_total': amount_untaxed + amount_tax,
             })
 
+    @api.depends('rfq_vendor_id')
+    def _compute_currency_id(self):
+        for bid in self:
+            if not bid.currency_id:
+                bid.currency_id = bid.rfq_vendor_id.rfq_id.currency_id or self.env.company.currency_id
+
+    @api.depends('currency_id', 'rfq_id.currency_id', 'company_id', 'bid_date')
+    def _compute_currency_rate(self):
+        Currency = self.env['res.currency']
+        for bid in self:
+            rfq_currency = bid.rfq_id.currency_id
+            if not rfq_currency or not bid.currency_id or bid.currency_id == rfq_currency:
+                bid.currency_rate = 1.0
+                continue
+            rates = Currency._get_rfq_rate_table(
+                (bid.company_id or self.env.company).id,
+                fields.Date.to_date(bid.bid_date or fields.Datetime.now()),
+            )
+            bid.currency_rate = rates[rfq_currency.id] / rates[bid.currency_id.id]
+
+    @api.depends('amount_untaxed', 'amount_total', 'currency_rate')
+    def _compute_amount_rfq_currency(self):
+        for bid in self:
+            bid.amount_untaxed_rfq_currency = bid.amount_untaxed * bid.currency_rate
+            bid.amount_total_rfq_currency = bid.amount_total * bid.currency_rate
+
+    @api.depends('bid_line_ids.requote_needed')
+    def _compute_requote_needed(self):
+        for bid in self:
+            bid.requote_needed = any(bid.bid_line_ids.mapped('requote_needed'))
+
+    @profiled_action
     def action_submit(self):
-        """Submit the bid for review."""
-        self.ensure_one()
-        if not self.bid_line_ids:
-            raise UserError(_('Cannot submit a bid without any bid lines.'))
-        if any(line.price_unit <= 0 for line in self.bid_line_ids):
-            raise UserError(_('All bid lines must have a unit price greater than zero.'))
-
-        self.write({'state': 'submitted'})
-        # Update vendor link status
-        self.rfq_vendor_id.write({
-            'status': 'bid_received',
-            'response_date': fields.Datetime.now(),
-        })
+        """Submit the bids for review."""
+        for bid in self:
+            quoted_lines = bid.bid_line_ids.filtered(lambda line: not line.no_quote)
+            if not quoted_lines:
+                raise UserError(_('Cannot submit a bid without any quoted line.'))
+            if any(line.price_unit <= 0 for line in quoted_lines):
+                raise UserError(_(
+                    'All quoted lines must have a unit price greater than zero. '
+                    'Mark the items the vendor does not quote as "No Quote".'
+                ))
+        self._transition('submitted')
+        self.bid_line_ids._detect_price_anomalies()
 
+    @profiled_action
     def action_under_review(self):
-        """Mark bid as under review."""
-        self.ensure_one()
-        self.write({'state': 'under_review'})
+        """Mark bids as under review."""
+        self._transition('under_review')
 
+    @profiled_action
     def action_award(self):
         """Open the award wizard to confirm and create PO."""
         self.ensure_one()
         if self.state not in ('submitted', 'under_review'):
             raise UserError(_('Only submitted or under-review bids can be awarded.'))
+        if self.requote_needed:
+            raise UserError(_(
+                'The RFQ changed after bid %s was submitted. '
+                'Refresh the bid quantities before awarding it.'
+            ) % self.name)
 
         return {
             'name': _('Award Bid & Create Purchase Order'),
@@ -165,21 +292,94 @@ class RFQBid(models.Model):
             },
         }
 
+    def _job_award(self, use_bid_pricing=True, notes=False):
+        """Award the bids from a background job, as the award wizard does."""
+        orders = self.env['purchase.order']
+        for bid in self:
+            orders |= self.env['purchase.rfq.select.winner.wizard'].create({
+                'bid_id': bid.id,
+                'rfq_id': bid.rfq_id.id,
+                'use_bid_pricing': use_bid_pricing,
+                'notes': notes,
+            })._confirm_winner()
+        return orders
+
+    @profiled_action
     def action_reject(self):
-        """Reject this bid."""
-        self.ensure_one()
-        self.write({'state': 'rejected'})
-        # If no other bids are submitted/awarded, update vendor status
-        other_active_bids = self.rfq_vendor_id.bid_ids.filtered(
-            lambda b: b.id != self.id and b.state in ('submitted', 'under_review', 'awarded')
-        )
-        if not other_active_bids:
-            self.rfq_vendor_id.write({'status': 'rejected'})
+        """Reject the bids."""
+        self._transition('rejected')
 
+    @profiled_action
     def action_reset_draft(self):
-        """Reset bid to draft state."""
+        """Reset bids to draft state."""
+        self._transition('draft')
+
+    def _on_transition(self, previous_values, new_value):
+        super()._on_transition(previous_values, new_value)
+        # The vendor status is derived from the states of all its bids
+        self.rfq_vendor_id._sync_status_from_bids()
+        # Bids entering or leaving the ranked states move in the line ranking
+        if new_value in RANKED_BID_STATES or any(
+            value in RANKED_BID_STATES for value in previous_values.values()
+        ):
+            self.bid_line_ids._update_ranks()
+
+    def submit_auction_prices(self, prices):
+        """Improve the unit prices of submitted bids during a live auction.
+
+        :param dict prices: {bid line id: new unit price}
+        """
+        prices = {int(line_id): price for line_id, price in prices.items()}
+        lines = self.env['purchase.rfq.bid.line'].browse(list(prices)).exists()
+        if lines.bid_id - self:
+            raise UserError(_('The prices must belong to the given bids.'))
+        for rfq in lines.bid_id.rfq_id:
+            rfq._check_auction_open()
+        if any(bid.state not in ('submitted', 'under_review') for bid in lines.bid_id):
+            raise UserError(_('Only submitted bids can be improved during an auction.'))
+        for line in lines:
+            if not 0 < prices[line.id] < line.price_unit:
+                raise UserError(_(
+                    'During an auction the price of %(product)s can only be lowered '
+                    '(current price: %(price)s).',
+                    product=line.product_id.display_name,
+                    price=line.price_unit,
+                ))
+        # One write per distinct price; the ranking is updated by write()
+        lines_by_price = {}
+        for line in lines:
+            lines_by_price.setdefault(prices[line.id], []).append(line.id)
+        for price, line_ids in lines_by_price.items():
+            lines.browse(line_ids).write({'price_unit': price})
+        return {line.id: line.rank for line in lines}
+
+    def action_edit_bid_lines(self):
+        """Open the bid lines in a paginated editor."""
         self.ensure_one()
-        self.write({'state': 'draft'})
+        return {
+            'name': _('Lines of %s') % self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.rfq.bid.line',
+            'view_mode': 'list',
+            'views': [(self.env.ref('purchase_rfq_multi_vendor.view_purchase_rfq_bid_line_editor_list').id, 'list')],
+            'search_view_id': self.env.ref('purchase_rfq_multi_vendor.view_purchase_rfq_bid_line_search').id,
+            'domain': [('bid_id', '=', self.id)],
+            'context': {'default_bid_id': self.id},
+        }
+
+    @profiled_action
+    def action_refresh_requote(self):
+        """Refresh the frozen RFQ values of every bid flagged for re-quote."""
+        bids = self.filtered('requote_needed')
+        if not bids:
+            return
+        bids.bid_line_ids.filtered('requote_needed')._refresh_rfq_snapshot()
+        for bid in bids:
+            bid.message_post(
+                body=_('Quantities and units were refreshed from the RFQ. '
+                       'Please confirm the quoted prices with the vendor.'),
+                message_type='notification',
+            )
 
 
 class RFQBidLine(models.Model):
@@ -200,15 +400,31 @@ class RFQBidLine(models.Model):
         'purchase.order.line',
         string='RFQ Line',
         required=True,
+        index=True,
         help='The original RFQ line this bid line corresponds to.',
     )
+    rfq_id = fields.Many2one(
+        related='bid_id.rfq_id',
+        string='RFQ',
+    )
+    bid_state = fields.Selection(
+        related='bid_id.state',
+        string='Bid Status',
+    )
+    no_quote = fields.Boolean(
+        string='No Quote',
+        help='The vendor declines to quote this item. The line is left out '
+             'of the bid totals, the ranking and the award.',
+    )
 
+    # Snapshot of the RFQ line, frozen so that later RFQ edits do not
+    # silently rewrite the bid (see purchase.order.line.write)
     product_id = fields.Many2one(
         'product.product',
-        related='rfq_line_id.product_id',
+        compute='_compute_rfq_snapshot',
         string='Product',
-        readonly=True,
         store=True,
+        readonly=False,
     )
     product_description = fields.Text(
         related='rfq_line_id.name',
@@ -216,25 +432,58 @@ class RFQBidLine(models.Model):
         readonly=True,
     )
     product_qty = fields.Float(
-        related='rfq_line_id.product_qty',
+        compute='_compute_rfq_snapshot',
         string='Requested Qty',
-        readonly=True,
+        digits='Product Unit of Measure',
         store=True,
+        readonly=False,
     )
     product_uom = fields.Many2one(
         'uom.uom',
-        related='rfq_line_id.product_uom',
+        compute='_compute_rfq_snapshot',
         string='Unit of Measure',
-        readonly=True,
         store=True,
+        readonly=False,
+    )
+    product_uom_category_id = fields.Many2one(
+        related='product_uom.category_id',
+    )
+    requote_needed = fields.Boolean(
+        string='Re-quote Needed',
+        readonly=True,
+        copy=False,
+        help='The RFQ line changed after the bid was submitted.',
     )
 
     # Vendor bid values
+    vendor_uom_id = fields.Many2one(
+        'uom.uom',
+        compute='_compute_vendor_uom_id',
+        string='Vendor Unit',
+        store=True,
+        readonly=False,
+        help='Unit the vendor quotes in, from the category of the RFQ unit '
+             '(e.g. boxes when units are requested).',
+    )
+    vendor_qty = fields.Float(
+        compute='_compute_vendor_qty',
+        string='Vendor Qty',
+        digits='Product Unit of Measure',
+        store=True,
+        help='Requested quantity expressed in the vendor unit.',
+    )
     price_unit = fields.Float(
         string='Unit Price (Bid)',
         required=True,
         digits='Product Price',
-        help='Unit price offered by the vendor.',
+        help='Unit price offered by the vendor, per vendor unit.',
+    )
+    price_unit_rfq_uom = fields.Float(
+        compute='_compute_price_unit_rfq_uom',
+        string='Unit Price (RFQ Unit)',
+        digits='Product Price',
+        store=True,
+        help='Unit price offered by the vendor, converted to the RFQ unit.',
     )
     discount = fields.Float(
         string='Discount (%)',
@@ -266,24 +515,174 @@ class RFQBidLine(models.Model):
         string='Total',
         store=True,
     )
+    price_unit_compare = fields.Float(
+        compute='_compute_price_unit_compare',
+        string='Comparable Unit Price',
+        digits='Product Price',
+        store=True,
+        help='Discounted unit price expressed in the RFQ currency and unit, '
+             'used to compare and rank the bids of the same RFQ line.',
+    )
+    rank = fields.Integer(
+        string='Rank',
+        readonly=True,
+        copy=False,
+        help='Position of this offer among the submitted bids of the same '
+             'RFQ line, 1 being the lowest comparable price.',
+    )
+    price_anomaly = fields.Selection([
+        ('low', 'Suspiciously Low'),
+        ('high', 'Unusually High'),
+    ], string='Price Anomaly', readonly=True, copy=False, index='btree_not_null',
+        help='Set when the price is an outlier among the competing offers on '
+             'the same RFQ line or against the recent purchase prices of the product.')
+    price_anomaly_score = fields.Float(
+        string='Anomaly Score',
+        readonly=True,
+        copy=False,
+        digits=(16, 2),
+        help='Robust z-score of the price among the competing offers.',
+    )
 
     currency_id = fields.Many2one(
         'res.currency',
-        related='bid_id.currency_id',
+        compute='_compute_pricing_context',
         store=True,
         readonly=True,
     )
     company_id = fields.Many2one(
         'res.company',
-        related='bid_id.company_id',
+        compute='_compute_pricing_context',
         store=True,
         readonly=True,
     )
 
-    @api.depends('product_qty', 'price_unit', 'discount', 'taxes_id')
+    _sql_constraints = [
+        ('bid_rfq_line_uniq',
+         'UNIQUE(bid_id, rfq_line_id)',
+         'A bid can only quote each RFQ line once.'),
+    ]
+
+    def init(self):
+        # Rank the RFQ lines holding ranked offers without a rank, such as
+        # the bids submitted before the ranking existed
+        self.env.cr.execute(SQL(
+            """
+            WITH offers AS (
+                SELECT line.id, line.rfq_line_id, line.rank,
+                       row_number() OVER (
+                           PARTITION BY line.rfq_line_id
+                           ORDER BY COALESCE(line.price_unit_compare, 0), line.id
+                       ) AS new_rank
+                  FROM purchase_rfq_bid_line line
+                  JOIN purchase_rfq_bid bid ON bid.id = line.bid_id
+                 WHERE bid.state IN %(states)s
+                   AND NOT COALESCE(line.no_quote, FALSE)
+                   AND line.rfq_line_id IN (
+                        SELECT unranked.rfq_line_id
+                          FROM purchase_rfq_bid_line unranked
+                          JOIN purchase_rfq_bid unranked_bid ON unranked_bid.id = unranked.bid_id
+                         WHERE unranked_bid.state IN %(states)s
+                           AND NOT COALESCE(unranked.no_quote, FALSE)
+                           AND unranked.rank IS NULL
+                   )
+            )
+            UPDATE purchase_rfq_bid_line line
+               SET rank = offers.new_rank
+              FROM offers
+             WHERE line.id = offers.id
+               AND line.rank IS DISTINCT FROM offers.new_rank
+            """,
+            states=RANKED_BID_STATES,
+        ))
+
+    @api.depends('rfq_line_id')
+    def _compute_rfq_snapshot(self):
+        for line in self:
+            line.update(line._prepare_rfq_snapshot(line.rfq_line_id))
+
+    @api.depends('product_uom')
+    def _compute_vendor_uom_id(self):
+        for line in self:
+            if line.vendor_uom_id.category_id != line.product_uom.category_id:
+                line.vendor_uom_id = line.product_uom
+
+    @api.constrains('vendor_uom_id', 'product_uom')
+    def _check_vendor_uom_id(self):
+        for line in self:
+            if line.vendor_uom_id and line.vendor_uom_id.category_id != line.product_uom.category_id:
+                raise ValidationError(_(
+                    'The vendor unit of %(product)s must belong to the category of %(uom)s.',
+                    product=line.product_id.display_name,
+                    uom=line.product_uom.name,
+                ))
+
+    def _get_vendor_uom_ratio(self):
+        """Return the number of vendor units in one RFQ unit of the line."""
+        self.ensure_one()
+        if not self.vendor_uom_id or self.vendor_uom_id == self.product_uom:
+            return 1.0
+        factors = self.env['uom.uom']._get_rfq_uom_factors(self.product_uom.category_id.id)
+        return factors[self.vendor_uom_id.id] / factors[self.product_uom.id]
+
+    @api.depends('product_qty', 'product_uom', 'vendor_uom_id')
+    def _compute_vendor_qty(self):
+        for line in self:
+            line.vendor_qty = line.product_qty * line._get_vendor_uom_ratio()
+
+    @api.depends('price_unit', 'product_uom', 'vendor_uom_id')
+    def _compute_price_unit_rfq_uom(self):
+        for line in self:
+            line.price_unit_rfq_uom = line.price_unit * line._get_vendor_uom_ratio()
+
+    @api.depends('bid_id', 'bid_id.currency_id')
+    def _compute_pricing_context(self):
+        for line in self:
+            line.currency_id = line.bid_id.currency_id
+            line.company_id = line.bid_id.company_id
+
+    @api.model
+    def _prepare_rfq_snapshot(self, rfq_line):
+        """Return the values of ``rfq_line`` frozen on its bid lines."""
+        return {
+            'product_id': rfq_line.product_id.id,
+            'product_qty': rfq_line.product_qty,
+            'product_uom': rfq_line.product_uom.id,
+        }
+
+    def _is_rfq_snapshot_stale(self):
+        self.ensure_one()
+        snapshot = self._prepare_rfq_snapshot(self.rfq_line_id)
+        rounding = self.rfq_line_id.product_uom.rounding or self.product_uom.rounding
+        for fname, value in snapshot.items():
+            field_type = self._fields[fname].type
+            if field_type == 'many2one':
+                if self[fname].id != value:
+                    return True
+            elif field_type == 'float':
+                # Quantities only differ beyond the rounding of their unit
+                if float_compare(self[fname], value, precision_rounding=rounding):
+                    return True
+            elif self[fname] != value:
+                return True
+        return False
+
+    def _refresh_rfq_snapshot(self):
+        """Copy the current RFQ line values on the bid lines, batched per RFQ line."""
+        for rfq_line, lines in self.grouped('rfq_line_id').items():
+            lines.write(dict(
+                self._prepare_rfq_snapshot(rfq_line),
+                requote_needed=False,
+            ))
+
+    @api.depends('product_qty', 'price_unit_rfq_uom', 'discount', 'taxes_id', 'no_quote')
     def _compute_amount(self):
         for line in self:
-            price = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
+            if line.no_quote:
+                line.update({'price_tax': 0.0, 'price_total': 0.0, 'price_subtotal': 0.0})
+                continue
+            # Requested quantity and price both in the RFQ unit
+            price = line.price_unit_rfq_uom * (1 - (line.discount or 0.0) / 100.0)
             taxes = line.taxes_id.compute_all(
                 price,
                 line.currency_id,
@@ -298,3 +697,272 @@ class RFQBidLine(models.Model):
                 'price_total': taxes['total_included'],
                 'price_subtotal': taxes['total_excluded'],
             })
+
+    @api.depends('price_unit_rfq_uom', 'discount', 'no_quote', 'bid_id.currency_rate')
+    def _compute_price_unit_compare(self):
+        for line in self:
+            if line.no_quote:
+                line.price_unit_compare = 0.0
+                continue
+            price = line.price_unit_rfq_uom * (1 - (line.discount or 0.0) / 100.0)
+            line.price_unit_compare = price * (line.bid_id.currency_rate or 1.0)
+
+    # -------------------------------------------------------------------------
+    # Ranking
+    # -------------------------------------------------------------------------
+    def write(self, vals):
+        res = super().write(vals)
+        if {'price_unit', 'vendor_uom_id', 'product_uom', 'discount', 'no_quote'} & vals.keys():
+            self.filtered(lambda line: line.bid_id.state in RANKED_BID_STATES)._update_ranks()
+        return res
+
+    def _update_ranks(self):
+        """Move the lines of ``self`` to their place in their RFQ line ranking.
+
+        Each RFQ line is locked with a transaction-level advisory lock, so
+        concurrent updates on different lines (or on other RFQs) never wait
+        on each other and the RFQ row itself is never locked. The lines keeping
+        their rank are sorted by comparable price, since that price can move
+        without a rerank (e.g. a new currency rate), then the changed lines
+        are put back with ``bisect``. Only the lines whose rank moved are
+        written.
+        """
+        if not self:
+            return
+        self.flush_model(['price_unit_compare', 'no_quote'])
+        self.env['purchase.rfq.bid'].flush_model(['state'])
+        rfq_line_ids = sorted(set(self.rfq_line_id.ids))
+        # Always lock in the same order to avoid deadlocks
+        for rfq_line_id in rfq_line_ids:
+            self.env.cr.execute(SQL(
+                "SELECT pg_advisory_xact_lock(%s, %s)", AUCTION_LOCK_KEY, rfq_line_id,
+            ))
+        self.env.cr.execute(SQL(
+            """
+            SELECT line.rfq_line_id, line.id, line.price_unit_compare, line.rank,
+                   bid.state IN %s AND NOT COALESCE(line.no_quote, FALSE)
+              FROM purchase_rfq_bid_line line
+              JOIN purchase_rfq_bid bid ON bid.id = line.bid_id
+             WHERE line.rfq_line_id IN %s
+               AND (line.rank IS NOT NULL OR line.id IN %s)
+          ORDER BY line.rfq_line_id, line.rank NULLS LAST, line.id
+            """,
+            RANKED_BID_STATES, tuple(rfq_line_ids), tuple(self.ids),
+        ))
+        ranking = {}
+        for rfq_line_id, line_id, price, rank, ranked in self.env.cr.fetchall():
+            ranking.setdefault(rfq_line_id, []).append((line_id, price or 0.0, rank, ranked))
+
+        self_ids = set(self.ids)
+        changed = {}
+        for rows in ranking.values():
+            moved = {line_id for line_id, _price, _rank, _ranked in rows if line_id in self_ids}
+            old_ranks = {line_id: rank for line_id, _price, rank, _ranked in rows}
+            keys = [(price, line_id) for line_id, price, rank, _ranked in rows
+                    if line_id not in moved and rank]
+            keys.sort()
+            for line_id, price, _rank, ranked in rows:
+                if line_id in moved and ranked:
+                    bisect.insort(keys, (price, line_id))
+            new_ranks = {line_id: index for index, (_price, line_id) in enumerate(keys, 1)}
+            for line_id, old_rank in old_ranks.items():
+                new_rank = new_ranks.get(line_id)
+                if new_rank != old_rank:
+                    changed[line_id] = new_rank
+        if not changed:
+            return
+
+        self.env.cr.execute(SQL(
+            """
+            UPDATE purchase_rfq_bid_line line
+               SET rank = ranks.rank
+              FROM (VALUES %s) AS ranks(id, rank)
+             WHERE line.id = ranks.id
+            """,
+            SQL(", ").join(SQL("(%s, %s::int)", line_id, rank) for line_id, rank in changed.items()),
+        ))
+        changed_lines = self.browse(list(changed))
+        changed_lines.invalidate_recordset(['rank'])
+        changed_lines._queue_rank_notifications()
+
+    # -------------------------------------------------------------------------
+    # Price Anomalies
+    # -------------------------------------------------------------------------
+    @api.model
+    def _get_competing_prices(self, rfq_line_ids):
+        """Return ``{rfq line id: [comparable prices]}`` of the quoted offers."""
+        self.env.cr.execute(SQL(
+            """
+            SELECT line.rfq_line_id, line.price_unit_compare
+              FROM purchase_rfq_bid_line line
+              JOIN purchase_rfq_bid bid ON bid.id = line.bid_id
+             WHERE line.rfq_line_id IN %s
+               AND bid.state IN %s
+               AND NOT COALESCE(line.no_quote, FALSE)
+               AND line.price_unit_compare > 0
+            """,
+            tuple(rfq_line_ids), RANKED_BID_STATES,
+        ))
+        prices = defaultdict(list)
+        for rfq_line_id, price in self.env.cr.fetchall():
+            prices[rfq_line_id].append(price)
+        return prices
+
+    @api.model
+    def _get_history_prices(self, product_ids, company):
+        """Return ``{product id: [prices]}`` of the recent confirmed orders.
+
+        Prices are net of discount, per reference unit of the product and in
+        the company currency.
+        """
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            'purchase_rfq_multi_vendor.anomaly_history_days', 365,
+        )
+        try:
+            days = max(int(value), 0)
+        except ValueError:
+            days = 365
+        self.env.cr.execute(SQL(
+            """
+            SELECT pol.product_id,
+                   pol.price_unit * (1 - COALESCE(pol.discount, 0) / 100.0) * uom.factor,
+                   po.currency_id
+              FROM purchase_order_line pol
+              JOIN purchase_order po ON po.id = pol.order_id
+              JOIN uom_uom uom ON uom.id = pol.product_uom
+             WHERE pol.product_id IN %s
+               AND po.company_id = %s
+               AND po.state IN ('purchase', 'done')
+               AND po.date_approve >= %s
+               AND pol.price_unit > 0
+            """,
+            tuple(product_ids), company.id, fields.Datetime.now() - timedelta(days=days),
+        ))
+        rates = self.env['res.currency']._get_rfq_rate_table(company.id, fields.Date.today())
+        company_rate = rates[company.currency_id.id]
+        prices = defaultdict(list)
+        for product_id, price, currency_id in self.env.cr.fetchall():
+            prices[product_id].append(price * company_rate / rates[currency_id])
+        return prices
+
+    def _detect_price_anomalies(self):
+        """Flag the lines of ``self`` whose price is an outlier.
+
+        Each quoted line of a submitted bid is compared with the competing
+        offers on its RFQ line (robust z-score) and with the product's recent
+        purchase prices (IQR fences). The statistics of all the groups are
+        computed at once with NumPy, and the flags are written with a single
+        UPDATE.
+        """
+        if price_anomaly.np is None:
+            _logger.warning('NumPy is not installed, bid price anomalies are not detected.')
+            return
+        self.env['purchase.rfq.bid'].flush_model(['state'])
+        self.flush_recordset(['price_unit_compare', 'no_quote', 'price_anomaly', 'price_anomaly_score'])
+        checked = self.filtered(
+            lambda line: line.bid_id.state in RANKED_BID_STATES
+            and not line.no_quote and line.price_unit_compare > 0
+        )
+        results = {line.id: (False, 0.0) for line in self - checked if line.price_anomaly}
+
+        competing = self._get_competing_prices(checked.rfq_line_id.ids) if checked else {}
+        for company, lines in checked.grouped('company_id').items():
+            history = self._get_history_prices(lines.product_id.ids, company)
+            rates = self.env['res.currency']._get_rfq_rate_table(company.id, fields.Date.today())
+            rfq_line_ids = list(set(lines.rfq_line_id.ids))
+            product_ids = list(set(lines.product_id.ids))
+            rfq_line_index = {rfq_line_id: i for i, rfq_line_id in enumerate(rfq_line_ids)}
+            product_index = {product_id: i for i, product_id in enumerate(product_ids)}
+
+            z_scores = price_anomaly.robust_z_scores(
+                lines.mapped('price_unit_compare'),
+                [rfq_line_index[line.rfq_line_id.id] for line in lines],
+                [competing[rfq_line_id] for rfq_line_id in rfq_line_ids],
+            )
+            low, high = price_anomaly.iqr_fences(
+                [product_index[line.product_id.id] for line in lines],
+                [history[product_id] for product_id in product_ids],
+            )
+            # Express the offers like the history: per reference unit, in the company currency
+            reference_prices = [
+                line.price_unit_compare * line.product_uom.factor
+                * rates[company.currency_id.id] / rates[line.bid_id.rfq_id.currency_id.id]
+                for line in lines
+            ]
+            flags = price_anomaly.classify(reference_prices, z_scores, low, high)
+            for line, flag, score in zip(lines, flags, z_scores.tolist()):
+                score = 0.0 if math.isnan(score) else round(score, 2)
+                if (line.price_anomaly or False, line.price_anomaly_score) != (flag, score):
+                    results[line.id] = (flag, score)
+
+        if not results:
+            return
+        self.env.cr.execute(SQL(
+            """
+            UPDATE purchase_rfq_bid_line line
+               SET price_anomaly = flags.flag, price_anomaly_score = flags.score
+              FROM (VALUES %s) AS flags(id, flag, score)
+             WHERE line.id = flags.id
+            """,
+            SQL(", ").join(
+                SQL("(%s, %s::varchar, %s::float)", line_id, flag or None, score)
+                for line_id, (flag, score) in results.items()
+            ),
+        ))
+        self.browse(list(results)).invalidate_recordset(['price_anomaly', 'price_anomaly_score'])
+
+    @api.model
+    def _cron_detect_price_anomalies(self):
+        """Re-check every line of the open bids, one batch at a time."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        last_id = 0
+        while True:
+            lines = self.search([
+                ('id', '>', last_id),
+                ('bid_id.state', 'in', ('submitted', 'under_review')),
+            ], order='id', limit=ANOMALY_BATCH_SIZE)
+            if not lines:
+                return
+            lines._detect_price_anomalies()
+            last_id = lines[-1].id
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+    def _queue_rank_notifications(self):
+        """Queue the new ranks of ``self`` for the end of the transaction.
+
+        Rank changes are coalesced per transaction: a line moved several times
+        is sent once with its final rank, and each participant receives a
+        single bus message whatever the number of changes.
+        """
+        lines = self.filtered(lambda line: line.bid_id.rfq_id.auction_mode)
+        if not lines:
+            return
+        data = self.env.cr.precommit.data
+        if 'purchase_rfq_multi_vendor.auction_ranks' not in data:
+            data['purchase_rfq_multi_vendor.auction_ranks'] = set()
+            self.env.cr.precommit.add(self._send_rank_notifications)
+        data['purchase_rfq_multi_vendor.auction_ranks'].update(lines.ids)
+
+    def _send_rank_notifications(self):
+        line_ids = self.env.cr.precommit.data.pop('purchase_rfq_multi_vendor.auction_ranks', set())
+        lines = self.env['purchase.rfq.bid.line'].sudo().browse(line_ids).exists()
+        if not lines:
+            return
+        messages = {}
+        for line in lines:
+            payload = {
+                'rfq_id': line.bid_id.rfq_id.id,
+                'bid_id': line.bid_id.id,
+                'bid_line_id': line.id,
+                'rfq_line_id': line.rfq_line_id.id,
+                'rank': line.rank,
+            }
+            # Vendors only learn their own ranks, buyers see every move
+            for partner in line.bid_id.vendor_id | line.bid_id.rfq_id.user_id.partner_id:
+                messages.setdefault(partner, []).append(payload)
+        self.env['bus.bus']._sendmany([
+            (partner, 'purchase_rfq_multi_vendor/auction_ranks', {'ranks': payloads})
+            for partner, payloads in messages.items()
+        ])
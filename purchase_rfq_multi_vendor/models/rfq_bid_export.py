@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import logging
+import tempfile
+import threading
+
+import xlsxwriter
+
+from odoo import api, fields, models, _
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+# Number of RFQ lines loaded, written and evicted from the cache at once
+EXPORT_CHUNK_SIZE = 500
+
+
+class RFQBidExport(models.Model):
+    _name = 'purchase.rfq.bid.export'
+    _description = 'Bid Comparison Export'
+    _order = 'id desc'
+
+    rfq_id = fields.Many2one(
+        'purchase.order',
+        string='RFQ',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    user_id = fields.Many2one(
+        'res.users',
+        string='Requested By',
+        required=True,
+        default=lambda self: self.env.user,
+    )
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, index=True)
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    # -------------------------------------------------------------------------
+    # Processing
+    # -------------------------------------------------------------------------
+    @api.model
+    def _cron_process_exports(self, limit=10):
+        """Generate queued exports, committing after each one."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        for export in self.search([('state', '=', 'queued')], limit=limit, order='id'):
+            try:
+                export.with_user(export.user_id)._generate()
+                if auto_commit:
+                    self.env.cr.commit()
+            except Exception as e:
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                _logger.exception('Bid comparison export %s failed', export.id)
+                export.write({'state': 'failed', 'error': str(e)})
+                self.env.cr.commit()
+
+    def _get_export_bids(self):
+        self.ensure_one()
+        return self.env['purchase.rfq.bid'].search([
+            ('rfq_id', '=', self.rfq_id.id),
+            ('state', 'in', ('submitted', 'under_review', 'awarded')),
+        ])
+
+    def _iter_rfq_line_chunks(self):
+        """Yield the RFQ lines by chunks, using keyset pagination.
+
+        Only one chunk is loaded at a time and the cache is emptied before
+        the next one, so memory stays flat whatever the number of lines.
+        """
+        self.ensure_one()
+        OrderLine = self.env['purchase.order.line']
+        base_domain = [('order_id', '=', self.rfq_id.id), ('display_type', '=', False)]
+        last = None
+        while True:
+            domain = base_domain
+            if last:
+                last_sequence, last_id = last
+                domain = expression.AND([domain, [
+                    '|', ('sequence', '>', last_sequence),
+                    '&', ('sequence', '=', last_sequence), ('id', '>', last_id),
+                ]])
+            lines = OrderLine.search_fetch(
+                domain,
+                ['sequence', 'name', 'product_id', 'product_qty', 'product_uom'],
+                order='sequence, id',
+                limit=EXPORT_CHUNK_SIZE,
+            )
+            if not lines:
+                return
+            yield lines
+            if len(lines) < EXPORT_CHUNK_SIZE:
+                return
+            last = (lines[-1].sequence, lines[-1].id)
+            self.env.invalidate_all()
+
+    def _generate(self):
+        """Stream the product x vendor comparison sheet to an attachment."""
+        self.ensure_one()
+        bids = self._get_export_bids()
+        bid_ids = bids.ids
+        bid_labels = [
+            '%s (%s, %s)' % (bid.vendor_id.name, bid.name, bid.currency_id.name)
+            for bid in bids
+        ]
+        # Bids in other currencies are ranked on their RFQ currency value
+        bid_rates = {bid.id: bid.currency_rate for bid in bids}
+        rfq = self.rfq_id
+        rfq_name = rfq.name
+
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as tmp:
+            # constant_memory flushes every row to disk once the next row starts
+            workbook = xlsxwriter.Workbook(tmp.name, {'constant_memory': True})
+            sheet = workbook.add_worksheet(_('Bid Comparison'))
+            bold = workbook.add_format({'bold': True})
+            header = workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#E9ECEF'})
+            best = workbook.add_format({'bg_color': '#D1E7DD'})
+
+            fixed_headers = [_('Product'), _('Description'), _('Quantity'), _('Unit'), _('Best Bid')]
+            bid_headers = [_('Unit Price'), _('Discount (%)'), _('Lead Time (Days)'), _('Taxes'), _('Subtotal')]
+            sheet.write_row(0, 0, fixed_headers, bold)
+            col = len(fixed_headers)
+            for label in bid_labels:
+                sheet.merge_range(0, col, 0, col + len(bid_headers) - 1, label, header)
+                col += len(bid_headers)
+            sheet.write_row(1, 0, [''] * len(fixed_headers))
+            col = len(fixed_headers)
+            for dummy in bid_labels:
+                sheet.write_row(1, col, bid_headers, bold)
+                col += len(bid_headers)
+            sheet.freeze_panes(2, len(fixed_headers))
+
+            no_quote_label = _('No quote')
+            row = 2
+            BidLine = self.env['purchase.rfq.bid.line']
+            for rfq_lines in self._iter_rfq_line_chunks():
+                bid_lines = BidLine.search_fetch(
+                    [('rfq_line_id', 'in', rfq_lines.ids), ('bid_id', 'in', bid_ids)],
+                    ['bid_id', 'rfq_line_id', 'no_quote', 'price_unit_rfq_uom', 'discount',
+                     'delivery_lead_time', 'taxes_id', 'price_subtotal'],
+                )
+                by_key = {(line.rfq_line_id.id, line.bid_id.id): line for line in bid_lines}
+                for rfq_line in rfq_lines:
+                    quotes = [by_key.get((rfq_line.id, bid_id)) for bid_id in bid_ids]
+                    quoted = [
+                        (q.price_subtotal * bid_rates[q.bid_id.id], i)
+                        for i, q in enumerate(quotes) if q and not q.no_quote
+                    ]
+                    best_index = min(quoted)[1] if quoted else None
+                    sheet.write_row(row, 0, [
+                        rfq_line.product_id.display_name or '',
+                        rfq_line.name or '',
+                        rfq_line.product_qty,
+                        rfq_line.product_uom.name or '',
+                        bid_labels[best_index] if best_index is not None else '',
+                    ])
+                    col = len(fixed_headers)
+                    for index, quote in enumerate(quotes):
+                        if quote and quote.no_quote:
+                            sheet.write(row, col, no_quote_label)
+                        elif quote:
+                            cell_format = best if index == best_index else None
+                            # Prices of vendors quoting in another unit are shown per RFQ unit
+                            sheet.write_row(row, col, [
+                                quote.price_unit_rfq_uom,
+                                quote.discount,
+                                quote.delivery_lead_time,
+                                ', '.join(quote.taxes_id.mapped('name')),
+                                quote.price_subtotal,
+                            ], cell_format)
+                        col += len(bid_headers)
+                    row += 1
+            workbook.close()
+            tmp.seek(0)
+            data = tmp.read()
+
+        attachment = self.env['ir.attachment'].create({
+            'name': _('Bid comparison - %s.xlsx') % rfq_name,
+            'raw': data,
+            'res_model': 'purchase.order',
+            'res_id': self.rfq_id.id,
+            'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        })
+        self.write({'state': 'done', 'attachment_id': attachment.id})
+        self.rfq_id.message_post(
+            body=_('The bid comparison export is ready.'),
+            attachment_ids=attachment.ids,
+            partner_ids=self.user_id.partner_id.ids,
+            message_type='notification',
+        )
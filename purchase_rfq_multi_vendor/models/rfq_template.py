@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from collections import defaultdict
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from ..tools import profiled_action
+
+
+class RFQTemplate(models.Model):
+    _name = 'purchase.rfq.template'
+    _description = 'Recurring RFQ Template'
+    _inherit = ['mail.thread']
+    _order = 'next_date, id'
+
+    name = fields.Char(string='Template Name', required=True, tracking=True)
+    active = fields.Boolean(default=True)
+
+    line_ids = fields.One2many(
+        'purchase.rfq.template.line',
+        'template_id',
+        string='Products',
+        copy=True,
+    )
+    vendor_ids = fields.Many2many(
+        'res.partner',
+        string='Vendor Panel',
+        domain="[('supplier_rank', '>', 0)]",
+        help='Vendors invited to every RFQ generated from this template.',
+    )
+
+    interval_number = fields.Integer(string='Repeat Every', default=1, required=True)
+    interval_type = fields.Selection([
+        ('weeks', 'Weeks'),
+        ('months', 'Months'),
+        ('years', 'Years'),
+    ], string='Repeat Unit', default='months', required=True)
+    next_date = fields.Date(
+        string='Next RFQ Date',
+        required=True,
+        default=fields.Date.context_today,
+        index=True,
+        tracking=True,
+    )
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Buyer',
+        default=lambda self: self.env.user,
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    notes = fields.Html(string='RFQ Notes')
+
+    rfq_ids = fields.One2many(
+        'purchase.order',
+        'rfq_template_id',
+        string='Generated RFQs',
+    )
+    rfq_count = fields.Integer(
+        compute='_compute_rfq_count',
+        string='RFQ Count',
+    )
+
+    _sql_constraints = [
+        ('interval_number_positive',
+         'CHECK(interval_number > 0)',
+         'The recurrence interval must be positive.'),
+    ]
+
+    @api.depends('rfq_ids')
+    def _compute_rfq_count(self):
+        counts = dict(self.env['purchase.order']._read_group(
+            [('rfq_template_id', 'in', self.ids)],
+            ['rfq_template_id'],
+            ['__count'],
+        ))
+        for template in self:
+            template.rfq_count = counts.get(template, 0)
+
+    # -------------------------------------------------------------------------
+    # RFQ Generation
+    # -------------------------------------------------------------------------
+    def _get_next_date(self, date):
+        self.ensure_one()
+        return date + relativedelta(**{self.interval_type: self.interval_number})
+
+    def _prepare_rfq_vals(self):
+        self.ensure_one()
+        return {
+            # partner_id is required on purchase.order; the actual vendors are
+            # the RFQ vendors, as for RFQs created from purchase requests
+            'partner_id': self.company_id.partner_id.id,
+            'origin': self.name,
+            'date_order': fields.Datetime.now(),
+            'company_id': self.company_id.id,
+            'user_id': self.user_id.id or self.env.uid,
+            'notes': self.notes,
+            'rfq_template_id': self.id,
+        }
+
+    def _generate_rfqs(self):
+        """Generate one RFQ per template with its vendors and draft bids.
+
+        Each kind of record (RFQs, RFQ lines, RFQ vendors, bids, bid lines)
+        is created with a single batched call for all templates, so the
+        number of queries does not grow with the number of templates.
+        Templates without lines generate nothing but still move to their
+        next date, so that they are not selected again on every run.
+        """
+        templates = self.filtered('line_ids')
+        self._advance_next_date()
+        if not templates:
+            return self.env['purchase.order']
+
+        rfqs = self.env['purchase.order'].create([
+            template._prepare_rfq_vals() for template in templates
+        ])
+        line_vals_list = []
+        vendor_vals_list = []
+        for template, rfq in zip(templates, rfqs):
+            line_vals_list += [
+                line._prepare_rfq_line_vals(rfq) for line in template.line_ids
+            ]
+            vendor_vals_list += [
+                {'rfq_id': rfq.id, 'vendor_id': vendor.id}
+                for vendor in template.vendor_ids
+            ]
+        self.env['purchase.order.line'].create(line_vals_list)
+        rfq_vendors = self.env['purchase.rfq.vendor'].create(vendor_vals_list)
+        rfq_vendors._create_draft_bids()
+        return rfqs
+
+    def _advance_next_date(self):
+        """Move the templates to their first date after today, one write per date.
+
+        The periods that were missed are skipped so that a template never
+        generates more than one RFQ per run.
+        """
+        today = fields.Date.context_today(self)
+        by_date = defaultdict(list)
+        for template in self:
+            next_date = template._get_next_date(template.next_date)
+            while next_date <= today:
+                next_date = template._get_next_date(next_date)
+            by_date[next_date].append(template.id)
+        for next_date, template_ids in by_date.items():
+            self.browse(template_ids).write({'next_date': next_date})
+
+    @api.model
+    def _cron_generate_rfqs(self):
+        """Generate the RFQs of every template that is due."""
+        templates = self.search([
+            ('next_date', '<=', fields.Date.context_today(self)),
+        ])
+        for company, company_templates in templates.grouped('company_id').items():
+            company_templates.with_company(company)._generate_rfqs()
+
+    @profiled_action
+    def action_generate_rfq(self):
+        """Generate the RFQ of this template right away."""
+        self.ensure_one()
+        if not self.line_ids:
+            raise UserError(_('Add at least one product to the template first.'))
+        rfq = self.with_company(self.company_id)._generate_rfqs()
+        return {
+            'name': _('Request for Quotation'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.order',
+            'res_id': rfq.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def action_view_rfqs(self):
+        """View the RFQs generated from this template."""
+        self.ensure_one()
+        return {
+            'name': _('RFQs from %s') % self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.order',
+            'view_mode': 'list,form',
+            'domain': [('rfq_template_id', '=', self.id)],
+        }
+
+
+class RFQTemplateLine(models.Model):
+    _name = 'purchase.rfq.template.line'
+    _description = 'Recurring RFQ Template Line'
+    _order = 'template_id, sequence, id'
+
+    template_id = fields.Many2one(
+        'purchase.rfq.template',
+        string='Template',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    sequence = fields.Integer(string='Sequence', default=10)
+
+    product_id = fields.Many2one(
+        'product.product',
+        string='Product',
+        required=True,
+        domain="[('purchase_ok', '=', True)]",
+    )
+    name = fields.Text(
+        string='Description',
+        compute='_compute_name',
+        store=True,
+        readonly=False,
+    )
+    product_qty = fields.Float(
+        string='Quantity',
+        required=True,
+        default=1.0,
+        digits='Product Unit of Measure',
+    )
+    product_uom = fields.Many2one(
+        'uom.uom',
+        string='Unit of Measure',
+        compute='_compute_product_uom',
+        store=True,
+        readonly=False,
+    )
+    product_uom_category_id = fields.Many2one(
+        related='product_id.uom_id.category_id',
+    )
+    price_unit = fields.Float(
+        string='Est. Unit Price',
+        digits='Product Price',
+    )
+
+    @api.depends('product_id')
+    def _compute_name(self):
+        for line in self:
+            line.name = line.product_id.display_name or ''
+
+    @api.depends('product_id')
+    def _compute_product_uom(self):
+        for line in self:
+            line.product_uom = line.product_id.uom_po_id or line.product_id.uom_id
+
+    def _prepare_rfq_line_vals(self, rfq):
+        self.ensure_one()
+        return {
+            'order_id': rfq.id,
+            'product_id': self.product_id.id,
+            'name': self.name or self.product_id.display_name,
+            'product_qty': self.product_qty,
+            'product_uom': self.product_uom.id,
+            'price_unit': self.price_unit,
+            'date_planned': fields.Datetime.now(),
+        }
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from odoo import models, _
+from odoo.exceptions import UserError
+
+
+class RFQTransitionMixin(models.AbstractModel):
+    """Declarative, set-based state machine.
+
+    Inheriting models declare the selection field they drive and the allowed
+    moves. ``_transition`` validates a whole recordset at once, applies the
+    change in a single write and calls ``_on_transition`` once per batch.
+    """
+    _name = 'purchase.rfq.transition.mixin'
+    _description = 'RFQ State Transition Engine'
+
+    # Selection field driven by the engine
+    _transition_field = 'state'
+    # Allowed moves: {from_value: (to_value, ...)}
+    _transitions = {}
+
+    def _check_transition(self, new_value):
+        """Raise if any record of ``self`` may not move to ``new_value``."""
+        fname = self._transition_field
+        invalid = self.filtered(
+            lambda rec: new_value not in self._transitions.get(rec[fname], ())
+        )
+        if invalid:
+            labels = dict(self._fields[fname]._description_selection(self.env))
+            raise UserError(_(
+                'Cannot change the status of %(records)s from %(old)s to %(new)s.',
+                records=', '.join(invalid.mapped('display_name')),
+                old=', '.join(sorted({labels.get(v, v) for v in invalid.mapped(fname)})),
+                new=labels.get(new_value, new_value),
+            ))
+
+    def _transition(self, new_value, vals=None, check=True):
+        """Move every record of ``self`` to ``new_value``.
+
+        Records already in the target state are skipped. ``vals`` are extra
+        values written together with the new state. Returns the records that
+        actually changed.
+        """
+        fname = self._transition_field
+        records = self.filtered(lambda rec: rec[fname] != new_value)
+        if not records:
+            return records
+        if check:
+            records._check_transition(new_value)
+        previous_values = {rec.id: rec[fname] for rec in records}
+        records.write(dict(vals or {}, **{fname: new_value}))
+        records._on_transition(previous_values, new_value)
+        return records
+
+    def _on_transition(self, previous_values, new_value):
+        """Hook called once per batch after ``self`` moved to ``new_value``.
+
+        :param dict previous_values: {record id: value before the move}
+        """
+        return
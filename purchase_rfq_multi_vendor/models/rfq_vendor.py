@@ -1,16 +1,43 @@
 # -*- coding: utf-8 -*-
 # Part of Purchase Multi-Vendor RFQ module.
 
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+from ..tools import profiled_action
+
+# RFQ states in which a vendor is still expected to answer
+OPEN_RFQ_STATES = ('draft', 'sent')
 
 
 class RFQVendor(models.Model):
     _name = 'purchase.rfq.vendor'
     _description = 'RFQ Vendor Assignment'
+    _inherit = ['purchase.rfq.transition.mixin']
     _rec_name = 'vendor_id'
     _order = 'id desc'
 
+    _transition_field = 'status'
+    _transitions = {
+        'draft': ('sent', 'rejected'),
+        'sent': ('bid_received', 'rejected'),
+        'bid_received': ('awarded', 'rejected'),
+        'rejected': ('bid_received',),
+        'awarded': (),
+    }
+    # Vendor status derived from the states of its bids, first match wins;
+    # vendors whose bids are all in draft keep their current status.
+    _status_from_bid_states = (
+        ('awarded', ('awarded',)),
+        ('bid_received', ('submitted', 'under_review')),
+        ('rejected', ('rejected',)),
+    )
+
     rfq_id = fields.Many2one(
         'purchase.order',
         string='RFQ',
@@ -35,7 +62,16 @@ class RFQVendor(models.Model):
 
     sent_date = fields.Datetime(string='Sent Date', readonly=True)
     response_date = fields.Datetime(string='Response Date', readonly=True)
-    notes = fields.Text(string='Notes')
+    reminder_count = fields.Integer(string='Reminders Sent', default=0, readonly=True, copy=False)
+    last_reminder_date = fields.Datetime(string='Last Reminder', readonly=True, copy=False)
+    notes = fields.Text(string='Notes', index='trigram')
+    tender_package_id = fields.Many2one(
+        'ir.attachment',
+        string='Tender Package',
+        readonly=True,
+        copy=False,
+        help='The RFQ with this vendor\'s cover and terms, as one PDF.',
+    )
 
     bid_ids = fields.One2many(
         'purchase.rfq.bid',
@@ -66,19 +102,202 @@ class RFQVendor(models.Model):
          'This vendor is already assigned to this RFQ!'),
     ]
 
+    def init(self):
+        # Lines created before the reminders existed have no count yet
+        self.env.cr.execute(SQL(
+            "UPDATE %s SET reminder_count = 0 WHERE reminder_count IS NULL",
+            SQL.identifier(self._table),
+        ))
+        # The reminder job scans the vendors sent before a cutoff date
+        self.env.cr.execute(SQL(
+            """
+            CREATE INDEX IF NOT EXISTS purchase_rfq_vendor_status_sent_date_index
+                ON %s (status, sent_date)
+            """,
+            SQL.identifier(self._table),
+        ))
+        # Workload counters only look at the vendors awaiting a response
+        self.env.cr.execute(SQL(
+            """
+            CREATE INDEX IF NOT EXISTS purchase_rfq_vendor_awaiting_index
+                ON %s (company_id, rfq_id)
+             WHERE status = 'sent'
+            """,
+            SQL.identifier(self._table),
+        ))
+
     @api.depends('bid_ids')
     def _compute_bid_count(self):
         for record in self:
             record.bid_count = len(record.bid_ids)
 
+    def _sync_status_from_bids(self):
+        """Derive the status of the vendors from their bids in one batch.
+
+        Bid states are read with a single grouped query and the vendors are
+        then written once per resulting status.
+        """
+        if not self:
+            return
+        bid_states = defaultdict(set)
+        for vendor, state in self.env['purchase.rfq.bid']._read_group(
+            [('rfq_vendor_id', 'in', self.ids)], ['rfq_vendor_id', 'state'],
+        ):
+            bid_states[vendor.id].add(state)
+
+        vendor_ids_by_status = defaultdict(list)
+        for vendor in self:
+            for status, states in self._status_from_bid_states:
+                if bid_states[vendor.id].intersection(states):
+                    if vendor.status != status:
+                        vendor_ids_by_status[status].append(vendor.id)
+                    break
+
+        now = fields.Datetime.now()
+        for status, vendor_ids in vendor_ids_by_status.items():
+            vals = {'response_date': now} if status == 'bid_received' else {}
+            self.browse(vendor_ids)._transition(status, vals, check=False)
+
+    # -------------------------------------------------------------------------
+    # Follow-up Reminders
+    # -------------------------------------------------------------------------
+    @api.model
+    def _get_reminder_settings(self):
+        """Return ``(delay_days, max_reminders, batch_size, max_batches)``."""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        values = []
+        for key, default in (
+            ('reminder_delay_days', 7),
+            ('reminder_max_count', 3),
+            ('reminder_batch_size', 50),
+            ('reminder_max_batches', 10),
+        ):
+            try:
+                values.append(max(int(get_param('purchase_rfq_multi_vendor.' + key, default)), 0))
+            except ValueError:
+                values.append(default)
+        return tuple(values)
+
+    @api.model
+    def _get_due_reminders(self, delay_days):
+        """Return the sent vendor lines of open RFQs waiting for a reminder.
+
+        A vendor is reminded ``delay_days`` after the RFQ was sent, then
+        again every ``delay_days``. The index on ``(status, sent_date)``
+        narrows the scan to the lines sent before the first cutoff.
+        """
+        if not delay_days:
+            return self.browse()
+        self.flush_model(['status', 'sent_date', 'reminder_count', 'rfq_id', 'vendor_id'])
+        now = fields.Datetime.now()
+        self.env.cr.execute(SQL(
+            """
+            SELECT v.id
+              FROM purchase_rfq_vendor v
+              JOIN purchase_order o ON o.id = v.rfq_id
+             WHERE v.status = 'sent'
+               AND v.sent_date <= %(cutoff)s
+               AND v.sent_date + (COALESCE(v.reminder_count, 0) + 1) * %(delay)s * interval '1 day' <= %(now)s
+               AND o.state IN %(rfq_states)s
+          ORDER BY v.vendor_id, v.id
+            """,
+            cutoff=now - timedelta(days=delay_days),
+            delay=delay_days,
+            now=now,
+            rfq_states=OPEN_RFQ_STATES,
+        ))
+        return self.browse(row[0] for row in self.env.cr.fetchall())
+
+    @api.model
+    def _cron_send_reminders(self):
+        """Remind non-responding vendors and reject the ones that never answer.
+
+        Each vendor receives one email listing all its outstanding RFQs.
+        Emails are queued by batches, committed one batch at a time; when
+        more than the allowed number of batches is due, the job reschedules
+        itself so the outgoing mail server is not flooded.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        delay_days, max_reminders, batch_size, max_batches = self._get_reminder_settings()
+        due = self._get_due_reminders(delay_days)
+        if not due:
+            return
+
+        if max_reminders:
+            expired = due.filtered(lambda v: v.reminder_count >= max_reminders)
+            if expired:
+                expired._reject_unresponsive()
+                due -= expired
+                if auto_commit:
+                    self.env.cr.commit()
+
+        groups = list(due.grouped(lambda v: (v.vendor_id, v.company_id)).items())
+        batch_size = batch_size or len(groups)
+        for index in range(0, len(groups), batch_size):
+            if max_batches and index // batch_size >= max_batches:
+                self.env.ref('purchase_rfq_multi_vendor.ir_cron_send_vendor_reminders')._trigger(
+                    fields.Datetime.now() + timedelta(hours=1),
+                )
+                return
+            batch = groups[index:index + batch_size]
+            self._send_reminder_batch(batch)
+            if auto_commit:
+                self.env.cr.commit()
+
+    @api.model
+    def _send_reminder_batch(self, batch):
+        """Queue one reminder per vendor and count it on every reminded line.
+
+        Vendors without an email are skipped and not counted, so they are
+        never auto-rejected for reminders they did not receive.
+
+        :param batch: list of ``((partner, company), rfq_vendors)``
+        """
+        mail_vals_list = []
+        reminded = self.browse()
+        for (partner, company), rfq_vendors in batch:
+            if not partner.email:
+                continue
+            reminded |= rfq_vendors
+            mail_vals_list.append({
+                'subject': _('Reminder: %d request(s) for quotation awaiting your reply') % len(rfq_vendors),
+                'body_html': self._render_reminder(partner, rfq_vendors),
+                'email_from': company.email_formatted or self.env.company.email_formatted,
+                'recipient_ids': [(4, partner.id)],
+                'auto_delete': True,
+            })
+        if mail_vals_list:
+            self.env['mail.mail'].sudo().create(mail_vals_list)
+
+        now = fields.Datetime.now()
+        for count, rfq_vendors in reminded.grouped('reminder_count').items():
+            rfq_vendors.write({'reminder_count': count + 1, 'last_reminder_date': now})
+
+    @api.model
+    def _render_reminder(self, partner, rfq_vendors):
+        return self.env['ir.qweb']._render(
+            'purchase_rfq_multi_vendor.rfq_vendor_reminder',
+            {'partner': partner, 'rfq_vendors': rfq_vendors},
+        )
+
+    def _reject_unresponsive(self):
+        """Reject vendor lines that got every reminder without answering."""
+        rejected = self._transition('rejected')
+        for rfq, rfq_vendors in rejected.grouped('rfq_id').items():
+            rfq._message_log(
+                body=_('No reply after %(count)d reminders, rejected: %(vendors)s',
+                       count=max(rfq_vendors.mapped('reminder_count')),
+                       vendors=', '.join(rfq_vendors.mapped('vendor_id.name'))),
+                message_type='notification',
+            )
+        return rejected
+
+    @profiled_action
     def action_send_rfq(self):
         """Mark this vendor line as RFQ Sent."""
         self.ensure_one()
 
-        self.write({
-            'status': 'sent',
-            'sent_date': fields.Datetime.now(),
-        })
+        self._transition('sent', {'sent_date': fields.Datetime.now()})
 
         if not self.vendor_id.email:
             # No email - just mark as sent and notify
@@ -123,13 +342,10 @@ class RFQVendor(models.Model):
             'context': ctx,
         }
 
+    @profiled_action
     def action_mark_sent(self):
         """Quick mark as sent without email wizard."""
-        self.ensure_one()
-        self.write({
-            'status': 'sent',
-            'sent_date': fields.Datetime.now(),
-        })
+        self._transition('sent', {'sent_date': fields.Datetime.now()})
 
     def action_view_bids(self):
         """View bids from this vendor."""
@@ -146,19 +362,41 @@ class RFQVendor(models.Model):
             },
         }
 
+    def _create_draft_bids(self):
+        """Create one draft bid per vendor, pre-filled with the RFQ lines.
+
+        Bids and bid lines are each created with a single batched call,
+        whatever the number of vendors. Bids of sparse RFQs start empty.
+        """
+        bids = self.env['purchase.rfq.bid'].create([
+            {'rfq_vendor_id': vendor.id} for vendor in self
+        ])
+        line_vals_list = []
+        for bid in bids.filtered(lambda b: not b.rfq_id.sparse_bids):
+            for order_line in bid.rfq_id.order_line.filtered(lambda l: not l.display_type):
+                line_vals_list.append({
+                    'bid_id': bid.id,
+                    'rfq_line_id': order_line.id,
+                    'price_unit': 0.0,
+                })
+        self.env['purchase.rfq.bid.line'].create(line_vals_list)
+        return bids
+
+    def _job_send(self):
+        """Mark the draft vendors as sent, for the bulk dispatch of an RFQ."""
+        vendors = self.filtered(lambda v: v.status == 'draft')
+        vendors._transition('sent', {'sent_date': fields.Datetime.now()})
+        vendors.rfq_id.filtered(lambda rfq: rfq.state == 'draft').write({'state': 'sent'})
+
+    def _job_create_draft_bids(self):
+        """Create the draft bids of the vendors that have none yet."""
+        return self.filtered(lambda v: not v.bid_ids)._create_draft_bids()
+
+    @profiled_action
     def action_create_bid(self):
         """Create a new bid for this vendor."""
         self.ensure_one()
-        bid = self.env['purchase.rfq.bid'].create({
-            'rfq_vendor_id': self.id,
-        })
-        # Auto-populate bid lines from RFQ order lines
-        for order_line in self.rfq_id.order_line.filtered(lambda l: not l.display_type):
-            self.env['purchase.rfq.bid.line'].create({
-                'bid_id': bid.id,
-                'rfq_line_id': order_line.id,
-                'price_unit': 0.0,
-            })
+        bid = self._create_draft_bids()
 
         return {
             'name': _('New Bid from %s') % self.vendor_id.name,
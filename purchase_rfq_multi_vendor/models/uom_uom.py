@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from odoo import api, models, tools
+from odoo.tools import frozendict
+
+from ..tools.table_version import bump_table_version, get_table_version
+
+
+class UomUom(models.Model):
+    _inherit = 'uom.uom'
+
+    @api.model
+    def _get_rfq_uom_factors(self, category_id):
+        """Return ``{uom_id: factor}`` for all units of a category.
+
+        The factors of a whole category are read in one query and kept in the
+        ormcache, so normalizing bid prices never calls ``_compute_quantity``
+        per line. The cache key holds the version of the unit table, so a
+        unit change only misses these entries. A quantity converts from unit
+        A to B as ``qty * factor[B] / factor[A]``, and a unit price the other
+        way round.
+        """
+        version = get_table_version(self.env, self._table)
+        return self._get_rfq_uom_factors_cached(category_id, version)
+
+    @api.model
+    @tools.ormcache('category_id', 'version')
+    def _get_rfq_uom_factors_cached(self, category_id, version):
+        uoms = self.sudo().with_context(active_test=False).search_fetch(
+            [('category_id', '=', category_id)], ['factor'],
+        )
+        return frozendict((uom.id, uom.factor) for uom in uoms)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        bump_table_version(self.env, self._table)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'factor', 'factor_inv', 'uom_type', 'category_id'} & vals.keys():
+            bump_table_version(self.env, self._table)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        bump_table_version(self.env, self._table)
+        return res
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+from .profiling import profiled_action
+from .pdf_pool import convert_html_to_pdf
+from .table_version import bump_table_version, get_table_version
+from . import price_anomaly
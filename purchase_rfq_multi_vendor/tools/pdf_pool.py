@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from odoo.addons.base.models.ir_actions_report import _get_wkhtmltopdf_bin
+
+
+def _write_temp_html(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(content.encode() if isinstance(content, str) else content)
+    return path
+
+
+def _convert(command_args, header, footer, body):
+    """Convert one HTML body to PDF with its own wkhtmltopdf process.
+
+    Only files and the subprocess are touched here, never the ORM, so the
+    function is safe to run from a pool thread.
+    """
+    with tempfile.TemporaryDirectory(prefix='tender.') as directory:
+        args = list(command_args)
+        if header:
+            args += ['--header-html', _write_temp_html(directory, 'header.html', header)]
+        if footer:
+            args += ['--footer-html', _write_temp_html(directory, 'footer.html', footer)]
+        body_path = _write_temp_html(directory, 'body.html', body)
+        pdf_path = os.path.join(directory, 'report.pdf')
+        process = subprocess.run(
+            [_get_wkhtmltopdf_bin()] + args + [body_path, pdf_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        # Like the report engine, accept the "done with warnings" code 1
+        if process.returncode not in (0, 1):
+            raise RuntimeError(
+                'wkhtmltopdf failed (error code: %s): %s'
+                % (process.returncode, process.stderr.decode(errors='replace')[-1000:])
+            )
+        with open(pdf_path, 'rb') as f:
+            return f.read()
+
+
+def convert_html_to_pdf(bodies, command_args, header=None, footer=None, max_workers=4):
+    """Convert many HTML bodies to PDF, at most ``max_workers`` at a time.
+
+    :param bodies: dict ``{key: html}``
+    :return: iterator of ``(key, pdf)`` in completion order
+    """
+    if not bodies:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(bodies)))) as pool:
+        futures = {
+            pool.submit(_convert, command_args, header, footer, body): key
+            for key, body in bodies.items()
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
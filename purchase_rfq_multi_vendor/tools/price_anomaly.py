@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Robust z-score above which a price is an outlier among competing offers
+ROBUST_Z_THRESHOLD = 3.5
+# Minimum number of competing offers for the z-score to mean anything
+MIN_COMPETING = 3
+# Tukey fences on historical prices: [Q1 - k * IQR, Q3 + k * IQR]
+IQR_FACTOR = 1.5
+MIN_HISTORY = 4
+
+
+def _padded(groups):
+    """Return the lists of ``groups`` as one NaN-padded 2D array."""
+    width = max((len(values) for values in groups), default=0)
+    matrix = np.full((len(groups), max(width, 1)), np.nan)
+    for row, values in enumerate(groups):
+        matrix[row, :len(values)] = values
+    return matrix
+
+
+def robust_z_scores(prices, group_index, groups):
+    """Robust z-score of each price within its group of competing prices.
+
+    ``0.6745 * (x - median) / MAD``, with the median and the median
+    absolute deviation computed for all groups at once on a padded matrix.
+    Prices whose group is too small or has no spread score NaN.
+
+    :param prices: sequence of prices to score
+    :param group_index: for each price, the index of its group in ``groups``
+    :param groups: list of lists of competing prices
+    """
+    matrix = _padded(groups)
+    counts = np.sum(~np.isnan(matrix), axis=1)
+    with warnings.catch_warnings():
+        # Empty groups give NaN statistics, which is what we want
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(matrix, axis=1)
+        mad = np.nanmedian(np.abs(matrix - median[:, None]), axis=1)
+    with np.errstate(invalid='ignore'):
+        usable = (counts >= MIN_COMPETING) & (mad > 0)
+    index = np.asarray(group_index, dtype=int)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = 0.6745 * (np.asarray(prices, dtype=float) - median[index]) / mad[index]
+    scores[~usable[index]] = np.nan
+    return scores
+
+
+def iqr_fences(group_index, groups):
+    """Lower and upper Tukey fences of each price's historical group.
+
+    :return: two arrays aligned on ``group_index``, NaN where the history
+             is too short
+    """
+    matrix = _padded(groups)
+    counts = np.sum(~np.isnan(matrix), axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q1, q3 = np.nanpercentile(matrix, [25, 75], axis=1)
+    iqr = q3 - q1
+    low, high = q1 - IQR_FACTOR * iqr, q3 + IQR_FACTOR * iqr
+    short = counts < MIN_HISTORY
+    low[short] = high[short] = np.nan
+    index = np.asarray(group_index, dtype=int)
+    return low[index], high[index]
+
+
+def classify(prices, z_scores, low_fences, high_fences):
+    """Return ``'high'``, ``'low'`` or ``False`` for every price."""
+    prices = np.asarray(prices, dtype=float)
+    with np.errstate(invalid='ignore'):
+        high = (z_scores > ROBUST_Z_THRESHOLD) | (prices > high_fences)
+        low = (z_scores < -ROBUST_Z_THRESHOLD) | (prices < low_fences)
+    return [
+        'high' if is_high else 'low' if is_low else False
+        for is_high, is_low in zip(high.tolist(), low.tolist())
+    ]
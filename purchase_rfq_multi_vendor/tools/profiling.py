@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+import functools
+import logging
+import random
+import threading
+import time
+
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+SAMPLE_RATE_PARAM = 'purchase_rfq_multi_vendor.profiling_sample_rate'
+
+
+def _get_sample_rate(env):
+    """Return the configured sampling rate, between 0.0 (off) and 1.0."""
+    value = env['ir.config_parameter'].sudo().get_param(SAMPLE_RATE_PARAM, '0')
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except ValueError:
+        return 0.0
+
+
+def _get_rows_written(cr):
+    """Return the rows inserted, updated and deleted by the current transaction."""
+    cr.execute(SQL(
+        "SELECT COALESCE(sum(n_tup_ins + n_tup_upd + n_tup_del), 0) FROM pg_stat_xact_user_tables"
+    ))
+    return cr.fetchone()[0]
+
+
+def profiled_action(method):
+    """Decorate a workflow action to record its cost in the profiling log.
+
+    Instrumentation is opt-in: nothing is measured unless the sample rate
+    system parameter is set, and then only that fraction of the calls is
+    recorded. The SQL counters are the ones the cursor maintains on the
+    current thread, and the records touched are the rows the transaction
+    wrote meanwhile, so a sampled call costs two reads and one insert.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        rate = _get_sample_rate(self.env)
+        if not rate or random.random() >= rate:
+            return method(self, *args, **kwargs)
+
+        thread = threading.current_thread()
+        if not hasattr(thread, 'query_count'):
+            # Cron and shell threads do not count queries by default
+            thread.query_count = 0
+            thread.query_time = 0.0
+        self.env.flush_all()
+        rows_written = _get_rows_written(self.env.cr)
+        query_count = thread.query_count
+        query_time = thread.query_time
+        start = time.perf_counter()
+
+        result = method(self, *args, **kwargs)
+
+        total_time = time.perf_counter() - start
+        sql_time = thread.query_time - query_time
+        query_count = thread.query_count - query_count
+        self.env.flush_all()
+        try:
+            # The statistics restart at each commit the action makes
+            record_count = max(_get_rows_written(self.env.cr) - rows_written, 0)
+            with self.env.cr.savepoint():
+                self.env['purchase.action.profile'].sudo()._record_sample(
+                    self._name,
+                    method.__name__,
+                    record_count=record_count,
+                    query_count=query_count,
+                    sql_time=sql_time,
+                    python_time=max(total_time - sql_time, 0.0),
+                )
+        except Exception:
+            _logger.exception(
+                'Unable to record profiling sample for %s.%s',
+                self._name, method.__name__,
+            )
+        return result
+
+    return wrapper
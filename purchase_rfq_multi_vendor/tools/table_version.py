@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Part of Purchase Multi-Vendor RFQ module.
+
+from odoo.tools import SQL
+
+
+def _cache_key(table):
+    return 'purchase_rfq_multi_vendor.table_version.%s' % table
+
+
+def get_table_version(env, table):
+    """Return a value that changes whenever rows of ``table`` change.
+
+    Put it in the key of an ormcached method to miss only the entries of
+    that table after a change, instead of clearing the registry cache. The
+    version is a counter bumped by ``bump_table_version`` in the changing
+    transaction, read once per transaction. Until it commits, the changing
+    transaction adds its id, so the entries it caches are never shared.
+    """
+    cr = env.cr
+    key = _cache_key(table)
+    version = cr.cache.get(key)
+    if version is None:
+        cr.execute(SQL("SELECT version FROM purchase_table_version WHERE table_name = %s", table))
+        row = cr.fetchone()
+        version = cr.cache[key] = (row[0] if row else 0, cr.cache.get(key + '.txid'))
+        _reset_at_transaction_end(cr, table)
+    return version
+
+
+def bump_table_version(env, table):
+    """Change the version of ``table``; call it after changing its rows."""
+    cr = env.cr
+    key = _cache_key(table)
+    cr.execute(SQL(
+        """
+        INSERT INTO purchase_table_version (table_name, version)
+             VALUES (%s, 1)
+        ON CONFLICT (table_name)
+          DO UPDATE SET version = purchase_table_version.version + 1
+          RETURNING version, txid_current()
+        """,
+        table,
+    ))
+    version, txid = cr.fetchone()
+    cr.cache[key] = (version, txid)
+    cr.cache[key + '.txid'] = txid
+    _reset_at_transaction_end(cr, table)
+
+
+def _reset_at_transaction_end(cr, table):
+    key = _cache_key(table)
+
+    def reset():
+        cr.cache.pop(key, None)
+        cr.cache.pop(key + '.txid', None)
+
+    cr.postcommit.add(reset)
+    cr.postrollback.add(reset)
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 # Part of Purchase Multi-Vendor RFQ module.
 
+import math
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import float_round
+
+from ..tools import profiled_action
 
 
 class SelectWinnerWizard(models.TransientModel):
@@ -35,6 +40,16 @@ class SelectWinnerWizard(models.TransientModel):
         string='Bid Total Amount',
         currency_field='currency_id',
     )
+    rfq_currency_id = fields.Many2one(
+        'res.currency',
+        related='bid_id.rfq_currency_id',
+        readonly=True,
+    )
+    amount_total_rfq_currency = fields.Monetary(
+        related='bid_id.amount_total_rfq_currency',
+        string='Bid Total (RFQ Currency)',
+        currency_field='rfq_currency_id',
+    )
 
     use_bid_pricing = fields.Boolean(
         string='Use Bid Pricing',
@@ -47,72 +62,143 @@ class SelectWinnerWizard(models.TransientModel):
         help='Any additional notes about the award decision.',
     )
 
+    def _prepare_purchase_order_vals(self):
+        """Values of the Purchase Order created for the winning vendor.
+
+        Bid prices are in the currency the vendor quoted in, so the order is
+        created in that currency; RFQ prices keep the RFQ currency.
+        """
+        self.ensure_one()
+        currency = self.bid_id.currency_id if self.use_bid_pricing else self.rfq_id.currency_id
+        return {
+            'partner_id': self.vendor_id.id,
+            'origin': self.rfq_id.name,
+            'date_order': fields.Datetime.now(),
+            'company_id': self.rfq_id.company_id.id,
+            'currency_id': currency.id,
+            'fiscal_position_id': self.rfq_id.fiscal_position_id.id if self.rfq_id.fiscal_position_id else False,
+            'payment_term_id': self.rfq_id.payment_term_id.id if self.rfq_id.payment_term_id else False,
+            'notes': self.rfq_id.notes,
+            'user_id': self.rfq_id.user_id.id if self.rfq_id.user_id else self.env.uid,
+        }
+
+    def _get_awarded_bid_lines(self):
+        self.ensure_one()
+        return self.bid_id.bid_line_ids.filtered(lambda line: not line.no_quote)
+
+    def _prepare_purchase_order_line_vals(self, bid_line, order):
+        self.ensure_one()
+        if self.use_bid_pricing:
+            # Order in the unit the vendor quoted; a vendor selling by the
+            # box is ordered whole boxes
+            uom = bid_line.vendor_uom_id or bid_line.product_uom
+            quantity = bid_line.product_qty
+            if uom != bid_line.product_uom:
+                quantity = math.ceil(float_round(bid_line.vendor_qty, precision_rounding=uom.rounding))
+            price, discount = bid_line.price_unit, bid_line.discount
+        else:
+            uom, quantity = bid_line.product_uom, bid_line.product_qty
+            price, discount = bid_line.rfq_line_id.price_unit, bid_line.rfq_line_id.discount
+
+        line_vals = {
+            'order_id': order.id,
+            'rfq_bid_line_id': bid_line.id,
+            'product_id': bid_line.product_id.id,
+            'name': bid_line.rfq_line_id.name or bid_line.product_id.display_name,
+            'product_qty': quantity,
+            'product_uom': uom.id,
+            'price_unit': price,
+            'discount': discount,
+            'date_planned': fields.Datetime.now(),
+        }
+        if bid_line.taxes_id:
+            line_vals['taxes_id'] = [(6, 0, bid_line.taxes_id.ids)]
+        elif bid_line.rfq_line_id.taxes_id:
+            line_vals['taxes_id'] = [(6, 0, bid_line.rfq_line_id.taxes_id.ids)]
+        return line_vals
+
+    @profiled_action
     def action_confirm_winner(self):
-        """Award the selected bid and create a Purchase Order for the winning vendor."""
+        """Award the selected bid and create a Purchase Order for the winning vendor.
+
+        Awards of large bids are queued as a background job.
+        """
         self.ensure_one()
+        self._check_award()
+        Job = self.env['purchase.job']
+        if Job._should_enqueue(len(self.bid_id.bid_line_ids)):
+            return Job._enqueue(
+                self.bid_id, '_job_award', _('Award %s') % self.bid_id.name,
+                origin=self.rfq_id,
+                kwargs={'use_bid_pricing': self.use_bid_pricing, 'notes': self.notes or False},
+            )._action_notify(close=True)
+
+        new_po = self._confirm_winner()
+        return {
+            'name': _('Purchase Order'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'purchase.order',
+            'res_id': new_po.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
 
+    def _check_award(self):
+        self.ensure_one()
         if self.bid_id.state not in ('submitted', 'under_review'):
             raise UserError(
                 _('Only submitted or under-review bids can be awarded.')
             )
+        if self.bid_id.requote_needed:
+            raise UserError(
+                _('The RFQ changed after this bid was submitted. Refresh the bid before awarding it.')
+            )
 
-        # 1. Mark winning bid as awarded
-        self.bid_id.write({'state': 'awarded'})
-        self.bid_id.rfq_vendor_id.write({'status': 'awarded'})
+    def _confirm_winner(self):
+        """Award the bid and return the Purchase Order created for the vendor."""
+        self.ensure_one()
+        self._check_award()
 
-        # 2. Reject all other submitted bids for the same RFQ
-        other_bids = self.rfq_id.rfq_bid_ids.filtered(
-            lambda b: b.id != self.bid_id.id and b.state in ('submitted', 'under_review')
+        # Freeze the comparison as the buyer sees it, before the award
+        # changes the bid states
+        snapshot_payload = self.env['purchase.rfq.award.snapshot']._capture(
+            self.bid_id, notes=self.notes, use_bid_pricing=self.use_bid_pricing,
         )
-        other_bids.write({'state': 'rejected'})
-        for bid in other_bids:
-            bid.rfq_vendor_id.write({'status': 'rejected'})
+
+        # 1. Mark winning bid as awarded (its vendor follows through the
+        #    transition hook)
+        self.bid_id._transition('awarded')
+
+        # 2. Reject all other submitted bids for the same RFQ in one batch
+        other_bids = self.env['purchase.rfq.bid'].search([
+            ('rfq_id', '=', self.rfq_id.id),
+            ('id', '!=', self.bid_id.id),
+            ('state', 'in', ('submitted', 'under_review')),
+        ])
+        other_bids._transition('rejected')
 
         # Reject vendors who haven't bid
         non_bidding_vendors = self.rfq_id.rfq_vendor_ids.filtered(
             lambda v: v.status not in ('awarded', 'rejected')
         )
-        non_bidding_vendors.write({'status': 'rejected'})
+        non_bidding_vendors._transition('rejected')
 
         # 3. Create a new Purchase Order from the winning bid
-        po_vals = {
-            'partner_id': self.vendor_id.id,
-            'origin': self.rfq_id.name,
-            'date_order': fields.Datetime.now(),
-            'company_id': self.rfq_id.company_id.id,
-            'currency_id': self.rfq_id.currency_id.id,
-            'fiscal_position_id': self.rfq_id.fiscal_position_id.id if self.rfq_id.fiscal_position_id else False,
-            'payment_term_id': self.rfq_id.payment_term_id.id if self.rfq_id.payment_term_id else False,
-            'notes': self.rfq_id.notes,
-            'user_id': self.rfq_id.user_id.id if self.rfq_id.user_id else self.env.uid,
-        }
-        new_po = self.env['purchase.order'].create(po_vals)
-
-        # 4. Copy lines from bid to PO
-        for bid_line in self.bid_id.bid_line_ids:
-            price = bid_line.price_unit if self.use_bid_pricing else bid_line.rfq_line_id.price_unit
-            discount = bid_line.discount if self.use_bid_pricing else bid_line.rfq_line_id.discount
-
-            line_vals = {
-                'order_id': new_po.id,
-                'product_id': bid_line.product_id.id,
-                'name': bid_line.rfq_line_id.name or bid_line.product_id.display_name,
-                'product_qty': bid_line.product_qty,
-                'product_uom': bid_line.product_uom.id,
-                'price_unit': price,
-                'discount': discount,
-                'date_planned': fields.Datetime.now(),
-            }
-            if bid_line.taxes_id:
-                line_vals['taxes_id'] = [(6, 0, bid_line.taxes_id.ids)]
-            elif bid_line.rfq_line_id.taxes_id:
-                line_vals['taxes_id'] = [(6, 0, bid_line.rfq_line_id.taxes_id.ids)]
-
-            self.env['purchase.order.line'].create(line_vals)
-
-        # 5. Link awarded bid to RFQ
+        new_po = self.env['purchase.order'].create(self._prepare_purchase_order_vals())
+
+        # 4. Copy lines from bid to PO in one batch
+        self.env['purchase.order.line'].create([
+            self._prepare_purchase_order_line_vals(bid_line, new_po)
+            for bid_line in self._get_awarded_bid_lines()
+        ])
+
+        # 5. Link awarded bid and its snapshot to RFQ
+        snapshot = self.env['purchase.rfq.award.snapshot']._create_from_payload(
+            self.bid_id, snapshot_payload, new_po,
+        )
         self.rfq_id.write({
             'awarded_bid_id': self.bid_id.id,
+            'award_snapshot_id': snapshot.id,
         })
 
         # 6. Post a message on the RFQ chatter
@@ -128,13 +214,4 @@ class SelectWinnerWizard(models.TransientModel):
             ),
             message_type='notification',
         )
-
-        # 7. Return the new PO form
-        return {
-            'name': _('Purchase Order'),
-            'type': 'ir.actions.act_window',
-            'res_model': 'purchase.order',
-            'res_id': new_po.id,
-            'view_mode': 'form',
-            'target': 'current',
-        }
+        return new_po